@@ -0,0 +1,62 @@
+"""Benchmark the HTTP/1.1 and HTTP/2 transports against the stand-in server.
+
+It sends many concurrent `credential2credential` comparisons with each
+transport and reports the throughput and the number of connections the
+server had to accept. It requires the `http2` extra.
+
+    python scripts/benchmark_transports.py --requests 2000 --concurrency 64 --latency 0.05
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from standin_server import serve_h2c, serve_http1, url
+from vericlient import DaspeakClient
+from vericlient.daspeak.models import CompareCredential2CredentialInput
+from vericlient.transports import Http2Transport, RequestsTransport
+from requests.adapters import HTTPAdapter
+
+
+def run(client: DaspeakClient, n_requests: int, concurrency: int) -> tuple[float, int]:
+    inputs = (
+        CompareCredential2CredentialInput(credential_reference="reference", credential_to_evaluate=f"credential-{i}")
+        for i in range(n_requests)
+    )
+    start = time.perf_counter()
+    errors = sum(isinstance(result, Exception) for _, result in client.iter_compare(inputs, max_in_flight=concurrency))
+    return time.perf_counter() - start, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the stand-in server delays each response")
+    parser.add_argument("--connections", type=int, default=4, help="Maximum HTTP/2 connections")
+    args = parser.parse_args()
+
+    http1_server = serve_http1(latency=args.latency)
+    requests_transport = RequestsTransport()
+    requests_transport.session.mount("http://", HTTPAdapter(pool_maxsize=args.concurrency))
+    http1_client = DaspeakClient(url=url(http1_server), transport=requests_transport)
+
+    h2c_server = serve_h2c(latency=args.latency)
+    h2c_client = DaspeakClient(
+        url=url(h2c_server), transport=Http2Transport(max_connections=args.connections, http1=False),
+    )
+
+    print(f"{args.requests} requests, {args.concurrency} in flight, {args.latency * 1000:.0f} ms server latency")
+    for name, client, server in (("HTTP/1.1", http1_client, http1_server), ("HTTP/2", h2c_client, h2c_server)):
+        elapsed, errors = run(client, args.requests, args.concurrency)
+        print(
+            f"{name:>9}: {args.requests / elapsed:8.1f} req/s  {elapsed:6.2f} s  "
+            f"connections={server.connections}  errors={errors}",
+        )
+        client.transport.close()
+
+
+if __name__ == "__main__":
+    main()
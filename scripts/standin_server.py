@@ -0,0 +1,168 @@
+"""Stand-in Daspeak server to benchmark the clients locally.
+
+It answers the Daspeak endpoints with canned responses after a fixed latency,
+over HTTP/1.1 and over HTTP/2 without TLS (h2c with prior knowledge), and
+counts the connections it accepts. The HTTP/2 server requires the `h2` package,
+installed with the `http2` extra.
+
+Run it standalone with:
+
+    python scripts/standin_server.py --latency 0.05
+"""
+import argparse
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "/daspeak/v1/"
+MODEL = {"hash": "standin-model", "mode": "standin-mode"}
+RESPONSES = {
+    "alive": {},
+    "models": {"version": "1", "models": ["standin-model"]},
+    "similarity/credential2credential": {"version": "1", "score": 0.9, "model": MODEL, "calibration": "telephone-channel"},
+    "similarity/credential2wav": {
+        "version": "1", "score": 0.9, "model": MODEL, "calibration": "telephone-channel",
+        "authenticity_to_evaluate": 0.99, "input_audio_duration_to_evaluate": 5.0, "net_speech_duration_to_evaluate": 4.5,
+    },
+    "identification/credential2credentials": {
+        "version": "1", "calibration": "telephone-channel",
+        "scores": [{"id": "standin-subject", "score": 0.9}], "result": {"id": "standin-subject", "score": 0.9},
+    },
+    "identification/wav2credentials": {
+        "version": "1", "model": MODEL, "calibration": "telephone-channel", "authenticity_reference": 0.99,
+        "scores": [{"id": "standin-subject", "score": 0.9}], "result": {"id": "standin-subject", "score": 0.9},
+        "input_audio_duration_reference": 5.0, "net_speech_duration_reference": 4.5,
+    },
+    "credential/wav": {
+        "version": "1", "model": MODEL, "credential": "standin-credential",
+        "authenticity": 0.99, "input_audio_duration": 5.0, "net_speech_duration": 4.5,
+    },
+}
+
+
+def respond(path: str) -> tuple[int, bytes]:
+    """Return the status and the body of the response to a path."""
+    endpoint = path.split("?", 1)[0].removeprefix(PREFIX)
+    if endpoint.startswith("models/") and endpoint.endswith("/credential/wav"):
+        endpoint = "credential/wav"
+    if endpoint not in RESPONSES:
+        return 404, json.dumps({"message": "Not found", "error_code": "NotFound"}).encode()
+    return 200, json.dumps(RESPONSES[endpoint]).encode()
+
+
+class _Http1Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self) -> None:
+        self._respond()
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._respond()
+
+    def _respond(self) -> None:
+        time.sleep(self.server.latency)
+        status, body = respond(self.path)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class _H2Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        with self.server.lock:
+            self.server.connections += 1
+        self._lock = threading.Lock()
+        self._connection = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        self._connection.initiate_connection()
+        self._flush()
+        paths = {}
+        while data := self.request.recv(65535):
+            with self._lock:
+                events = self._connection.receive_data(data)
+            for event in events:
+                if isinstance(event, h2.events.RequestReceived):
+                    paths[event.stream_id] = dict(event.headers)[b":path"].decode()
+                elif isinstance(event, h2.events.DataReceived):
+                    with self._lock:
+                        self._connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    timer = threading.Timer(self.server.latency, self._respond, (event.stream_id, paths.pop(event.stream_id)))
+                    timer.start()
+            self._flush()
+
+    def _respond(self, stream_id: int, path: str) -> None:
+        status, body = respond(path)
+        with self._lock:
+            self._connection.send_headers(stream_id, [
+                (":status", str(status)), ("content-type", "application/json"), ("content-length", str(len(body))),
+            ])
+            self._connection.send_data(stream_id, body, end_stream=True)
+        self._flush()
+
+    def _flush(self) -> None:
+        with self._lock:
+            data = self._connection.data_to_send()
+            if data:
+                self.request.sendall(data)
+
+
+class _H2Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _start(server: socketserver.BaseServer, latency: float) -> socketserver.BaseServer:
+    server.latency = latency
+    server.connections = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_http1(host: str = "127.0.0.1", port: int = 0, latency: float = 0.05) -> ThreadingHTTPServer:
+    """Start the HTTP/1.1 stand-in server in a background thread."""
+    return _start(ThreadingHTTPServer((host, port), _Http1Handler), latency)
+
+
+def serve_h2c(host: str = "127.0.0.1", port: int = 0, latency: float = 0.05) -> socketserver.TCPServer:
+    """Start the HTTP/2 (h2c with prior knowledge) stand-in server in a background thread."""
+    return _start(_H2Server((host, port), _H2Handler), latency)
+
+
+def url(server: socketserver.BaseServer) -> str:
+    """Return the Daspeak URL of a stand-in server."""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{PREFIX.rstrip('/')}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds each response is delayed")
+    parser.add_argument("--http1-port", type=int, default=8001)
+    parser.add_argument("--h2c-port", type=int, default=8002)
+    args = parser.parse_args()
+    http1 = serve_http1(port=args.http1_port, latency=args.latency)
+    h2c = serve_h2c(port=args.h2c_port, latency=args.latency)
+    print(f"HTTP/1.1: {url(http1)}\nHTTP/2 (h2c): {url(h2c)}")
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Helpers to inspect audio payloads without decoding them."""
+import io
+import os
+from pathlib import Path
+from typing import IO
+
+AudioInput = str | Path | bytes | bytearray | memoryview | IO[bytes]
+"""The audio inputs accepted by the models: a path, a binary file object or any
+contiguous bytes-like object, such as a NumPy array with the content of a WAV file."""
+
+_HEADER_SIZE = 4096
+
+_RIFF_HEADER_SIZE = 12
+_CHUNK_HEADER_SIZE = 8
+_FMT_BYTE_RATE_END = 12
+_UNKNOWN_DATA_SIZES = (0, 0xFFFFFFFF)
+
+
+def wav_duration(content: bytes | bytearray | memoryview) -> float | None:
+    """Return the duration in seconds declared in the header of a WAV file.
+
+    Only the RIFF chunk headers are read, so the audio is never decoded and
+    passing just the first few kilobytes of the file is enough.
+
+    Args:
+        content: The content of the WAV file, or its first bytes
+
+    Returns:
+        The duration of the audio, or None if it cannot be read from the header
+
+    """
+    view = memoryview(content).cast("B")
+    if len(view) < _RIFF_HEADER_SIZE or view[0:4] != b"RIFF" or view[8:12] != b"WAVE":
+        return None
+    byte_rate = None
+    offset = _RIFF_HEADER_SIZE
+    while offset + _CHUNK_HEADER_SIZE <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        size = int.from_bytes(view[offset + 4:offset + 8], "little")
+        body = offset + _CHUNK_HEADER_SIZE
+        if chunk_id == b"fmt " and body + _FMT_BYTE_RATE_END <= len(view):
+            byte_rate = int.from_bytes(view[body + 8:body + 12], "little")
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            if size in _UNKNOWN_DATA_SIZES:
+                size = len(view) - body
+            return size / byte_rate
+        offset = body + size + (size & 1)
+    return None
+
+
+def validate_audio(audio: object) -> object:
+    """Check that an audio input is of a supported type, returning it unchanged.
+
+    The audio is not read and no copy is made: paths are opened and buffers
+    are sliced only when the request is sent.
+
+    Args:
+        audio: The audio input
+
+    Returns:
+        The same audio input
+
+    Raises:
+        TypeError: If the audio is not a path, a binary file object or a contiguous bytes-like object
+
+    """
+    if isinstance(audio, (str, Path)):
+        return audio
+    if isinstance(audio, io.TextIOBase):
+        error = "audio files must be opened in binary mode"
+        raise TypeError(error)
+    if hasattr(audio, "read") and hasattr(audio, "seek"):
+        return audio
+    try:
+        view = memoryview(audio)
+    except TypeError as e:
+        error = "audio must be a path, a binary file object or a bytes-like object"
+        raise TypeError(error) from e
+    if not view.c_contiguous:
+        error = "audio buffers must be contiguous"
+        raise TypeError(error)
+    return audio
+
+
+def audio_source(audio: object) -> Path | memoryview | IO[bytes]:
+    """Return the source an audio input is uploaded from, without reading it.
+
+    Args:
+        audio: The audio input
+
+    Returns:
+        The path of the file, the binary file object, or a byte view of the buffer
+
+    Raises:
+        FileNotFoundError: If the audio is a path that does not exist
+
+    """
+    if isinstance(audio, (str, Path)):
+        if not Path(audio).is_file():
+            error = f"File {audio} not found"
+            raise FileNotFoundError(error)
+        return Path(audio)
+    if hasattr(audio, "read"):
+        return audio
+    return memoryview(audio).cast("B")
+
+
+def audio_size(source: Path | memoryview | IO[bytes]) -> int:
+    """Return the number of bytes an audio source will upload."""
+    if isinstance(source, Path):
+        return source.stat().st_size
+    if isinstance(source, memoryview):
+        return source.nbytes
+    start = source.tell()
+    end = source.seek(0, os.SEEK_END)
+    source.seek(start)
+    return end - start
+
+
+def audio_header(source: Path | memoryview | IO[bytes], size: int = _HEADER_SIZE) -> bytes | memoryview:
+    """Return the first bytes of an audio source, enough for `wav_duration`."""
+    if isinstance(source, Path):
+        with source.open("rb") as f:
+            return f.read(size)
+    if isinstance(source, memoryview):
+        return source[:size]
+    start = source.tell()
+    header = source.read(size)
+    source.seek(start)
+    return header
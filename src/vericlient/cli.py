@@ -0,0 +1,378 @@
+"""Command line interface to process batches of audios with the Veridas APIs."""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import TextIO
+
+from pydantic import BaseModel
+
+from vericlient.concurrency import iter_as_completed
+from vericlient.daspeak.batch import BatchJob
+from vericlient.daspeak.client import DaspeakClient
+from vericlient.daspeak.loadgen import OPERATIONS, LoadGenerator, daspeak_operations
+from vericlient.daspeak.models import (
+    CompareAudio2AudioInput,
+    CompareAudio2CredentialsInput,
+    CompareCredential2AudioInput,
+    CompareCredential2CredentialInput,
+    CompareCredential2CredentialsInput,
+    GenerateCredentialInput,
+)
+from vericlient.daspeak.store import CredentialStore
+
+_GALLERY = "cli"
+_AUDIO_KEYS = ("audio", "audio_reference", "audio_to_evaluate")
+_COMPARE_INPUTS = {
+    ("audio_reference", "audio_to_evaluate"): CompareAudio2AudioInput,
+    ("credential_reference", "audio_to_evaluate"): CompareCredential2AudioInput,
+    ("credential_reference", "credential_to_evaluate"): CompareCredential2CredentialInput,
+}
+
+
+class Progress:
+    """Thread-safe counters of a batch run, periodically reported to a stream."""
+
+    def __init__(self, stream: TextIO | None = None, interval: float = 5.0) -> None:
+        """Create the Progress class.
+
+        Args:
+            stream: The stream to write the reports to, `sys.stderr` if not provided
+            interval: The minimum number of seconds between two reports
+
+        """
+        self._stream = stream or sys.stderr
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._last_report = self._start
+        self.processed = 0
+        self.errors: dict[str, int] = {}
+
+    @property
+    def n_errors(self) -> int:
+        """Return the total number of errors."""
+        return sum(self.errors.values())
+
+    def record(self, error: BaseException | None = None) -> None:
+        """Record a processed item and report the progress if it is due."""
+        with self._lock:
+            self.processed += 1
+            if error is not None:
+                name = type(error).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+            now = time.monotonic()
+            if now - self._last_report >= self._interval:
+                self._last_report = now
+                self._report(now)
+
+    def summary(self) -> None:
+        """Report the final counters."""
+        with self._lock:
+            self._report(time.monotonic(), final=True)
+
+    def _report(self, now: float, *, final: bool = False) -> None:
+        elapsed = max(now - self._start, 1e-9)
+        errors = ", ".join(f"{name}={count}" for name, count in sorted(self.errors.items())) or "none"
+        prefix = "done" if final else "progress"
+        self._stream.write(
+            f"{prefix}: processed={self.processed} errors={self.n_errors} ({errors}) "
+            f"elapsed={elapsed:.1f}s throughput={self.processed / elapsed:.2f}/s\n",
+        )
+        self._stream.flush()
+
+
+def read_items(source: str) -> Iterator[dict]:
+    """Read the items to process from a directory of WAV files or a manifest.
+
+    A directory yields one item per `*.wav` file found recursively, with the
+    relative path as id. A manifest is a JSONL file where each line is an
+    object with an optional `id` and the fields of the operation; a line can
+    also be a plain path to a WAV file. Relative audio paths are resolved
+    against the directory of the manifest.
+
+    Args:
+        source: The directory or the manifest path
+
+    Yields:
+        One dictionary per item, always with an `id`
+
+    """
+    path = Path(source)
+    if path.is_dir():
+        for audio in sorted(path.rglob("*.wav")):
+            yield {"id": str(audio.relative_to(path)), "audio": str(audio)}
+        return
+    with path.open() as f:
+        for number, line in enumerate(f, start=1):
+            stripped = line.strip()
+            if not stripped:
+                continue
+            item = json.loads(stripped) if stripped.startswith("{") else {"audio": stripped}
+            item.setdefault("id", item.get("audio", str(number)))
+            for key in _AUDIO_KEYS:
+                if key in item and not Path(item[key]).is_absolute():
+                    item[key] = str(path.parent / item[key])
+            yield item
+
+
+def read_gallery(source: str) -> list[tuple[str, str]]:
+    """Read a gallery of `(id, credential)` pairs from a JSONL file.
+
+    Each line is either an object with `id` and `credential`, or a line written
+    by `generate-credentials`, in which case failed items are skipped.
+    """
+    gallery = []
+    with open(source) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "result" in item:
+                if not item.get("ok"):
+                    continue
+                item = {"id": item["id"], "credential": item["result"]["credential"]}
+            gallery.append((str(item["id"]), item["credential"]))
+    return gallery
+
+
+def build_compare_input(item: dict) -> BaseModel:
+    """Build the compare input model matching the fields of a manifest item."""
+    for keys, model in _COMPARE_INPUTS.items():
+        if all(key in item for key in keys):
+            return model(**{key: value for key, value in item.items() if key != "id"})
+    error = (
+        "Each compare item needs either audio_reference or credential_reference, "
+        "and either audio_to_evaluate or credential_to_evaluate"
+    )
+    raise ValueError(error)
+
+
+def write_result(output: TextIO, item_id: str, result: BaseModel | BaseException) -> None:
+    """Write the result of an item, or its error, as a JSONL line."""
+    if isinstance(result, BaseException):
+        line = {"id": item_id, "ok": False, "error": type(result).__name__, "message": str(result)}
+    else:
+        line = {"id": item_id, "ok": True, "result": result.model_dump(mode="json")}
+    output.write(json.dumps(line) + "\n")
+
+
+def run_batch(
+        items: Iterable[dict],
+        func: Callable[[dict], BaseModel],
+        output: TextIO,
+        concurrency: int,
+        progress: Progress,
+) -> None:
+    """Apply `func` to every item concurrently and write each result as a JSONL line.
+
+    At most `concurrency` items are in flight, so the items are read lazily and
+    memory stays flat regardless of the size of the batch.
+    """
+    for item_id, result in iter_as_completed(func, ((item["id"], item) for item in items), concurrency):
+        write_result(output, item_id, result)
+        progress.record(result if isinstance(result, Exception) else None)
+
+
+def run_checkpointed_batch(
+        items: Iterable[dict],
+        build_input: Callable[[dict], BaseModel],
+        job: BatchJob,
+        output: TextIO,
+        progress: Progress,
+) -> None:
+    """Run the items through a resumable `BatchJob`, writing each result as a JSONL line.
+
+    Items already finished in the checkpoint of the job are skipped. Items that
+    cannot be turned into an input model are reported as errors and are not
+    checkpointed.
+    """
+    def on_result(item_id: str, result: BaseModel | Exception) -> None:
+        write_result(output, item_id, result)
+        output.flush()
+        progress.record(result if isinstance(result, Exception) else None)
+
+    def inputs() -> Iterator[tuple[str, BaseModel]]:
+        for item in items:
+            try:
+                yield item["id"], build_input(item)
+            except ValueError as e:     # noqa: PERF203
+                on_result(item["id"], e)
+
+    job.run(inputs(), on_result=on_result)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vericlient",
+        description="Process batches of audios with the Veridas DASPEAK API, or generate load against it.",
+    )
+    parser.add_argument("--apikey", help="API key for the Veridas cloud (or VERICLIENT_APIKEY)")
+    parser.add_argument("--environment", help="Cloud environment: sandbox or production")
+    parser.add_argument("--location", help="Cloud location: eu or us")
+    parser.add_argument("--url", help="URL of a self-hosted DASPEAK API, instead of the cloud")
+    parser.add_argument("--timeout", type=float, help="Timeout of each request, in seconds")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of requests in flight (default: 8)")
+    parser.add_argument("--output", "-o", default="-", help="JSONL file to write the results to (default: stdout)")
+    parser.add_argument(
+        "--progress-interval", type=float, default=5.0,
+        help="Seconds between two progress reports on stderr (default: 5)",
+    )
+    parser.add_argument("--calibration", default="telephone-channel", help="Calibration to use")
+    parser.add_argument(
+        "--checkpoint",
+        help="SQLite checkpoint to resume from: finished items are skipped and results are appended to --output",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate-credentials", help="Generate a credential for each audio")
+    generate.add_argument("input", help="Directory of WAV files or JSONL manifest")
+    generate.add_argument("--model", help="Hash of the biometrics model (default: the last one available)")
+    generate.add_argument("--channel", type=int, default=1, help="Channel of the audios, if stereo")
+
+    compare = subparsers.add_parser("compare", help="Compare pairs of audios and/or credentials")
+    compare.add_argument(
+        "input",
+        help="JSONL manifest with audio_reference or credential_reference, and audio_to_evaluate or credential_to_evaluate",
+    )
+
+    identify = subparsers.add_parser("identify", help="Identify each audio or credential against a gallery")
+    identify.add_argument("input", help="Directory of WAV files or JSONL manifest with audio or credential")
+    identify.add_argument(
+        "--gallery", required=True,
+        help="JSONL file with id and credential per line, or the output of generate-credentials",
+    )
+    identify.add_argument("--channel", type=int, default=1, help="Channel of the audios, if stereo")
+
+    loadgen = subparsers.add_parser(
+        "loadgen", help="Replay a mix of operations at a target rate or --concurrency and report the latencies",
+    )
+    loadgen.add_argument("--audio", required=True, help="WAV file sent by every operation")
+    loadgen.add_argument(
+        "--mix", type=parse_mix, default=dict.fromkeys(OPERATIONS, 1.0),
+        help="Weight of each operation, e.g. generate_credential=1,compare=2,identify=1 (default: all equal)",
+    )
+    loadgen.add_argument("--rps", type=float, help="Calls started per second (default: as many as --concurrency allows)")
+    loadgen.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load (default: 30)")
+    loadgen.add_argument("--requests", type=int, help="Number of calls to make, instead of --duration")
+    loadgen.add_argument("--gallery-size", type=int, default=100, help="Credentials of each identification (default: 100)")
+    loadgen.add_argument("--model", help="Hash of the biometrics model (default: the last one available)")
+    loadgen.add_argument("--seed", type=int, help="Seed of the random choice of the operations")
+    return parser
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parse a mix of operations such as `generate_credential=1,compare=2`."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in OPERATIONS:
+            error = f"Unknown operation: {name}. Valid options are: {', '.join(OPERATIONS)}"
+            raise argparse.ArgumentTypeError(error)
+        try:
+            mix[name.strip()] = float(weight or 1)
+        except ValueError as e:
+            error = f"Invalid weight of {name}: {weight}"
+            raise argparse.ArgumentTypeError(error) from e
+    return mix
+
+
+def run_loadgen(args: argparse.Namespace, client: DaspeakClient, output: TextIO) -> int:
+    """Run the `loadgen` command, writing the report as JSON to the output and as text to stderr."""
+    model = args.model or client.get_models().models[-1]
+    operations = daspeak_operations(
+        client, Path(args.audio).read_bytes(), model, calibration=args.calibration, gallery_size=args.gallery_size,
+    )
+    generator = LoadGenerator(operations, mix=args.mix, concurrency=args.concurrency, rps=args.rps, seed=args.seed)
+    duration = None if args.requests is not None else args.duration
+    report = generator.run(duration=duration, requests=args.requests)
+    output.write(report.model_dump_json() + "\n")
+    sys.stderr.write(report.format())
+    return 1 if report.errors else 0
+
+
+def _input_builder(args: argparse.Namespace, client: DaspeakClient) -> Callable[[dict], BaseModel]:
+    calibration = args.calibration
+    if args.command == "generate-credentials":
+        model = args.model or client.get_models().models[-1]
+        return lambda item: GenerateCredentialInput(
+            audio=item["audio"], hash=item.get("hash", model),
+            channel=item.get("channel", args.channel), calibration=item.get("calibration", calibration),
+        )
+    if args.command == "compare":
+        return lambda item: build_compare_input({"calibration": calibration, **item})
+
+    client.credential_store.add_many(_GALLERY, read_gallery(args.gallery))
+
+    def identify(item: dict) -> BaseModel:
+        if "credential" in item:
+            return CompareCredential2CredentialsInput(
+                credential_reference=item["credential"], gallery=_GALLERY,
+                calibration=item.get("calibration", calibration),
+            )
+        return CompareAudio2CredentialsInput(
+            audio_reference=item["audio"], gallery=_GALLERY,
+            channel=item.get("channel", args.channel), calibration=item.get("calibration", calibration),
+        )
+    return identify
+
+
+def _call(client: DaspeakClient, data_model: BaseModel) -> BaseModel:
+    if isinstance(data_model, GenerateCredentialInput):
+        return client.generate_credential(data_model)
+    return client.compare(data_model)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the `vericlient` command.
+
+    Args:
+        argv: The command line arguments, `sys.argv[1:]` if not provided
+
+    Returns:
+        The exit code: 0 if every item succeeded, 1 otherwise
+
+    """
+    args = _build_parser().parse_args(argv)
+    client = DaspeakClient(
+        apikey=args.apikey,
+        timeout=args.timeout,
+        environment=args.environment,
+        location=args.location,
+        url=args.url,
+        credential_store=CredentialStore(),
+    )
+    if args.command == "loadgen":
+        output = sys.stdout if args.output == "-" else open(args.output, "w")    # noqa: SIM115
+        try:
+            return run_loadgen(args, client, output)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+    build_input = _input_builder(args, client)
+    progress = Progress(interval=args.progress_interval)
+    mode = "a" if args.checkpoint else "w"
+    output = sys.stdout if args.output == "-" else open(args.output, mode)    # noqa: SIM115
+    try:
+        if args.checkpoint:
+            job = BatchJob(client, args.checkpoint, max_workers=args.concurrency)
+            try:
+                run_checkpointed_batch(read_items(args.input), build_input, job, output, progress)
+            finally:
+                job.close()
+        else:
+            run_batch(
+                read_items(args.input), lambda item: _call(client, build_input(item)), output, args.concurrency, progress,
+            )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        progress.summary()
+    return 1 if progress.n_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,29 @@
 """Module with the abstraction of the client to interact with the Veridas APIs."""
+import json
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from urllib.parse import urlencode
 
 import requests
 import structlog
 
+from vericlient import forking
 from vericlient.apis import APIs
+from vericlient.audio import audio_header, audio_size, audio_source, wav_duration
+from vericlient.compression import RequestCompression
+from vericlient.concurrency import iter_as_completed
 from vericlient.config.config import settings
 from vericlient.environments import Environments, Locations, cloud_env2url
 from vericlient.exceptions import AuthorizationError, ServerError
+from vericlient.health import HealthMonitor, HealthStatus
+from vericlient.http_cache import HttpCache
+from vericlient.multipart import MultipartEncoder
+from vericlient.pool import ConnectionRegistry, ResumingAdapter, shared_connections
+from vericlient.slowlog import SlowRequestLog
+from vericlient.timeouts import TimeoutPolicy
+from vericlient.transports import RequestsTransport, Transport
 
 logger = structlog.get_logger(__name__)
 
@@ -19,15 +35,27 @@ class Client(ABC):
             self,
             api: str,
             apikey: str | None = None,
-            timeout: int | None = None,
+            timeout: float | tuple[float, float] | TimeoutPolicy | None = None,
             environment: str | None = None,
             location: str | None = None,
             url: str | None = None,
             headers: dict | None = None,
+            transport: Transport | None = None,
+            http_cache: HttpCache | None = None,
+            compression: RequestCompression | None = None,
+            connection_registry: ConnectionRegistry | None = None,
+            slow_request_log: SlowRequestLog | None = None,
     ) -> None:
         """Create Client class."""
         self._headers = headers or {}
         self._session = requests.Session()
+        if settings.resume_tls_sessions:
+            self._session.mount("https://", ResumingAdapter())
+        self._transport = transport or RequestsTransport(self._session)
+        self._http_cache = http_cache
+        self._compression = compression
+        self._slow_request_log = slow_request_log
+        self._health_monitor: HealthMonitor | None = None
 
         if not timeout and not settings.timeout:
             seconds = 10
@@ -36,6 +64,7 @@ class Client(ABC):
             self._timeout = seconds
         else:
             self._timeout = settings.timeout or timeout
+        self._timeout_policy = self._build_timeout_policy(self._timeout)
 
         if url:
             self._configure_custom_url(url)
@@ -48,6 +77,11 @@ class Client(ABC):
             self._headers.update({"apikey": apikey})
 
         self._session.headers.update(self._headers)
+        if settings.share_connections and connection_registry is None:
+            connection_registry = shared_connections
+        self._connection_registry = connection_registry if transport is None else None
+        if self._connection_registry is not None:
+            self._connection_registry.mount(self._session, self._url)
 
     def _configure_cloud_url(self, api: str, environment: str, location: str) -> None:
         if not environment and not settings.environment:
@@ -73,6 +107,16 @@ class Client(ABC):
             raise ValueError(error)
         self._url = cloud_env2url[environment][location] + f"/{api}"
 
+    def _build_timeout_policy(self, timeout: float | tuple[float, float] | TimeoutPolicy) -> TimeoutPolicy:
+        if isinstance(timeout, TimeoutPolicy):
+            return timeout
+        if isinstance(timeout, (tuple, list)):
+            connect, read = timeout
+        else:
+            connect = read = timeout
+        connect = settings.connect_timeout or connect
+        return TimeoutPolicy(connect=connect, read=read)
+
     def _configure_custom_url(self, url: str) -> None:
         url = settings.url or url
         self._url = url
@@ -88,25 +132,172 @@ class Client(ABC):
         return self._headers
 
     @property
-    def timeout(self) -> int:
+    def timeout(self) -> float | tuple[float, float] | TimeoutPolicy:
         """Return the timeout of the API."""
         return self._timeout
 
+    @property
+    def transport(self) -> Transport:
+        """Return the transport sending the requests."""
+        return self._transport
+
+    @property
+    def http_cache(self) -> HttpCache | None:
+        """Return the cache of the GET responses, if any."""
+        return self._http_cache
+
+    @property
+    def compression(self) -> RequestCompression | None:
+        """Return the compression of the request bodies, if any."""
+        return self._compression
+
+    @property
+    def slow_request_log(self) -> SlowRequestLog | None:
+        """Return the detector of the slow requests to log, if any."""
+        return self._slow_request_log
+
+    @property
+    def timeout_policy(self) -> TimeoutPolicy:
+        """Return the policy used to compute the timeouts of each request."""
+        return self._timeout_policy
+
+    @property
+    def health(self) -> HealthStatus | None:
+        """Return the last status cached by the health monitor.
+
+        It is None if the monitor has not been started or has not finished
+        its first check yet. Reading it never performs a request.
+        """
+        if self._health_monitor is None:
+            return None
+        return self._health_monitor.status
+
     @abstractmethod
     def alive(self) -> bool:
         """Check if the API is alive and responding."""
 
+    def start_health_monitor(self, interval: float = 5.0) -> HealthMonitor:
+        """Start polling the `alive` endpoint in the background.
+
+        The last status, latency and timestamp are cached and exposed through
+        the `health` property. Since the checks run over the client session,
+        they also keep its pooled connection warm.
+
+        Args:
+            interval: The number of seconds between two consecutive checks
+
+        Returns:
+            The running health monitor
+
+        """
+        if self._health_monitor is not None:
+            self._health_monitor.stop()
+        self._health_monitor = HealthMonitor(self.alive, interval=interval)
+        self._health_monitor.start()
+        return self._health_monitor
+
+    def stop_health_monitor(self) -> None:
+        """Stop the background health monitor, keeping its last status cached."""
+        if self._health_monitor is not None:
+            self._health_monitor.stop()
+
+    def warm_up(self, n_connections: int = 1, max_in_flight: int = 16) -> int:
+        """Open connections to the API before the first requests need them.
+
+        Sends `n_connections` `alive` checks, at most `max_in_flight` of them at
+        the same time, so each check of the first batch pays the DNS lookup and
+        the TCP and TLS handshakes of its own pooled connection, and the rest
+        reuse them. The TLS sessions are kept, so later reconnections to the API
+        resume them instead of performing full handshakes. Connections beyond the
+        size of the pool of the transport are closed after their check.
+
+        Args:
+            n_connections: The number of connections to open
+            max_in_flight: The maximum number of checks sent at the same time,
+                and so of threads and of connections opened
+
+        Returns:
+            The number of checks that succeeded
+
+        """
+        if n_connections < 1:
+            error = "n_connections must be at least 1"
+            raise ValueError(error)
+        window = min(n_connections, max_in_flight)
+        start = threading.Barrier(window) if window > 1 else None
+
+        def check(index: int) -> bool:
+            if start is not None and index < window:
+                start.wait()
+            return self.alive()
+
+        succeeded = 0
+        for _, result in iter_as_completed(check, ((i, i) for i in range(n_connections)), window):
+            if result is True:
+                succeeded += 1
+            elif isinstance(result, Exception):
+                logger.warning("Warm-up check failed", error=f"{type(result).__name__}: {result}")
+        logger.info("Connections warmed up", requested=n_connections, succeeded=succeeded)
+        return succeeded
+
+    def on_fork(
+            self,
+            hook: Callable[["Client"], None] | None = None,
+            restart_health_monitor: bool = False,  # noqa: FBT001, FBT002
+    ) -> None:
+        """Run a callable with the client in every child process forked from this one.
+
+        After a fork, the child stops using the connections inherited from the
+        parent and opens its own, while the configuration, caches, models and
+        credentials of the client are kept. The hooks run once that is done, so
+        they can, for example, open the connections of each worker before it
+        takes traffic. Nothing runs in the children of a client without hooks,
+        nor in the preparation workers of a `Pipeline`.
+
+        Args:
+            hook: The callable, called with the client. Errors are logged and ignored
+            restart_health_monitor: Whether the health monitor, if it is running when
+                the process forks, is restarted in the child
+
+        """
+        if hook is not None:
+            forking.add_hook(self, hook)
+        if restart_health_monitor:
+            forking.add_hook(self, Client._resume_after_fork)
+
+    def _resume_after_fork(self) -> None:
+        """Restart the health monitor in the child, whose threads were not inherited."""
+        monitor = self._health_monitor
+        if monitor is not None and not monitor.stopped:
+            self.start_health_monitor(monitor.interval)
+
     @abstractmethod
     def _handle_error_response(self, response: requests.Response) -> None:
         """Handle error responses from the API."""
 
-    def _get(self, endpoint: str) -> requests.Response:
-        """Make a GET request to the API."""
-        response = self._session.get(f"{self._url}/{endpoint}", timeout=self._timeout)
-        if not response.ok:
-            self._handle_authorization_error(response)
-            self._handle_error_response(response)
-        return response
+    def _get(
+            self,
+            endpoint: str,
+            params: dict | None = None,
+            headers: dict | None = None,
+            *,
+            cached: bool = True,
+    ) -> requests.Response:
+        """Make a GET request to the API.
+
+        With an `http_cache`, fresh responses are served from it and stale ones are
+        revalidated with a conditional request. Requests with their own headers,
+        such as conditional ones, and those sent with `cached=False`, such as the
+        `alive` probes, bypass the cache.
+        """
+        if self._http_cache is None or headers or not cached:
+            return self._request("GET", endpoint, params=params, headers=headers)
+        return self._http_cache.fetch(
+            f"{self._url}/{endpoint}",
+            params,
+            self._headers,
+            lambda validators: self._request("GET", endpoint, params=params, headers=validators),
+        )
 
     def _post(
             self, endpoint: str,
@@ -115,18 +306,183 @@ class Client(ABC):
             files: dict | None = None,
     ) -> requests.Response:
         """Make a POST request to the API."""
-        response = self._session.post(
-            f"{self._url}/{endpoint}",
-            data=data,
-            json=json_,
-            files=files,
-            timeout=self._timeout,
-        )
+        return self._request("POST", endpoint, data=data, json_=json_, files=files)
+
+    def _put(self, endpoint: str, json_: dict | None = None) -> requests.Response:
+        """Make a PUT request to the API."""
+        return self._request("PUT", endpoint, json_=json_)
+
+    def _delete(self, endpoint: str) -> requests.Response:
+        """Make a DELETE request to the API."""
+        return self._request("DELETE", endpoint)
+
+    def _request(
+            self,
+            method: str,
+            endpoint: str,
+            data: dict | None = None,
+            json_: dict | None = None,
+            files: dict | None = None,
+            params: dict | None = None,
+            headers: dict | None = None,
+    ) -> requests.Response:
+        """Make a request to the API, handling the timeouts and the error responses.
+
+        Requests with files are sent with a streaming `MultipartEncoder`, so the
+        contents of the files are not copied into the body, even when it is
+        compressed. A compressed request whose content coding is
+        rejected with `415` is sent again as it is, or with another content
+        coding the server accepts.
+        """
+        started = time.perf_counter()
+        form = data
+        if self._timeout_policy.adaptive:
+            upload_bytes, audio_duration = self._measure_payload(data, files)
+            timeout = self._timeout_policy.for_request(endpoint, upload_bytes, audio_duration)
+        else:
+            timeout = self._timeout_policy.for_request(endpoint)
+        headers = {**self._headers, **(headers or {})}
+        if files:
+            data = MultipartEncoder(data, files)
+            headers["Content-Type"] = data.content_type
+        timings = {"started": started}
+        try:
+            response, body = self._send(method, endpoint, data, json_, params, headers, timeout, timings)
+        except requests.RequestException as e:
+            if isinstance(e, requests.ReadTimeout):
+                # Censored sample: the request took at least its read timeout
+                self._timeout_policy.observe(endpoint, timeout[1])
+            if self._slow_request_log is not None:
+                self._log_if_slow(method, endpoint, timings, form, data, json_, files, error=e)
+            raise
+        if self._slow_request_log is not None:
+            self._log_if_slow(method, endpoint, timings, form, data, json_, files, body=body, response=response)
+        self._timeout_policy.observe(endpoint, response.elapsed.total_seconds())
         if not response.ok:
             self._handle_authorization_error(response)
             self._handle_error_response(response)
         return response
 
+    def _send(
+            self,
+            method: str,
+            endpoint: str,
+            data: object,
+            json_: dict | None,
+            params: dict | None,
+            headers: dict,
+            timeout: tuple[float, float],
+            timings: dict[str, float],
+    ) -> tuple[requests.Response, bytes | Iterator[bytes] | None]:
+        """Send a request with the transport, compressed if needed, and return its response and compressed body.
+
+        The moment the last attempt is sent is stored in `timings`.
+        """
+        attempts = 2
+        for _ in range(attempts):
+            body, body_headers = self._compressed_body(data, json_)
+            timings["sent"] = time.perf_counter()
+            response = self._transport.request(
+                method,
+                f"{self._url}/{endpoint}",
+                data=data if body is None else body,
+                json_=json_ if body is None else None,
+                params=params,
+                headers={**headers, **body_headers},
+                timeout=timeout,
+            )
+            if self._compression is None or not self._compression.observe(response, compressed=body is not None):
+                break
+        return response, body
+
+    def _log_if_slow(
+            self,
+            method: str,
+            endpoint: str,
+            timings: dict[str, float],
+            form: dict | None,
+            data: object,
+            json_: dict | None,
+            files: dict | None,
+            body: bytes | Iterator[bytes] | None = None,
+            response: requests.Response | None = None,
+            error: Exception | None = None,
+    ) -> None:
+        """Log a request with the details of its payload and phases if it was slow.
+
+        The payload is only measured for the slow requests. The headers are never
+        logged, so neither is the `apikey`.
+        """
+        finished = time.perf_counter()
+        duration = finished - timings["started"]
+        limit = self._slow_request_log.observe(endpoint, duration)
+        if limit is None:
+            return
+        sent = timings.get("sent", finished)
+        phases = {"prepare": sent - timings["started"]}
+        if response is not None:
+            waiting = min(response.elapsed.total_seconds(), finished - sent)
+            phases.update({"server": waiting, "download": finished - sent - waiting})
+        else:
+            phases["send"] = finished - sent
+        if isinstance(body, bytes):
+            upload_bytes = len(body)
+        elif isinstance(data, MultipartEncoder):
+            upload_bytes = len(data)
+        elif json_ is not None:
+            upload_bytes = len(json.dumps(json_).encode())
+        else:
+            upload_bytes = self._measure_payload(form, None)[0]
+        logger.warning(
+            "Slow request",
+            method=method,
+            endpoint=endpoint,
+            duration=duration,
+            limit=limit,
+            status_code=response.status_code if response is not None else None,
+            error=type(error).__name__ if error is not None else None,
+            upload_bytes=upload_bytes,
+            n_credentials=_count_credentials(form, json_),
+            audio_duration=self._measure_payload(None, files)[1],
+            response_bytes=len(response.content) if response is not None else None,
+            phases=phases,
+        )
+
+    def _compressed_body(self, data: object, json_: dict | None) -> tuple[bytes | Iterator[bytes] | None, dict]:
+        """Return the compressed body of a request and its headers, or None if it is not compressed.
+
+        Multipart bodies are compressed as they are streamed, without a known length.
+        """
+        if self._compression is None or (data is None and json_ is None):
+            return None, {}
+        if isinstance(data, MultipartEncoder):
+            size = len(data) if self._compression.multipart else data.fields_size
+            if not self._compression.should_compress(size):
+                return None, {}
+            headers = {"Content-Type": data.content_type, "Content-Encoding": self._compression.encoding}
+            return self._compression.compress_stream(data), headers
+        if json_ is not None:
+            body, content_type = json.dumps(json_).encode(), "application/json"
+        else:
+            body = urlencode({key: value for key, value in data.items() if value is not None}).encode()
+            content_type = "application/x-www-form-urlencoded"
+        if not self._compression.should_compress(len(body)):
+            return None, {}
+        encoding = self._compression.encoding
+        return self._compression.compress(body), {"Content-Type": content_type, "Content-Encoding": encoding}
+
+    def _measure_payload(self, data: dict | None, files: dict | None) -> tuple[int, float | None]:
+        """Return the approximate size of the request body and the duration of the audio uploaded."""
+        upload_bytes = sum(len(str(value)) for value in (data or {}).values() if value is not None)
+        audio_duration = None
+        for file in (files or {}).values():
+            source = audio_source(file[1])
+            upload_bytes += audio_size(source)
+            duration = wav_duration(audio_header(source))
+            if duration is not None:
+                audio_duration = (audio_duration or 0) + duration
+        return upload_bytes, audio_duration
+
     def _raise_server_error(self, response: requests.Response) -> None:
         """Raise a ServerError exception."""
         raise ServerError(response)
@@ -137,5 +493,16 @@ class Client(ABC):
             message = response.json()["message"]
             if "no Authorization header found" in message:
                 raise AuthorizationError
-        except KeyError:
+        except (KeyError, TypeError, ValueError):
             pass
+
+
+def _count_credentials(form: dict | None, json_: dict | None) -> int | None:
+    """Return the number of credentials of the `credential_list` of a request, if it has one."""
+    credential_list = (form or {}).get("credential_list", (json_ or {}).get("credential_list"))
+    if isinstance(credential_list, str):
+        try:
+            credential_list = json.loads(credential_list)
+        except ValueError:
+            return None
+    return len(credential_list) if isinstance(credential_list, list) else None
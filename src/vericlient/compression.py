@@ -0,0 +1,166 @@
+"""Compression of the bodies of large requests."""
+import gzip
+import threading
+import zlib
+from collections.abc import Iterable, Iterator
+
+import requests
+import structlog
+
+from vericlient import forking
+
+logger = structlog.get_logger(__name__)
+
+ENCODINGS = ("gzip", "zstd")
+"""The content codings available to compress the requests."""
+
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class RequestCompression:
+    """Opt-in compression of the request bodies above a size threshold.
+
+    Bodies of at least `threshold` bytes, such as large JSON credential lists,
+    are sent with `Content-Encoding: gzip` or `zstd`. Smaller bodies are sent as
+    they are, since compressing them costs more than it saves.
+
+    Support of the server is negotiated once: if a response advertises the
+    codings it accepts in `Accept-Encoding`, the preferred one among them is
+    used, or none. Otherwise the first compressed request probes it. If the
+    server rejects it with `415 Unsupported Media Type` and a body that is not
+    an error of the API, such as an unsupported audio, the request is sent
+    again uncompressed and compression is turned off for the server. Once a
+    compressed request has succeeded, a `415` never turns it off.
+
+    Multipart uploads are compressed incrementally while they are streamed, so
+    their files are never held in memory. Only their form fields, such as the
+    `credential_list` sent with an audio, count towards the threshold, unless
+    `multipart` is set, since audio codecs barely compress.
+    """
+
+    def __init__(
+            self,
+            encoding: str = "gzip",
+            threshold: int = 64 * 1024,
+            level: int | None = None,
+            multipart: bool = False,  # noqa: FBT001, FBT002
+    ) -> None:
+        """Create the RequestCompression class.
+
+        Args:
+            encoding: The preferred content coding, `gzip` or `zstd`. `zstd` requires the
+                zstd extra: `pip install vericlient[zstd]`
+            threshold: The minimum size of a body to compress it, in bytes
+            level: The compression level. By default, 6 for gzip and 3 for zstd
+            multipart: Whether the files of multipart uploads, such as audios, count towards
+                the threshold as well
+
+        """
+        if encoding not in ENCODINGS:
+            error = f"Invalid encoding: {encoding}. Valid options are: {', '.join(ENCODINGS)}"
+            raise ValueError(error)
+        self._zstd = None
+        if encoding == "zstd":
+            try:
+                import zstandard
+            except ImportError as e:
+                error = "zstd compression requires the zstd extra: pip install vericlient[zstd]"
+                raise ImportError(error) from e
+            # Compressors are not thread-safe, so one is created per body
+            self._zstd = zstandard.ZstdCompressor
+        self._zstd_level = 3 if level is None else level
+        self._preferred = encoding
+        self._encoding: str | None = encoding
+        self._threshold = threshold
+        self._multipart = multipart
+        self._level = 6 if level is None else level
+        self._supported: bool | None = None
+        self._lock = threading.Lock()
+        forking.track(self)
+
+    @property
+    def encoding(self) -> str | None:
+        """Return the content coding in use, or None if the server does not support any."""
+        return self._encoding
+
+    @property
+    def supported(self) -> bool | None:
+        """Return whether the server accepts compressed requests, or None if it is not known yet."""
+        return self._supported
+
+    @property
+    def multipart(self) -> bool:
+        """Return whether the files of multipart uploads count towards the threshold."""
+        return self._multipart
+
+    def should_compress(self, size: int) -> bool:
+        """Return whether a body of `size` bytes is compressed."""
+        return self._encoding is not None and size >= self._threshold
+
+    def compress(self, body: bytes) -> bytes:
+        """Compress a body with the content coding in use."""
+        if self._encoding == "zstd":
+            return self._zstd(level=self._zstd_level).compress(body)
+        return gzip.compress(body, compresslevel=self._level, mtime=0)
+
+    def compress_stream(self, chunks: Iterable[bytes | memoryview]) -> Iterator[bytes]:
+        """Compress a body incrementally with the content coding in use, yielding the compressed chunks.
+
+        Each call compresses the body from the start, so the stream can be sent again on retries.
+        """
+        if self._encoding == "zstd":
+            compressor = self._zstd(level=self._zstd_level).compressobj()
+        else:
+            compressor = zlib.compressobj(self._level, zlib.DEFLATED, _GZIP_WBITS)
+        for chunk in chunks:
+            if compressed := compressor.compress(chunk):
+                yield compressed
+        yield compressor.flush()
+
+    def observe(self, response: requests.Response, compressed: bool) -> bool:  # noqa: FBT001
+        """Learn the support of the server from a response.
+
+        Args:
+            response: The response of the server
+            compressed: Whether the body of the request was compressed
+
+        Returns:
+            Whether the server rejected the content coding, so the request must be sent again
+
+        """
+        unsupported_media_type = 415
+        rejected_status = compressed and response.status_code == unsupported_media_type
+        accepted = response.headers.get("Accept-Encoding")
+        rejected = False
+        with self._lock:
+            if accepted is not None:
+                sent = self._encoding
+                codings = {coding.split(";")[0].strip().lower() for coding in accepted.split(",")}
+                available = [self._preferred] + [coding for coding in ENCODINGS if coding != self._preferred]
+                self._encoding = next(
+                    (coding for coding in available if coding in codings and (coding != "zstd" or self._zstd)), None,
+                )
+                self._supported = self._encoding is not None
+                rejected = rejected_status and self._encoding != sent
+            elif rejected_status and self._supported is None and not _is_api_error(response):
+                self._encoding = None
+                self._supported = False
+                rejected = True
+            elif compressed and response.ok:
+                self._supported = True
+        if rejected and self._supported is False:
+            logger.info("The server does not accept compressed requests", status_code=response.status_code)
+        return rejected
+
+    def _after_fork(self) -> None:
+        """Use a new lock in the child, since a thread of the parent may have held the inherited one."""
+        self._lock = threading.Lock()
+
+
+def _is_api_error(response: requests.Response) -> bool:
+    """Return whether a response carries an error of the API, such as an unsupported audio."""
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and "exception" in body
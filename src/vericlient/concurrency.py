@@ -0,0 +1,67 @@
+"""Helpers to run many requests concurrently with bounded memory."""
+import itertools
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def iter_as_completed(
+        func: Callable[[T], R],
+        items: Iterable[tuple[Hashable, T]],
+        max_in_flight: int = 8,
+) -> Iterator[tuple[Hashable, R | Exception]]:
+    """Apply `func` to each item in a thread pool, yielding the results as they complete.
+
+    The items are pulled lazily and at most `max_in_flight` of them are being
+    processed at any time, so memory stays flat no matter how long the input
+    is. A new item is submitted as soon as one completes, before its result is
+    yielded, so the pool is kept busy while the caller handles the result.
+
+    Args:
+        func: The function to apply to each item
+        items: The `(item_id, item)` pairs to process
+        max_in_flight: The maximum number of items processed concurrently
+
+    Yields:
+        `(item_id, result)` pairs in completion order. If `func` raised, the
+        exception is yielded instead of the result
+
+    Raises:
+        ValueError: If `max_in_flight` is lower than 1. It is raised on the call,
+            not when the first result is pulled
+
+    """
+    if max_in_flight < 1:
+        error = "max_in_flight must be at least 1"
+        raise ValueError(error)
+    return _iter_as_completed(func, items, max_in_flight)
+
+
+def _iter_as_completed(
+        func: Callable[[T], R],
+        items: Iterable[tuple[Hashable, T]],
+        max_in_flight: int,
+) -> Iterator[tuple[Hashable, R | Exception]]:
+    """Run `iter_as_completed` once its arguments are validated."""
+    iterator = iter(items)
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    pending: dict[Future, Hashable] = {}
+
+    def submit(count: int) -> None:
+        for item_id, item in itertools.islice(iterator, count):
+            pending[executor.submit(func, item)] = item_id
+
+    try:
+        submit(max_in_flight)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item_id = pending.pop(future)
+                submit(1)
+                error = future.exception()
+                yield item_id, future.result() if error is None else error
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
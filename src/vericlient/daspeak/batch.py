@@ -0,0 +1,214 @@
+"""Resumable batch jobs over the Daspeak API."""
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from enum import Enum
+from pathlib import Path
+
+import structlog
+from pydantic import BaseModel
+
+from vericlient.concurrency import iter_as_completed
+from vericlient.daspeak.client import DaspeakClient
+from vericlient.daspeak.models import GenerateCredentialInput
+from vericlient.exceptions import RETRYABLE_ERRORS, AuthorizationError
+
+logger = structlog.get_logger(__name__)
+
+
+class ItemStatus(Enum):
+    """Status of an item in the checkpoint of a batch job."""
+
+    DONE = "done"
+    RETRYABLE = "retryable"
+    FAILED = "failed"
+
+
+class BatchSummary(BaseModel):
+    """Counters of a batch job run.
+
+    Attributes:
+        succeeded: The number of items processed successfully in this run
+        skipped: The number of items skipped because they were already finished
+        retryable: The number of items that failed with a transport error, a server error
+            or an authorization error, which may not happen again
+        failed: The number of items that failed with any other error, such as an invalid input
+
+    """
+
+    succeeded: int = 0
+    skipped: int = 0
+    retryable: int = 0
+    failed: int = 0
+
+
+class Checkpoint:
+    """Persist the status of each item of a batch job in a SQLite database.
+
+    Only the id, status, number of runs and last error of each item are
+    stored, so the checkpoint stays compact even for millions of items.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Create the Checkpoint class.
+
+        Args:
+            path: The path of the SQLite database, created if it does not exist
+
+        """
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, runs INTEGER NOT NULL, "
+                "error TEXT, updated_at REAL NOT NULL) WITHOUT ROWID",
+            )
+            self._connection.commit()
+
+    def status(self, item_id: str) -> ItemStatus | None:
+        """Return the status of an item, or None if it has never been processed."""
+        with self._lock:
+            row = self._connection.execute("SELECT status FROM items WHERE id = ?", (item_id,)).fetchone()
+        return ItemStatus(row[0]) if row else None
+
+    def runs(self, item_id: str) -> int:
+        """Return the number of job runs that have processed an item."""
+        with self._lock:
+            row = self._connection.execute("SELECT runs FROM items WHERE id = ?", (item_id,)).fetchone()
+        return row[0] if row else 0
+
+    def mark(self, item_id: str, status: ItemStatus, runs: int, error: str | None = None) -> None:
+        """Record the status of an item."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO items (id, status, runs, error, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (item_id, status.value, runs, error, time.time()),
+            )
+            self._connection.commit()
+
+    def items(self, status: ItemStatus) -> list[tuple[str, int, str | None]]:
+        """Return the `(id, runs, error)` of every item with a given status."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT id, runs, error FROM items WHERE status = ? ORDER BY id", (status.value,),
+            ).fetchall()
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+
+class BatchJob:
+    """Run `generate_credential` (or `compare`) over many inputs, resuming after a crash.
+
+    The status of each item is persisted in a checkpoint. When the job is run
+    again with the same checkpoint, items already done, or that failed with a
+    permanent error (such as `InsufficientQualityError`), are skipped, and only
+    items that failed with a retryable error (such as `ServerError`) are tried
+    again.
+    """
+
+    def __init__(
+            self,
+            client: DaspeakClient,
+            checkpoint: str | Path,
+            max_workers: int = 8,
+            max_attempts: int = 3,
+            backoff: float = 1.0,
+    ) -> None:
+        """Create the BatchJob class.
+
+        Args:
+            client: The client used to process the items
+            checkpoint: The path of the checkpoint database
+            max_workers: The number of items processed concurrently
+            max_attempts: The number of times an item is tried in a run before it is
+                left as retryable for the next run
+            backoff: The seconds to wait before the first retry, doubled on each retry
+
+        """
+        if max_attempts < 1:
+            error = "max_attempts must be at least 1"
+            raise ValueError(error)
+        self._client = client
+        self._checkpoint = Checkpoint(checkpoint)
+        self._max_workers = max_workers
+        self._max_attempts = max_attempts
+        self._backoff = backoff
+
+    @property
+    def checkpoint(self) -> Checkpoint:
+        """Return the checkpoint of the job."""
+        return self._checkpoint
+
+    def run(
+            self,
+            items: Iterable[tuple[str, BaseModel]],
+            on_result: Callable[[str, BaseModel | Exception], None] | None = None,
+    ) -> BatchSummary:
+        """Process the items that are not finished yet.
+
+        The items are read lazily, and at most `max_workers` of them are in
+        flight at any time. `on_result` is called with the final output, or
+        exception, of each processed item before it is marked in the checkpoint,
+        so results are delivered at least once.
+
+        Args:
+            items: The `(item_id, input)` pairs to process. The inputs are
+                `GenerateCredentialInput` or any of the compare inputs
+            on_result: A callable receiving the id and the output (or exception) of each item
+
+        Returns:
+            The counters of the run
+
+        """
+        summary = BatchSummary()
+
+        def unfinished() -> Iterator[tuple[str, BaseModel]]:
+            for item_id, data_model in items:
+                if self._checkpoint.status(item_id) in (ItemStatus.DONE, ItemStatus.FAILED):
+                    summary.skipped += 1
+                    continue
+                yield item_id, data_model
+
+        for item_id, result in iter_as_completed(self._process, unfinished(), self._max_workers):
+            if on_result is not None:
+                on_result(item_id, result)
+            if not isinstance(result, Exception):
+                status = ItemStatus.DONE
+                summary.succeeded += 1
+            elif isinstance(result, (*RETRYABLE_ERRORS, AuthorizationError)):
+                # An expired or rotated API key is not caused by the item, so it is tried again on the next run
+                status = ItemStatus.RETRYABLE
+                summary.retryable += 1
+            else:
+                status = ItemStatus.FAILED
+                summary.failed += 1
+            error = f"{type(result).__name__}: {result}" if status != ItemStatus.DONE else None
+            self._checkpoint.mark(item_id, status, self._checkpoint.runs(item_id) + 1, error)
+
+        logger.info("Batch job run finished", **summary.model_dump())
+        return summary
+
+    def _process(self, data_model: BaseModel) -> BaseModel:
+        """Process an input, retrying retryable errors with exponential backoff."""
+        is_generate = isinstance(data_model, GenerateCredentialInput)
+        func = self._client.generate_credential if is_generate else self._client.compare
+        for attempt in range(self._max_attempts):
+            try:
+                return func(data_model)
+            except RETRYABLE_ERRORS:    # noqa: PERF203
+                if attempt == self._max_attempts - 1:
+                    raise
+                time.sleep(self._backoff * 2 ** attempt)
+        error = "unreachable"
+        raise AssertionError(error)
+
+    def close(self) -> None:
+        """Close the checkpoint."""
+        self._checkpoint.close()
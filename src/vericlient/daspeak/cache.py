@@ -0,0 +1,168 @@
+"""Persistent cache of the results of the Daspeak API."""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from vericlient import forking
+from vericlient.daspeak import models
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS results ("
+    "key TEXT PRIMARY KEY, kind TEXT NOT NULL, value TEXT NOT NULL, "
+    "size INTEGER NOT NULL, last_access REAL NOT NULL) WITHOUT ROWID"
+)
+_INDEX = "CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)"
+_USAGE = (
+    "CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);"
+    "INSERT OR IGNORE INTO usage (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM results;"
+    "CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results "
+    "BEGIN UPDATE usage SET total = total + new.size; END;"
+    "CREATE TRIGGER IF NOT EXISTS results_update AFTER UPDATE OF size ON results "
+    "BEGIN UPDATE usage SET total = total + new.size - old.size; END;"
+    "CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results "
+    "BEGIN UPDATE usage SET total = total - old.size; END;"
+)
+_UPSERT = (
+    "INSERT INTO results (key, kind, value, size, last_access) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET kind = excluded.kind, value = excluded.value, "
+    "size = excluded.size, last_access = excluded.last_access"
+)
+_TOUCH = "UPDATE results SET last_access = MAX(last_access, ?) WHERE key = ?"
+_MAX_PENDING_TOUCHES = 256
+
+
+class ResultCache:
+    """Cache the outputs of `generate_credential` and `compare` in a SQLite database.
+
+    Outputs are keyed by the fingerprint of their input: the content of the
+    audios plus every other field, such as the model hash and the calibration.
+    The cache survives restarts and can be shared by several processes. When it
+    grows beyond `max_bytes`, the least recently used results are evicted.
+    Errors are never cached.
+
+    The total size is kept up to date by the database on every write, so a
+    `put` only looks for results to evict when the limit is exceeded. The
+    accesses of the hits are recorded in memory and written in batches, on the
+    next `put`, every `_MAX_PENDING_TOUCHES` hits and on `close`.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int = 256 * 1024 * 1024, timeout: float = 30.0) -> None:
+        """Create the ResultCache class.
+
+        Args:
+            path: The path of the SQLite database, created if it does not exist
+            max_bytes: The maximum size of the cached results
+            timeout: The seconds to wait for the database while another process writes to it
+
+        """
+        self._path = str(path)
+        self._timeout = timeout
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self._path, timeout=timeout, check_same_thread=False)
+        self._hits = 0
+        self._misses = 0
+        self._touches: dict[str, float] = {}
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(_SCHEMA)
+            self._connection.execute(_INDEX)
+            self._connection.commit()
+            self._connection.executescript(_USAGE)
+        forking.track(self)
+
+    @property
+    def hits(self) -> int:
+        """Return the number of lookups found in the cache by this instance."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Return the number of lookups not found in the cache by this instance."""
+        return self._misses
+
+    def get(self, key: str) -> BaseModel | None:
+        """Return the output cached for a key, or None if it is not cached."""
+        with self._lock:
+            row = self._connection.execute("SELECT kind, value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._touches[key] = time.time()
+            if len(self._touches) >= _MAX_PENDING_TOUCHES:
+                self._flush_touches()
+                self._connection.commit()
+        kind, value = row
+        return getattr(models, kind).model_validate(json.loads(value))
+
+    def put(self, key: str, output: BaseModel) -> None:
+        """Cache the output of a call, evicting the least recently used ones if needed."""
+        value = output.model_dump_json()
+        with self._lock:
+            self._flush_touches()
+            self._connection.execute(_UPSERT, (key, type(output).__name__, value, len(value), time.time()))
+            excess = self._total_size() - self._max_bytes
+            if excess > 0:
+                self._evict(excess)
+            self._connection.commit()
+
+    def size(self) -> int:
+        """Return the size in bytes of the cached results."""
+        with self._lock:
+            return self._total_size()
+
+    def __len__(self) -> int:
+        """Return the number of cached results."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove every cached result."""
+        with self._lock:
+            self._touches.clear()
+            self._connection.execute("DELETE FROM results")
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Write the pending accesses and close the database."""
+        with self._lock:
+            self._flush_touches()
+            self._connection.commit()
+            self._connection.close()
+
+    def _total_size(self) -> int:
+        return self._connection.execute("SELECT total FROM usage").fetchone()[0]
+
+    def _flush_touches(self) -> None:
+        if self._touches:
+            self._connection.executemany(_TOUCH, [(at, key) for key, at in self._touches.items()])
+            self._touches.clear()
+
+    def _evict(self, excess: int) -> None:
+        """Delete the least recently used results until `excess` bytes are freed."""
+        evicted = []
+        rows = self._connection.execute("SELECT key, size FROM results ORDER BY last_access")
+        for key, size in rows:
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        rows.close()
+        self._connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def _after_fork(self) -> None:
+        """Open a new connection to the database, since SQLite connections must not cross a fork.
+
+        The inherited connection is kept open, as closing it could checkpoint the
+        database under the parent.
+        """
+        self._lock = threading.Lock()
+        self._touches = {}
+        self._inherited_connection = self._connection
+        self._connection = sqlite3.connect(self._path, timeout=self._timeout, check_same_thread=False)
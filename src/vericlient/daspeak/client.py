@@ -1,10 +1,16 @@
 """Implementation of the client for the DASPEaK service."""
 import json
+from collections.abc import Callable, Hashable, Iterable, Iterator
 
+from pydantic import BaseModel
 from requests.models import Response
 
 from vericlient.apis import APIs
+from vericlient.audio import audio_source
 from vericlient.client import Client
+from vericlient.compression import RequestCompression
+from vericlient.concurrency import iter_as_completed
+from vericlient.daspeak.cache import ResultCache
 from vericlient.daspeak.endpoints import DaspeakEndpoints
 from vericlient.daspeak.exceptions import (
     AudioDurationTooLongError,
@@ -18,6 +24,7 @@ from vericlient.daspeak.exceptions import (
     UnsupportedSampleRateError,
     VeriClientError,
 )
+from vericlient.daspeak.fingerprint import fingerprint
 from vericlient.daspeak.models import (
     CompareAudio2AudioInput,
     CompareAudio2AudioOutput,
@@ -34,7 +41,14 @@ from vericlient.daspeak.models import (
     GenerateCredentialOutput,
     ModelsOutput,
 )
+from vericlient.daspeak.store import CredentialStore
 from vericlient.exceptions import InvalidCredentialError, UnsupportedMediaTypeError
+from vericlient.http_cache import HttpCache
+from vericlient.pool import ConnectionRegistry
+from vericlient.singleflight import SingleFlight
+from vericlient.slowlog import SlowRequestLog
+from vericlient.timeouts import TimeoutPolicy
+from vericlient.transports import Transport
 
 
 class DaspeakClient(Client):
@@ -43,21 +57,46 @@ class DaspeakClient(Client):
     def __init__(
             self,
             apikey: str | None = None,
-            timeout: int | None = None,
+            timeout: float | tuple[float, float] | TimeoutPolicy | None = None,
             environment: str | None = None,
             location: str | None = None,
             url: str | None = None,
             headers: dict | None = None,
+            coalesce_requests: bool = False,    # noqa: FBT001, FBT002
+            credential_store: CredentialStore | None = None,
+            cache: ResultCache | None = None,
+            transport: Transport | None = None,
+            http_cache: HttpCache | None = None,
+            compression: RequestCompression | None = None,
+            connection_registry: ConnectionRegistry | None = None,
+            slow_request_log: SlowRequestLog | None = None,
     ) -> None:
         """Create the DaspeakClient class.
 
         Args:
             apikey: The API key to use
-            timeout: The timeout to use in the requests
+            timeout: The timeout to use in the requests. It can be a number of seconds,
+                a `(connect, read)` tuple or a `TimeoutPolicy`
             environment: The environment to use
             location: The location to use
             url: The URL to use in case of a custom target
             headers: The headers to be used in the requests
+            coalesce_requests: Whether concurrent `generate_credential` and `compare` calls
+                with identical inputs share a single request to the service, and its result
+            credential_store: The store of the galleries that identification inputs can
+                reference by name
+            cache: The persistent cache of the outputs of `generate_credential` and `compare`.
+                Identical inputs are served from it instead of calling the service
+            transport: The transport sending the requests, a `RequestsTransport` over
+                HTTP/1.1 by default. Use an `Http2Transport` to multiplex them over HTTP/2
+            http_cache: The cache of the GET responses, such as the models. Fresh responses
+                are served from it and stale ones are revalidated with conditional requests
+            compression: The compression of the request bodies above a size threshold, such as
+                large credential lists. Disabled by default
+            connection_registry: The registry of connection pools shared with other clients of the
+                same host. Ignored if a `transport` is given
+            slow_request_log: The detector of the slow requests, logged with the details of their
+                payload and phases. Disabled by default
 
         """
         api = APIs.DASPEAK.value
@@ -69,6 +108,11 @@ class DaspeakClient(Client):
             location=location,
             url=url,
             headers=headers,
+            transport=transport,
+            http_cache=http_cache,
+            compression=compression,
+            connection_registry=connection_registry,
+            slow_request_log=slow_request_log,
         )
         self._exceptions = [
             "AudioInputException",
@@ -103,15 +147,25 @@ class DaspeakClient(Client):
             "sample rate": UnsupportedSampleRateError,
             "duration is longer": AudioDurationTooLongError,
         }
+        self._single_flight = SingleFlight() if coalesce_requests else None
+        self._credential_store = credential_store
+        self._cache = cache
+
+    @property
+    def credential_store(self) -> CredentialStore | None:
+        """Return the store of the galleries that identification inputs can reference."""
+        return self._credential_store
 
     def alive(self) -> bool:
         """Check if the service is alive.
 
+        The check always reaches the service, even with an `http_cache`.
+
         Returns
             bool: True if the service is alive, False otherwise
 
         """
-        response = self._get(endpoint=DaspeakEndpoints.ALIVE.value)
+        response = self._get(endpoint=DaspeakEndpoints.ALIVE.value, cached=False)
         accepted_status_code = 200
         return response.status_code == accepted_status_code
 
@@ -181,6 +235,9 @@ class DaspeakClient(Client):
             UnsupportedMediaTypeError: If the media type is not supported
 
         """
+        return self._call(data_model, self._generate_credential)
+
+    def _generate_credential(self, data_model: GenerateCredentialInput) -> GenerateCredentialOutput:
         endpoint = DaspeakEndpoints.MODELS_HASH_CREDENTIAL_AUDIO.value.replace("<hash>", data_model.hash)
         audio = self._get_virtual_audio_file(data_model.audio)
         files = {
@@ -224,12 +281,95 @@ class DaspeakClient(Client):
             UnsupportedMediaTypeError: If the media type is not supported
 
         """
-        try:
-            func = self._compare_functions_map.get(type(data_model))
-            return func(data_model)
-        except AttributeError as e:
+        func = self._compare_functions_map.get(type(data_model))
+        if func is None:
             error = "data_model must be an instance of CompareInput"
-            raise TypeError(error) from e
+            raise TypeError(error)
+        return self._call(data_model, func)
+
+    def iter_generate_credentials(
+            self,
+            inputs: Iterable[GenerateCredentialInput | tuple[Hashable, GenerateCredentialInput]],
+            max_in_flight: int = 8,
+    ) -> Iterator[tuple[Hashable, GenerateCredentialOutput | Exception]]:
+        """Generate credentials for a stream of inputs, yielding each result as soon as it arrives.
+
+        The inputs are pulled lazily and at most `max_in_flight` requests are
+        sent concurrently, so memory stays flat no matter how long the stream is.
+
+        Args:
+            inputs: The inputs to generate the credentials with. Each one can be
+                paired with an id as an `(input_id, input)` tuple; otherwise, its
+                position in the stream is used as id
+            max_in_flight: The maximum number of requests sent concurrently
+
+        Yields:
+            `(input_id, output)` pairs in completion order. If a request fails,
+            its exception is yielded instead of the output
+
+        Raises:
+            ValueError: If `max_in_flight` is lower than 1
+
+        """
+        return iter_as_completed(self.generate_credential, self._with_ids(inputs), max_in_flight)
+
+    def iter_compare(
+            self,
+            inputs: Iterable[CompareInput | tuple[Hashable, CompareInput]],
+            max_in_flight: int = 8,
+    ) -> Iterator[tuple[Hashable, BaseModel | Exception]]:
+        """Compare a stream of inputs, yielding each result as soon as it arrives.
+
+        The inputs are pulled lazily and at most `max_in_flight` requests are
+        sent concurrently, so memory stays flat no matter how long the stream is.
+
+        Args:
+            inputs: The compare inputs, of any of the types accepted by `compare`.
+                Each one can be paired with an id as an `(input_id, input)` tuple;
+                otherwise, its position in the stream is used as id
+            max_in_flight: The maximum number of requests sent concurrently
+
+        Yields:
+            `(input_id, output)` pairs in completion order. If a request fails,
+            its exception is yielded instead of the output
+
+        Raises:
+            ValueError: If `max_in_flight` is lower than 1
+
+        """
+        return iter_as_completed(self.compare, self._with_ids(inputs), max_in_flight)
+
+    def _with_ids(self, inputs: Iterable[BaseModel | tuple[Hashable, BaseModel]]) -> Iterator[tuple[Hashable, BaseModel]]:
+        for index, item in enumerate(inputs):
+            yield item if isinstance(item, tuple) else (index, item)
+
+    def _call(self, data_model: BaseModel, func: Callable[[BaseModel], BaseModel]) -> BaseModel:
+        """Call `func`, serving it from the cache and sharing it with identical concurrent calls if enabled."""
+        if self._single_flight is None and self._cache is None:
+            return func(data_model)
+        key = self._cache_key(data_model)
+        if self._cache is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        def call() -> BaseModel:
+            output = func(data_model)
+            if self._cache is not None:
+                self._cache.put(key, output)
+            return output
+
+        if self._single_flight is None:
+            return call()
+        return self._single_flight.do(key, call)
+
+    def _cache_key(self, data_model: BaseModel) -> str:
+        """Return the fingerprint of an input, including the content of the gallery it references."""
+        key = fingerprint(data_model)
+        gallery = getattr(data_model, "gallery", None)
+        if gallery is not None and self._credential_store is not None:
+            key += ":" + self._credential_store.digest(gallery)
+        return key
 
     def _compare_credential2audio(
             self,
@@ -322,7 +462,7 @@ class DaspeakClient(Client):
         files = {
             "audio_reference": ("audio_reference", audio, "audio/wav"),
         }
-        credential_list = json.dumps(data_model.credential_list)
+        credential_list = self._credential_list_payload(data_model)
         data = {
             "credential_list": credential_list,
             "channel": data_model.channel,
@@ -336,7 +476,7 @@ class DaspeakClient(Client):
         data_model: CompareCredential2CredentialsInput,
     ) -> CompareCredential2CredentialsOutput:
         endpoint = DaspeakEndpoints.IDENTIFICATION_CREDENTIAL2CREDENTIALS.value
-        credential_list = json.dumps(data_model.credential_list)
+        credential_list = self._credential_list_payload(data_model)
         data = {
             "credential_reference": data_model.credential_reference,
             "credential_list": credential_list,
@@ -345,17 +485,17 @@ class DaspeakClient(Client):
         response = self._post(endpoint=endpoint, data=data)
         return CompareCredential2CredentialsOutput(status_code=response.status_code, **response.json())
 
-    def _get_virtual_audio_file(self, audio_input: object) -> bytes:
-        if isinstance(audio_input, str):
-            try:
-                with open(audio_input, "rb") as f:
-                    audio = f.read()
-            except FileNotFoundError as e:
-                error = f"File {audio_input} not found"
-                raise FileNotFoundError(error) from e
-        elif isinstance(audio_input, bytes):
-            audio = audio_input
-        else:
-            error = "audio must be a string or a bytes object"
-            raise TypeError(error)
-        return audio
+    def _credential_list_payload(
+        self,
+        data_model: CompareAudio2CredentialsInput | CompareCredential2CredentialsInput,
+    ) -> str:
+        if data_model.gallery is None:
+            return json.dumps(data_model.credential_list)
+        if self._credential_store is None:
+            error = "A credential_store is required to compare with a gallery"
+            raise ValueError(error)
+        return self._credential_store.credential_list_payload(data_model.gallery)
+
+    def _get_virtual_audio_file(self, audio_input: object) -> object:
+        """Return the source the audio is uploaded from. Files are not read until the request is sent."""
+        return audio_source(audio_input)
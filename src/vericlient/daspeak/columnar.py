@@ -0,0 +1,124 @@
+"""Columnar view of the scores of an identification."""
+from collections.abc import Sequence
+
+
+def _numpy() -> object:
+    try:
+        import numpy as np
+    except ImportError as e:
+        error = "ScoreTable requires the columnar extra: pip install vericlient[columnar]"
+        raise ImportError(error) from e
+    return np
+
+
+class ScoreTable:
+    """Scores of an identification held in NumPy arrays, sorted once.
+
+    Instead of one dictionary per credential, the ids and the scores are kept
+    in two contiguous arrays, of fixed-width strings and of floats, with the
+    order from the best score to the worst computed once, so `top_k` and
+    `above` do not sort again. The index from id to position is built the first
+    time `score_of` is called.
+
+    It requires the columnar extra: `pip install vericlient[columnar]`.
+    """
+
+    def __init__(self, ids: Sequence[str], scores: Sequence[float]) -> None:
+        """Create the ScoreTable class.
+
+        Args:
+            ids: The ids of the credentials
+            scores: The score of each credential, in the same order as `ids`
+
+        """
+        np = _numpy()
+        if len(ids) != len(scores):
+            error = "ids and scores must have the same length"
+            raise ValueError(error)
+        self._ids = np.asarray(ids, dtype=np.str_)
+        self._scores = np.asarray(scores, dtype=np.float64)
+        self._order = np.argsort(-self._scores, kind="stable")
+        self._sorted_scores = self._scores[self._order]
+        self._index: dict[str, int] | None = None
+        for array in (self._ids, self._scores, self._order, self._sorted_scores):
+            array.flags.writeable = False
+
+    @classmethod
+    def from_scores(cls, scores: list[dict]) -> "ScoreTable":
+        """Create a table from the `scores` of an identification output.
+
+        Args:
+            scores: The dictionaries with the "id" and the "score" of each credential
+
+        Returns:
+            The table of the scores
+
+        """
+        np = _numpy()
+        return cls(
+            [item["id"] for item in scores],
+            np.fromiter((item["score"] for item in scores), dtype=np.float64, count=len(scores)),
+        )
+
+    def __len__(self) -> int:
+        """Return the number of credentials."""
+        return len(self._ids)
+
+    @property
+    def ids(self) -> object:
+        """Return the read-only array of the ids, in the order of the service."""
+        return self._ids
+
+    @property
+    def scores(self) -> object:
+        """Return the read-only array of the scores, in the order of the service."""
+        return self._scores
+
+    @property
+    def order(self) -> object:
+        """Return the positions of the credentials from the best score to the worst."""
+        return self._order
+
+    def top_k(self, k: int) -> list[tuple[str, float]]:
+        """Return the `k` best scores.
+
+        Args:
+            k: The number of scores to return
+
+        Returns:
+            The `(id, score)` pairs, from the best score to the worst
+
+        """
+        positions = self._order[:max(k, 0)]
+        return list(zip(self._ids[positions].tolist(), self._scores[positions].tolist(), strict=True))
+
+    def above(self, threshold: float) -> list[tuple[str, float]]:
+        """Return the scores greater than or equal to a threshold.
+
+        Args:
+            threshold: The minimum score
+
+        Returns:
+            The `(id, score)` pairs, from the best score to the worst
+
+        """
+        np = _numpy()
+        count = int(np.searchsorted(-self._sorted_scores, -threshold, side="right"))
+        return self.top_k(count)
+
+    def score_of(self, id_: str) -> float:
+        """Return the score of a credential.
+
+        Args:
+            id_: The id of the credential
+
+        Returns:
+            The score of the credential
+
+        Raises:
+            KeyError: If there is no credential with that id
+
+        """
+        if self._index is None:
+            self._index = {id_: position for position, id_ in enumerate(self._ids.tolist())}
+        return float(self._scores[self._index[id_]])
@@ -39,6 +39,10 @@ class AudioDurationTooLongError(AudioInputError):
         message = "The audio duration is too long, must be less than 30 seconds"
         super().__init__(message)
 
+    def __reduce__(self) -> tuple:
+        """Rebuild the exception without arguments, so it can be raised in another process."""
+        return type(self), ()
+
 
 class UnsupportedAudioCodecError(AudioInputError):
     """Exception raised for unsupported audio codec."""
@@ -0,0 +1,58 @@
+"""Canonical fingerprints of the inputs of the Daspeak API."""
+import hashlib
+import json
+from contextlib import ExitStack
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from vericlient.audio import audio_source
+
+AUDIO_FIELDS = frozenset({"audio", "audio_reference", "audio_to_evaluate"})
+_CHUNK_SIZE = 1024 * 1024
+
+
+def fingerprint(data_model: BaseModel) -> str:
+    """Return a canonical hash of an input model.
+
+    Audio fields are hashed by content, so the same audio given as a path, a
+    file object or a buffer has the same fingerprint. The rest of the fields are hashed by value.
+
+    Args:
+        data_model: The input model to fingerprint
+
+    Returns:
+        The hexadecimal SHA-256 fingerprint
+
+    """
+    digest = hashlib.sha256(type(data_model).__name__.encode())
+    for name, value in sorted(data_model):
+        digest.update(b"\0" + name.encode() + b"\0")
+        if name in AUDIO_FIELDS:
+            digest.update(audio_digest(value))
+        else:
+            digest.update(json.dumps(value, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def audio_digest(audio: object) -> bytes:
+    """Return the SHA-256 digest of the content of an audio input.
+
+    Files are read in chunks and buffers are hashed in place, so the audio is
+    never fully loaded nor copied. File objects are left at the position they
+    were at.
+    """
+    digest = hashlib.sha256()
+    source = audio_source(audio)
+    if isinstance(source, memoryview):
+        digest.update(source)
+        return digest.digest()
+    with ExitStack() as stack:
+        if isinstance(source, Path):
+            file = stack.enter_context(source.open("rb"))
+        else:
+            file = source
+            stack.callback(file.seek, file.tell())
+        while chunk := file.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.digest()
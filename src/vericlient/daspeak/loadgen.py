@@ -0,0 +1,355 @@
+"""Load generator to measure the throughput a client configuration can sustain."""
+import math
+import random
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import structlog
+from pydantic import BaseModel
+
+from vericlient.daspeak.client import DaspeakClient
+from vericlient.daspeak.models import (
+    CompareAudio2CredentialsInput,
+    CompareCredential2AudioInput,
+    GenerateCredentialInput,
+)
+
+logger = structlog.get_logger(__name__)
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+"""The latency percentiles of the reports."""
+
+OPERATIONS = ("generate_credential", "compare", "identify")
+"""The operations of `daspeak_operations`."""
+
+_GALLERY = "loadgen"
+_MAX_SIGNIFICANT_FIGURES = 5
+
+
+class LatencyHistogram:
+    """Histogram of latencies with a bounded relative error, in the spirit of HDR histograms.
+
+    The values are counted in logarithmic buckets, so any percentile is reported
+    with a relative error below `10 ** -significant_figures` using a fixed
+    amount of memory, no matter how many values are recorded. The minimum,
+    maximum and mean are exact.
+    """
+
+    def __init__(self, lowest: float = 1e-5, highest: float = 3600.0, significant_figures: int = 2) -> None:
+        """Create the LatencyHistogram class.
+
+        Args:
+            lowest: The lowest latency told apart, in seconds. Lower values are counted as this one
+            highest: The highest latency told apart, in seconds. Higher values are counted as this one
+            significant_figures: The number of significant figures kept of each value, from 1 to 5
+
+        """
+        if not 1 <= significant_figures <= _MAX_SIGNIFICANT_FIGURES:
+            error = f"significant_figures must be between 1 and {_MAX_SIGNIFICANT_FIGURES}"
+            raise ValueError(error)
+        if not 0 < lowest < highest:
+            error = "lowest must be greater than 0 and lower than highest"
+            raise ValueError(error)
+        self._lowest = lowest
+        self._log_ratio = math.log1p(10 ** -significant_figures)
+        self._counts = [0] * (self._index(highest) + 1)
+        self._lock = threading.Lock()
+        self._count = 0
+        self._total = 0.0
+        self._min = math.inf
+        self._max = 0.0
+
+    @property
+    def count(self) -> int:
+        """Return the number of values recorded."""
+        return self._count
+
+    @property
+    def min(self) -> float:
+        """Return the lowest value recorded, 0 if there are none."""
+        return self._min if self._count else 0.0
+
+    @property
+    def max(self) -> float:
+        """Return the highest value recorded."""
+        return self._max
+
+    @property
+    def mean(self) -> float:
+        """Return the mean of the values recorded, 0 if there are none."""
+        return self._total / self._count if self._count else 0.0
+
+    def record(self, value: float) -> None:
+        """Record a latency, in seconds."""
+        index = min(self._index(value), len(self._counts) - 1)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._total += value
+            self._min = min(self._min, value)
+            self._max = max(self._max, value)
+
+    def percentile(self, percentile: float) -> float:
+        """Return the value below which a percentage of the recorded values fall.
+
+        Args:
+            percentile: The percentage, from 0 to 100
+
+        Returns:
+            The upper bound of the bucket of the percentile, capped to the maximum
+            recorded. 0 if there are no values
+
+        """
+        with self._lock:
+            if not self._count:
+                return 0.0
+            target = max(1, math.ceil(percentile / 100 * self._count))
+            seen = 0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= target:
+                    return min(self._lowest * math.exp(index * self._log_ratio), self._max)
+            return self._max
+
+    def _index(self, value: float) -> int:
+        if value <= self._lowest:
+            return 0
+        return math.ceil(math.log(value / self._lowest) / self._log_ratio)
+
+
+class LoadReport(BaseModel):
+    """Results of a load run.
+
+    Attributes:
+        requests: The number of calls finished
+        errors: The number of failed calls, by exception class
+        operations: The number of calls, by operation
+        duration: The seconds the run lasted
+        throughput: The calls finished per second
+        latency: The latency percentiles (`p50`, `p90`, `p99`, `p99.9`), `min`, `mean` and `max`, in seconds.
+            With a target rate, latencies count from the moment each call was due, so they
+            include the time calls waited for a free worker
+        cpu_seconds: The CPU time used by the client process
+        cpu_percent: The CPU time used by the client process, relative to the duration
+        max_rss_mb: The peak resident memory of the client process, if the platform reports it
+
+    """
+
+    requests: int
+    errors: dict[str, int]
+    operations: dict[str, int]
+    duration: float
+    throughput: float
+    latency: dict[str, float]
+    cpu_seconds: float
+    cpu_percent: float
+    max_rss_mb: float | None = None
+
+    def format(self) -> str:
+        """Return the report as human readable text."""
+        errors = ", ".join(f"{name}={count}" for name, count in sorted(self.errors.items())) or "none"
+        operations = ", ".join(f"{name}={count}" for name, count in sorted(self.operations.items()))
+        latency = "  ".join(f"{name}={value * 1000:.1f}ms" for name, value in self.latency.items())
+        memory = f"{self.max_rss_mb:.1f} MB" if self.max_rss_mb is not None else "unknown"
+        return (
+            f"requests:   {self.requests} in {self.duration:.1f}s ({self.throughput:.2f}/s)\n"
+            f"operations: {operations}\n"
+            f"errors:     {sum(self.errors.values())} ({errors})\n"
+            f"latency:    {latency}\n"
+            f"client:     cpu={self.cpu_seconds:.2f}s ({self.cpu_percent:.0f}%) max_rss={memory}\n"
+        )
+
+
+class LoadGenerator:
+    """Replay a weighted mix of operations, at a target rate or a fixed concurrency.
+
+    Without a target rate, `concurrency` workers call the operations back to
+    back, which measures the maximum throughput of the configuration. With a
+    target `rps`, the calls are started on a fixed schedule, and each latency
+    is measured from the moment the call was due. A configuration that cannot
+    keep up then shows it in the latency percentiles, instead of silently
+    sending fewer requests.
+    """
+
+    def __init__(
+            self,
+            operations: dict[str, Callable[[], object]],
+            mix: dict[str, float] | None = None,
+            concurrency: int = 8,
+            rps: float | None = None,
+            seed: int | None = None,
+    ) -> None:
+        """Create the LoadGenerator class.
+
+        Args:
+            operations: The callables to replay, by name
+            mix: The relative weight of each operation. By default, all of them are equally likely
+            concurrency: The maximum number of calls in flight
+            rps: The target number of calls started per second. By default, as many as
+                `concurrency` allows
+            seed: The seed of the random choice of the operations
+
+        """
+        mix = mix or dict.fromkeys(operations, 1.0)
+        unknown = set(mix) - set(operations)
+        if unknown:
+            error = f"Unknown operations in the mix: {', '.join(sorted(unknown))}"
+            raise ValueError(error)
+        if concurrency < 1:
+            error = "concurrency must be at least 1"
+            raise ValueError(error)
+        if rps is not None and rps <= 0:
+            error = "rps must be greater than 0"
+            raise ValueError(error)
+        self._operations = operations
+        self._names = [name for name, weight in mix.items() if weight > 0]
+        self._weights = [mix[name] for name in self._names]
+        if not self._names:
+            error = "At least one operation must have a weight greater than 0"
+            raise ValueError(error)
+        self._concurrency = concurrency
+        self._rps = rps
+        self._random = random.Random(seed)  # noqa: S311
+        self._lock = threading.Lock()
+
+    def run(self, duration: float | None = None, requests: int | None = None) -> LoadReport:
+        """Generate load until the duration elapses or the number of calls is reached.
+
+        Args:
+            duration: The seconds to keep starting calls
+            requests: The number of calls to start
+
+        Returns:
+            LoadReport: The throughput, latencies, errors and client resources of the run
+
+        """
+        if duration is None and requests is None:
+            error = "Either duration or requests must be given"
+            raise ValueError(error)
+        histogram = LatencyHistogram()
+        errors: dict[str, int] = {}
+        operations: dict[str, int] = {}
+
+        def call(name: str, due: float) -> None:
+            try:
+                self._operations[name]()
+            except Exception as e:  # noqa: BLE001
+                error = type(e).__name__
+            else:
+                error = None
+            histogram.record(time.perf_counter() - due)
+            with self._lock:
+                operations[name] = operations.get(name, 0) + 1
+                if error is not None:
+                    errors[error] = errors.get(error, 0) + 1
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        deadline = start + duration if duration is not None else math.inf
+        self._drive(self._schedule(start, deadline, requests), call)
+        elapsed = time.perf_counter() - start
+        cpu_seconds = time.process_time() - cpu_start
+        latency = {f"p{percentile:g}": histogram.percentile(percentile) for percentile in PERCENTILES}
+        latency.update({"min": histogram.min, "mean": histogram.mean, "max": histogram.max})
+        report = LoadReport(
+            requests=histogram.count,
+            errors=errors,
+            operations=operations,
+            duration=elapsed,
+            throughput=histogram.count / elapsed if elapsed else 0.0,
+            latency=latency,
+            cpu_seconds=cpu_seconds,
+            cpu_percent=100 * cpu_seconds / elapsed if elapsed else 0.0,
+            max_rss_mb=_max_rss_mb(),
+        )
+        logger.info("Load run finished", requests=report.requests, throughput=report.throughput, **report.latency)
+        return report
+
+    def _drive(self, schedule: Iterator[tuple[str, float]], call: Callable[[str, float], None]) -> None:
+        """Make the calls of the schedule, back to back or when they are due."""
+        if self._rps is None:
+            def worker() -> None:
+                for name, _ in schedule:
+                    call(name, time.perf_counter())
+
+            threads = [threading.Thread(target=worker, name=f"vericlient-loadgen-{i}") for i in range(self._concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return
+        with ThreadPoolExecutor(max_workers=self._concurrency, thread_name_prefix="vericlient-loadgen") as executor:
+            for name, due in schedule:
+                time.sleep(max(0.0, due - time.perf_counter()))
+                executor.submit(call, name, due)
+
+    def _schedule(self, start: float, deadline: float, requests: int | None) -> Iterator[tuple[str, float]]:
+        """Yield the operation and the due time of each call, shared safely by the workers."""
+        lock = threading.Lock()
+        interval = 1 / self._rps if self._rps is not None else 0.0
+        issued = 0
+
+        def next_call() -> tuple[str, float] | None:
+            nonlocal issued
+            with lock:
+                due = start + issued * interval
+                if (requests is not None and issued >= requests) or max(due, time.perf_counter()) >= deadline:
+                    return None
+                issued += 1
+                return self._random.choices(self._names, self._weights)[0], due
+
+        return iter(next_call, None)
+
+
+def daspeak_operations(
+        client: DaspeakClient,
+        audio: bytes,
+        model: str,
+        calibration: str = "telephone-channel",
+        gallery_size: int = 100,
+) -> dict[str, Callable[[], object]]:
+    """Build the `generate_credential`, `compare` and `identify` operations of a client.
+
+    A credential is generated once from the audio, to compare the audio with it
+    and to fill a gallery of `gallery_size` copies in the `credential_store` of
+    the client to identify the audio against.
+
+    Args:
+        client: The client to load. It needs a `credential_store` for `identify`
+        audio: The WAV audio sent by every operation
+        model: The hash of the biometrics model
+        calibration: The calibration of the comparisons
+        gallery_size: The number of credentials of the identifications
+
+    Returns:
+        The operations, by name
+
+    """
+    generate_input = GenerateCredentialInput(audio=audio, hash=model, calibration=calibration)
+    credential = client.generate_credential(generate_input).credential
+    compare_input = CompareCredential2AudioInput(
+        credential_reference=credential, audio_to_evaluate=audio, calibration=calibration,
+    )
+    operations = {
+        "generate_credential": lambda: client.generate_credential(generate_input),
+        "compare": lambda: client.compare(compare_input),
+    }
+    if client.credential_store is not None:
+        client.credential_store.delete_gallery(_GALLERY)
+        client.credential_store.add_many(_GALLERY, ((f"subject-{i}", credential) for i in range(gallery_size)))
+        identify_input = CompareAudio2CredentialsInput(audio_reference=audio, gallery=_GALLERY, calibration=calibration)
+        operations["identify"] = lambda: client.compare(identify_input)
+    return operations
+
+
+def _max_rss_mb() -> float | None:
+    """Return the peak resident memory of the process in MB, or None if the platform does not report it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024 / 1024 if sys.platform == "darwin" else max_rss / 1024
@@ -1,7 +1,25 @@
 """Module to define the models for the Daspeak API."""
 # ruff: noqa: N805, D102, ANN201
+from functools import cached_property
+from typing import Annotated
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, BeforeValidator, SkipValidation, field_validator, model_validator
+
+from vericlient.audio import AudioInput, validate_audio
+from vericlient.daspeak.columnar import ScoreTable
+
+
+def _check_scores(value: object) -> object:
+    if not isinstance(value, list):
+        error = "scores must be a list"
+        raise ValueError(error)  # noqa: TRY004
+    return value
+
+
+Scores = Annotated[list[dict], SkipValidation(), BeforeValidator(_check_scores)]
+"""The `scores` of an identification. The list parsed from the response is kept as
+it is, without validating or copying each of its rows, since galleries can hold
+millions of credentials. `score_table()` builds its columns straight from it."""
 
 
 class DaspeakResponse(BaseModel):
@@ -33,25 +51,23 @@ class GenerateCredentialInput(BaseModel):
 
     Attributes:
         audio: The audio to generate the credential with.
-            It can be a path to a file or a bytes object
-            with the audio content
+            It can be a path, a binary file object or a bytes-like object
+            (`bytes`, `bytearray`, `memoryview` or a NumPy array) with the content
+            of the WAV file. It is only read when the request is sent
         hash: The hash of the biometrics model to use
         channel: The `nchannel` of the audio if it is stereo
         calibration: The calibration to use
 
     """
 
-    audio: str | bytes
+    audio: AudioInput
     hash: str
     channel: int = 1
     calibration: str = "telephone-channel"
 
-    @field_validator("audio")
-    def must_be_str_or_bytes(cls, value: object):
-        if not isinstance(value, (str, bytes)):
-            error = "audio must be a string or a bytes object"
-            raise TypeError(error)
-        return value
+    @field_validator("audio", mode="plain")
+    def must_be_audio(cls, value: object):
+        return validate_audio(value)
 
     class Config:
         arbitrary_types_allowed = True
@@ -150,22 +166,20 @@ class CompareCredential2AudioInput(CompareInput):
     Attributes:
         credential_reference: The reference credential
         audio_to_evaluate: The audio to evaluate.
-            It can be a path to a file or a bytes object
-            with the audio content
+            It can be a path, a binary file object or a bytes-like object
+            (`bytes`, `bytearray`, `memoryview` or a NumPy array) with the content
+            of the WAV file. It is only read when the request is sent
         channel: The `nchannel` of the audio if it is stereo
 
     """
 
     credential_reference: str
-    audio_to_evaluate: str | bytes
+    audio_to_evaluate: AudioInput
     channel: int = 1
 
-    @field_validator("audio_to_evaluate")
-    def must_be_str_or_bytes(cls, value: object):
-        if not isinstance(value, (str, bytes)):
-            error = "audio must be a string or a bytes object"
-            raise TypeError(error)
-        return value
+    @field_validator("audio_to_evaluate", mode="plain")
+    def must_be_audio(cls, value: object):
+        return validate_audio(value)
 
     class Config:
         arbitrary_types_allowed = True
@@ -199,27 +213,26 @@ class CompareAudio2AudioInput(CompareInput):
 
     Attributes:
         audio_reference: The reference audio.
-            It can be a path to a file or a bytes object
-            with the audio content
+            It can be a path, a binary file object or a bytes-like object
+            (`bytes`, `bytearray`, `memoryview` or a NumPy array) with the content
+            of the WAV file. It is only read when the request is sent
         audio_to_evaluate: The audio to evaluate.
-            It can be a path to a file or a bytes object
-            with the audio content
+            It can be a path, a binary file object or a bytes-like object
+            (`bytes`, `bytearray`, `memoryview` or a NumPy array) with the content
+            of the WAV file. It is only read when the request is sent
         channel_reference: The `nchannel` of the reference audio if it is stereo
         channel_to_evaluate: The `nchannel` of the audio to evaluate if it is stereo
 
     """
 
-    audio_reference: str | bytes
-    audio_to_evaluate: str | bytes
+    audio_reference: AudioInput
+    audio_to_evaluate: AudioInput
     channel_reference: int = 1
     channel_to_evaluate: int = 1
 
-    @field_validator("audio_reference", "audio_to_evaluate")
-    def audio_ref_must_be_str_or_bytes(cls, value: object):
-        if not isinstance(value, (str, bytes)):
-            error = "audio must be a string or a bytes object"
-            raise TypeError(error)
-        return value
+    @field_validator("audio_reference", "audio_to_evaluate", mode="plain")
+    def must_be_audio(cls, value: object):
+        return validate_audio(value)
 
     class Config:
         arbitrary_types_allowed = True
@@ -259,27 +272,30 @@ class CompareAudio2CredentialsInput(CompareInput):
 
     Attributes:
         audio_reference: The audio to evaluate.
-            It can be a path to a file or a bytes object
-            with the audio content
+            It can be a path, a binary file object or a bytes-like object
+            (`bytes`, `bytearray`, `memoryview` or a NumPy array) with the content
+            of the WAV file. It is only read when the request is sent
         credential_list: The credentials to compare the audio with.
             The list contains touples with two strings: the id and the credential
+        gallery: The name of a gallery of the client `credential_store` to compare
+            the audio with, instead of the `credential_list`
         channel: The `nchannel` of the audio if it is stereo
 
     """
 
-    audio_reference: str | bytes
-    credential_list: list[tuple[str, str]]
+    audio_reference: AudioInput
+    credential_list: list[tuple[str, str]] | None = None
+    gallery: str | None = None
     channel: int = 1
 
-    @field_validator("audio_reference")
-    def must_be_str_or_bytes(cls, value: object):
-        if not isinstance(value, (str, bytes)):
-            error = "audio must be a string or a bytes object"
-            raise TypeError(error)
-        return value
+    @field_validator("audio_reference", mode="plain")
+    def must_be_audio(cls, value: object):
+        return validate_audio(value)
 
     @field_validator("credential_list")
-    def validate_and_build_list_format(cls, value: list):
+    def validate_and_build_list_format(cls, value: list | None):
+        if value is None:
+            return value
         if not value:
             error = "credential_list must not be empty"
             raise ValueError(error)
@@ -292,6 +308,13 @@ class CompareAudio2CredentialsInput(CompareInput):
                 raise ValueError(error)
         return [{"id": item[0], "credential": item[1]} for item in value]
 
+    @model_validator(mode="after")
+    def list_or_gallery(self):
+        if (self.credential_list is None) == (self.gallery is None):
+            error = "exactly one of credential_list or gallery must be given"
+            raise ValueError(error)
+        return self
+
     class Config:
         arbitrary_types_allowed = True
 
@@ -313,7 +336,7 @@ class CompareAudio2CredentialsOutput(DaspeakResponse):
     """
 
     result: dict
-    scores: list[dict]
+    scores: Scores
     calibration: str
     model: ModelMetadata
     authenticity_reference: float
@@ -324,6 +347,18 @@ class CompareAudio2CredentialsOutput(DaspeakResponse):
     def round_value(cls, value: float) -> float:
         return round(value, 3)
 
+    def score_table(self) -> ScoreTable:
+        """Return the scores as a columnar `ScoreTable`, sorted once for top-k queries and lookups by id.
+
+        The table is built on the first call, from the rows of the response, and
+        returned again by the next ones.
+        """
+        return self._score_table
+
+    @cached_property
+    def _score_table(self) -> ScoreTable:
+        return ScoreTable.from_scores(self.scores)
+
 
 class CompareCredential2CredentialsInput(CompareInput):
     """Input class for the identification credential to credentials endpoint.
@@ -332,14 +367,19 @@ class CompareCredential2CredentialsInput(CompareInput):
         credential_reference: The reference credential
         credential_list: The credentials to compare the audio with.
             The list contains touples with two strings: the id and the credential
+        gallery: The name of a gallery of the client `credential_store` to compare
+            the credential with, instead of the `credential_list`
 
     """
 
     credential_reference: str
-    credential_list: list[tuple[str, str]]
+    credential_list: list[tuple[str, str]] | None = None
+    gallery: str | None = None
 
     @field_validator("credential_list")
-    def validate_and_build_list_format(cls, value: list):
+    def validate_and_build_list_format(cls, value: list | None):
+        if value is None:
+            return value
         if not value:
             error = "credential_list must not be empty"
             raise ValueError(error)
@@ -352,6 +392,13 @@ class CompareCredential2CredentialsInput(CompareInput):
                 raise ValueError(error)
         return [{"id": item[0], "credential": item[1]} for item in value]
 
+    @model_validator(mode="after")
+    def list_or_gallery(self):
+        if (self.credential_list is None) == (self.gallery is None):
+            error = "exactly one of credential_list or gallery must be given"
+            raise ValueError(error)
+        return self
+
 
 class CompareCredential2CredentialsOutput(DaspeakResponse):
     """Output class for the identification credential to credentials endpoint.
@@ -367,5 +414,17 @@ class CompareCredential2CredentialsOutput(DaspeakResponse):
     """
 
     result: dict
-    scores: list[dict]
+    scores: Scores
     calibration: str
+
+    def score_table(self) -> ScoreTable:
+        """Return the scores as a columnar `ScoreTable`, sorted once for top-k queries and lookups by id.
+
+        The table is built on the first call, from the rows of the response, and
+        returned again by the next ones.
+        """
+        return self._score_table
+
+    @cached_property
+    def _score_table(self) -> ScoreTable:
+        return ScoreTable.from_scores(self.scores)
@@ -0,0 +1,152 @@
+"""Pipeline to prepare Daspeak inputs in processes and send them from threads."""
+import itertools
+from collections.abc import Hashable, Iterable, Iterator
+from multiprocessing.context import BaseContext
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from vericlient.audio import audio_header, audio_source, wav_duration
+from vericlient.daspeak.client import DaspeakClient
+from vericlient.daspeak.exceptions import AudioDurationTooLongError
+from vericlient.daspeak.fingerprint import AUDIO_FIELDS
+from vericlient.daspeak.models import GenerateCredentialInput
+from vericlient.pipeline import Pipeline
+
+MAX_AUDIO_DURATION = 30
+"""Maximum duration, in seconds, of the audios accepted by the service."""
+
+
+def audio_headers(data_model: BaseModel) -> dict[str, str | bytes]:
+    """Return what the preparation process needs from the audios of an input.
+
+    Audio paths are returned as paths, and only the first bytes of the other
+    audios are copied, so the audio content never crosses the process boundary
+    and in-memory audios are uploaded later without being copied.
+
+    Args:
+        data_model: A `GenerateCredentialInput` or any of the compare inputs
+
+    Returns:
+        The path or the header of each audio, by field name
+
+    """
+    headers = {}
+    for name in AUDIO_FIELDS:
+        audio = getattr(data_model, name, None)
+        if audio is None:
+            continue
+        headers[name] = str(audio) if isinstance(audio, (str, Path)) else bytes(audio_header(audio_source(audio)))
+    return headers
+
+
+def prepare_input(headers: dict[str, str | bytes]) -> None:
+    """Validate the WAV headers returned by `audio_headers`.
+
+    Only the header of each audio is read. Audios longer than the service
+    accepts are rejected here, before paying for their upload.
+
+    Args:
+        headers: The path or the header of each audio, by field name
+
+    Raises:
+        FileNotFoundError: If an audio path does not exist
+        AudioDurationTooLongError: If an audio is longer than `MAX_AUDIO_DURATION` seconds
+
+    """
+    for header in headers.values():
+        content = audio_header(audio_source(header)) if isinstance(header, str) else header
+        duration = wav_duration(content)
+        if duration is not None and duration > MAX_AUDIO_DURATION:
+            raise AudioDurationTooLongError
+
+
+def _prepare(item: tuple[int, dict[str, str | bytes]]) -> int:
+    token, headers = item
+    prepare_input(headers)
+    return token
+
+
+class DaspeakPipeline(Pipeline):
+    """Pipeline that prepares Daspeak inputs in a process pool and sends them from a thread pool.
+
+    Only the paths or the headers of the audios, taken with `audio_headers`, are
+    sent to the processes and validated with `prepare_input`. The inputs stay in
+    this process until they are sent with `generate_credential` or `compare`,
+    depending on their type.
+    """
+
+    def __init__(
+            self,
+            client: DaspeakClient,
+            processes: int | None = None,
+            threads: int = 8,
+            queue_size: int | None = None,
+            mp_context: BaseContext | None = None,
+    ) -> None:
+        """Create the DaspeakPipeline class.
+
+        Args:
+            client: The client used to send the inputs
+            processes: The number of preparation processes, the number of CPUs by default
+            threads: The number of upload threads
+            queue_size: The maximum number of prepared inputs waiting to be sent,
+                twice the number of threads by default
+            mp_context: The `multiprocessing` context the processes are started with,
+                `default_mp_context()` by default
+
+        """
+        self._client = client
+        self._tokens = itertools.count()
+        self._inputs: dict[int, tuple[Hashable, BaseModel]] = {}
+        super().__init__(
+            _prepare, self._send, processes=processes, threads=threads, queue_size=queue_size, mp_context=mp_context,
+        )
+
+    def run(self, items: Iterable[tuple[Hashable, BaseModel]]) -> Iterator[tuple[Hashable, BaseModel | Exception]]:
+        """Prepare and send every input, yielding the outputs as they complete.
+
+        Args:
+            items: The `(input_id, input)` pairs to process. They are pulled lazily
+
+        Yields:
+            `(input_id, output)` pairs in completion order. If the preparation or the
+            request of an input raised, the exception is yielded instead of the output
+
+        """
+        tokens: set[int] = set()
+        return self._results(super().run(self._register(items, tokens)), tokens)
+
+    def _register(
+            self,
+            items: Iterable[tuple[Hashable, BaseModel]],
+            tokens: set[int],
+    ) -> Iterator[tuple[int, tuple[int, dict[str, str | bytes]]]]:
+        """Keep each input in this process under a unique token, handing out only its audio headers."""
+        for input_id, data_model in items:
+            token = next(self._tokens)
+            tokens.add(token)
+            self._inputs[token] = (input_id, data_model)
+            yield token, (token, audio_headers(data_model))
+
+    def _results(
+            self,
+            results: Iterator[tuple[int, BaseModel | Exception]],
+            tokens: set[int],
+    ) -> Iterator[tuple[Hashable, BaseModel | Exception]]:
+        """Map the results back to the ids of the inputs, forgetting the inputs of the run when it ends."""
+        try:
+            for token, output in results:
+                tokens.discard(token)
+                input_id, _ = self._inputs.pop(token)
+                yield input_id, output
+        finally:
+            results.close()
+            for token in tokens:
+                self._inputs.pop(token, None)
+
+    def _send(self, token: int) -> BaseModel:
+        _, data_model = self._inputs[token]
+        if isinstance(data_model, GenerateCredentialInput):
+            return self._client.generate_credential(data_model)
+        return self._client.compare(data_model)
@@ -0,0 +1,225 @@
+"""Local store of credentials grouped in named galleries, used for identification."""
+import hashlib
+import json
+import sqlite3
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+
+from vericlient import forking
+from vericlient.daspeak.models import GenerateCredentialOutput
+
+
+class CredentialStore:
+    """Store credentials in named galleries backed by SQLite.
+
+    The store keeps, per gallery, the `credential_list` already serialized in
+    the format sent to the identification endpoints. Identification inputs can
+    reference a gallery by name, and the client sends that cached payload
+    directly, without validating or serializing the list on every request. The
+    cache is invalidated whenever the gallery changes, also from another process
+    sharing the database.
+    """
+
+    def __init__(self, path: str | Path = ":memory:") -> None:
+        """Create the CredentialStore class.
+
+        Args:
+            path: The path of the SQLite database, created if it does not exist.
+                By default, the store lives in memory
+
+        """
+        self._path = str(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self._path, check_same_thread=False)
+        self._payloads: dict[str, tuple[int, str, str]] = {}
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS galleries (name TEXT PRIMARY KEY, version INTEGER NOT NULL)",
+            )
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._connection.execute(
+                "INSERT OR IGNORE INTO meta (key, value) SELECT 'sequence', COALESCE(MAX(version), 0) FROM galleries",
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS credentials ("
+                "gallery TEXT NOT NULL, id TEXT NOT NULL, credential TEXT NOT NULL, model TEXT, "
+                "PRIMARY KEY (gallery, id)) WITHOUT ROWID",
+            )
+            self._connection.commit()
+        forking.track(self)
+
+    def galleries(self) -> list[str]:
+        """Return the names of the galleries in the store."""
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT name FROM galleries ORDER BY name")]
+
+    def version(self, gallery: str) -> int:
+        """Return the version of a gallery, increased every time it changes.
+
+        Versions are taken from a sequence shared by every gallery of the
+        database, so a version is never repeated, even if the gallery is
+        deleted and created again.
+
+        Raises:
+            KeyError: If the gallery does not exist
+
+        """
+        with self._lock:
+            return self._version(gallery)
+
+    def count(self, gallery: str) -> int:
+        """Return the number of credentials in a gallery."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM credentials WHERE gallery = ?", (gallery,)).fetchone()[0]
+
+    def add(self, gallery: str, subject_id: str, credential: str | GenerateCredentialOutput) -> None:
+        """Add a credential to a gallery, replacing the one with the same id if any.
+
+        The gallery is created if it does not exist.
+
+        Args:
+            gallery: The name of the gallery
+            subject_id: The id returned by the identification endpoints when the credential matches
+            credential: The credential, or the output of `generate_credential`
+
+        """
+        self.add_many(gallery, [(subject_id, credential)])
+
+    def add_many(self, gallery: str, items: Iterable[tuple[str, str | GenerateCredentialOutput]]) -> int:
+        """Add many credentials to a gallery in a single transaction.
+
+        Args:
+            gallery: The name of the gallery, created if it does not exist
+            items: `(subject_id, credential)` pairs, where the credential can also be
+                the output of `generate_credential`
+
+        Returns:
+            The number of credentials added
+
+        """
+        rows = []
+        for subject_id, credential in items:
+            if isinstance(credential, GenerateCredentialOutput):
+                rows.append((gallery, subject_id, credential.credential, credential.model.hash))
+            else:
+                rows.append((gallery, subject_id, credential, None))
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO credentials (gallery, id, credential, model) VALUES (?, ?, ?, ?)", rows,
+            )
+            self._touch(gallery)
+            self._connection.commit()
+        return len(rows)
+
+    def get(self, gallery: str, subject_id: str) -> str | None:
+        """Return a credential of a gallery, or None if it is not in the gallery."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT credential FROM credentials WHERE gallery = ? AND id = ?", (gallery, subject_id),
+            ).fetchone()
+        return row[0] if row else None
+
+    def remove(self, gallery: str, subject_id: str) -> bool:
+        """Remove a credential from a gallery.
+
+        Returns:
+            True if the credential was in the gallery, False otherwise
+
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM credentials WHERE gallery = ? AND id = ?", (gallery, subject_id),
+            )
+            if cursor.rowcount:
+                self._touch(gallery)
+            self._connection.commit()
+        return bool(cursor.rowcount)
+
+    def delete_gallery(self, gallery: str) -> None:
+        """Delete a gallery and all its credentials."""
+        with self._lock:
+            self._connection.execute("DELETE FROM credentials WHERE gallery = ?", (gallery,))
+            self._connection.execute("DELETE FROM galleries WHERE name = ?", (gallery,))
+            self._connection.commit()
+            self._payloads.pop(gallery, None)
+
+    def credential_list(self, gallery: str) -> list[tuple[str, str]]:
+        """Return the `(id, credential)` pairs of a gallery.
+
+        The list has the format expected by the `credential_list` field of the
+        identification inputs.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT id, credential FROM credentials WHERE gallery = ? ORDER BY id", (gallery,),
+            ).fetchall()
+
+    def credential_list_payload(self, gallery: str) -> str:
+        """Return the `credential_list` of a gallery serialized as sent to the service.
+
+        The payload is built once per version of the gallery and cached.
+
+        Raises:
+            KeyError: If the gallery does not exist
+
+        """
+        return self._payload(gallery)[1]
+
+    def digest(self, gallery: str) -> str:
+        """Return the SHA-256 of the serialized `credential_list` of a gallery.
+
+        Two galleries with the same credentials have the same digest, even in
+        different stores, so it identifies the content of a gallery in cache keys.
+
+        Raises:
+            KeyError: If the gallery does not exist
+
+        """
+        return self._payload(gallery)[2]
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    def _after_fork(self) -> None:
+        """Open a new connection to the database, since SQLite connections must not cross a fork.
+
+        The inherited connection is kept open, as closing it could checkpoint the
+        database under the parent. An in-memory store is a copy private to the
+        child, so its connection is kept in use.
+        """
+        self._lock = threading.Lock()
+        if self._path != ":memory:":
+            self._inherited_connection = self._connection
+            self._connection = sqlite3.connect(self._path, check_same_thread=False)
+
+    def _payload(self, gallery: str) -> tuple[int, str, str]:
+        with self._lock:
+            version = self._version(gallery)
+            cached = self._payloads.get(gallery)
+            if cached is not None and cached[0] == version:
+                return cached
+            rows = self._connection.execute(
+                "SELECT id, credential FROM credentials WHERE gallery = ? ORDER BY id", (gallery,),
+            ).fetchall()
+            payload = json.dumps([{"id": subject_id, "credential": credential} for subject_id, credential in rows])
+            self._payloads[gallery] = (version, payload, hashlib.sha256(payload.encode()).hexdigest())
+            return self._payloads[gallery]
+
+    def _version(self, gallery: str) -> int:
+        row = self._connection.execute("SELECT version FROM galleries WHERE name = ?", (gallery,)).fetchone()
+        if row is None:
+            error = f"Gallery {gallery} does not exist"
+            raise KeyError(error)
+        return row[0]
+
+    def _touch(self, gallery: str) -> None:
+        self._connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'sequence'")
+        self._connection.execute(
+            "INSERT INTO galleries (name, version) SELECT ?, value FROM meta WHERE key = 'sequence' "
+            "ON CONFLICT(name) DO UPDATE SET version = excluded.version",
+            (gallery,),
+        )
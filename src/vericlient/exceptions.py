@@ -1,4 +1,5 @@
 """General exceptions for the VeriClient package."""
+import requests
 from requests.models import Response
 
 
@@ -39,3 +40,7 @@ class InvalidCredentialError(VeriClientError):
     def __init__(self) -> None:
         message = "The credential/s provided are invalid."
         super().__init__(message)
+
+
+RETRYABLE_ERRORS = (ServerError, requests.ConnectionError, requests.Timeout)
+"""Errors that may succeed if the request is tried again. Any other error is permanent."""
@@ -0,0 +1,95 @@
+"""Recovery of the clients in the child processes of a fork.
+
+Pre-fork servers, such as gunicorn with `--preload`, and `multiprocessing`
+with the `fork` start method create the clients once in the parent process and
+fork the workers from it. The children inherit the open sockets of the
+connection pools, the SQLite connections and the locks of the parent, but not
+its threads. Sharing a socket between processes interleaves their requests and
+corrupts the responses, so after a fork every tracked resource replaces what it
+inherited, and then the hooks registered by each owner run, for example to warm
+the new connections up.
+
+The resources of the package register themselves, and the reset runs from
+`os.register_at_fork` on the platforms that support it. Hooks only run where
+they were registered explicitly, and not in the processes forked inside
+`without_hooks`, such as worker pools that never use the clients.
+"""
+import os
+import threading
+import weakref
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+_lock = threading.Lock()
+_resources: "weakref.WeakSet[object]" = weakref.WeakSet()
+_hooks: "weakref.WeakKeyDictionary[object, list[Callable[[object], None]]]" = weakref.WeakKeyDictionary()
+_local = threading.local()
+
+
+def track(resource: object) -> None:
+    """Reset a resource in every child process after a fork.
+
+    Args:
+        resource: The object to reset. Its `_after_fork` method is called in the child,
+            before any hook runs. It is forgotten once it is garbage collected
+
+    """
+    with _lock:
+        _resources.add(resource)
+
+
+def add_hook(owner: object, hook: Callable[[object], None]) -> None:
+    """Run a callable in every child process after a fork, once the resources are reset.
+
+    Args:
+        owner: The object the hook belongs to. The hook is forgotten once it is
+            garbage collected
+        hook: The callable, called with the owner. It should not hold a reference
+            to the owner itself, or the owner is never garbage collected
+
+    """
+    with _lock:
+        _hooks.setdefault(owner, []).append(hook)
+
+
+@contextmanager
+def without_hooks() -> Iterator[None]:
+    """Skip the hooks in the processes forked by the current thread inside the block.
+
+    The resources are still reset in those processes. It is meant for worker
+    pools that never use the clients, which should not, for example, warm up
+    connections they do not need.
+    """
+    previous = getattr(_local, "skip_hooks", False)
+    _local.skip_hooks = True
+    try:
+        yield
+    finally:
+        _local.skip_hooks = previous
+
+
+def _after_fork_in_child() -> None:
+    global _lock  # noqa: PLW0603
+    _lock = threading.Lock()
+    for resource in list(_resources):
+        resource._after_fork()  # noqa: SLF001
+    if getattr(_local, "skip_hooks", False):
+        return
+    for owner, hooks in list(_hooks.items()):
+        for hook in list(hooks):
+            _run_hook(owner, hook)
+
+
+def _run_hook(owner: object, hook: Callable[[object], None]) -> None:
+    try:
+        hook(owner)
+    except Exception:
+        logger.exception("Fork hook failed", hook=getattr(hook, "__qualname__", repr(hook)))
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,119 @@
+"""Background monitoring of the liveness of the Veridas APIs."""
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+import structlog
+from pydantic import BaseModel
+
+logger = structlog.get_logger(__name__)
+
+
+class HealthStatus(BaseModel):
+    """Last known liveness status of an API.
+
+    Attributes:
+        alive: Whether the last `alive` check succeeded
+        latency: The duration of the last check, in seconds
+        checked_at: When the last check finished (UTC)
+        error: The error raised by the last check, if any
+
+    """
+
+    alive: bool
+    latency: float
+    checked_at: datetime
+    error: str | None = None
+
+
+class HealthMonitor:
+    """Poll an `alive` check on a schedule and cache its last result.
+
+    The check runs in a daemon thread over the client session, so every poll
+    also keeps a pooled connection warm. Reading `status` never performs a
+    request.
+    """
+
+    def __init__(self, check: Callable[[], bool], interval: float = 5.0) -> None:
+        """Create the HealthMonitor class.
+
+        Args:
+            check: The callable that performs the liveness check
+            interval: The number of seconds between two consecutive checks
+
+        """
+        if interval <= 0:
+            error = "interval must be greater than 0"
+            raise ValueError(error)
+        self._check = check
+        self._interval = interval
+        self._status: HealthStatus | None = None
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def interval(self) -> float:
+        """Return the number of seconds between two consecutive checks."""
+        return self._interval
+
+    @property
+    def status(self) -> HealthStatus | None:
+        """Return the last cached status, or None if no check has finished yet."""
+        return self._status
+
+    @property
+    def running(self) -> bool:
+        """Return whether the monitor thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def stopped(self) -> bool:
+        """Return whether the monitor was stopped with `stop`."""
+        return self._stop_event.is_set()
+
+    def start(self) -> None:
+        """Start polling in a background thread. Does nothing if already running."""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="vericlient-health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop polling and wait for the background thread to finish.
+
+        Args:
+            timeout: The maximum number of seconds to wait for the thread
+
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def check_now(self) -> HealthStatus:
+        """Run a check immediately, cache and return its result."""
+        error = None
+        start = time.perf_counter()
+        try:
+            alive = self._check()
+        except Exception as e:  # noqa: BLE001
+            # Any failure, including an unexpected body, makes the API unhealthy instead of stopping the monitor
+            alive = False
+            error = f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - start
+        self._status = HealthStatus(
+            alive=alive,
+            latency=latency,
+            checked_at=datetime.now(timezone.utc),
+            error=error,
+        )
+        if not alive:
+            logger.warning("Health check failed", latency=latency, error=error)
+        return self._status
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self.check_now()
+            self._stop_event.wait(self._interval)
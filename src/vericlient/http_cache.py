@@ -0,0 +1,223 @@
+"""Cache of GET responses following the HTTP caching semantics."""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from vericlient import forking
+
+_AUTH_HEADERS = ("apikey", "authorization", "cookie")
+
+
+class _Entry:
+    """A cached response and the moment it stops being fresh."""
+
+    __slots__ = ("expires_at", "no_cache", "response")
+
+    def __init__(self, response: requests.Response, expires_at: float, no_cache: bool) -> None:  # noqa: FBT001
+        self.response = response
+        self.expires_at = expires_at
+        self.no_cache = no_cache
+
+    @property
+    def fresh(self) -> bool:
+        return not self.no_cache and time.monotonic() < self.expires_at
+
+    @property
+    def validators(self) -> dict:
+        headers = {}
+        if "ETag" in self.response.headers:
+            headers["If-None-Match"] = self.response.headers["ETag"]
+        if "Last-Modified" in self.response.headers:
+            headers["If-Modified-Since"] = self.response.headers["Last-Modified"]
+        return headers
+
+
+class HttpCache:
+    """In-memory cache of the GET responses of a client, with HTTP semantics.
+
+    Responses are stored with their validators (`ETag` and `Last-Modified`) and
+    their freshness lifetime, from the `max-age` directive of `Cache-Control` or
+    the `Expires` header. While a response is fresh, it is served without any
+    request. Once it is stale, or if the server sent `no-cache`, it is
+    revalidated with a conditional request, and a `304 Not Modified` is served
+    from the cache. Responses with `no-store` are never stored.
+
+    Responses are keyed by their URL and query parameters, the credentials of
+    the request (a hash of its `apikey`, `Authorization` and `Cookie` headers),
+    so clients with different credentials sharing a cache never see each
+    other's responses, and the values of the request headers listed in the
+    `Vary` header of the response.
+
+    At most `max_entries` responses are kept, evicting the least recently used.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        """Create the HttpCache class.
+
+        Args:
+            max_entries: The maximum number of responses kept
+
+        """
+        if max_entries < 1:
+            error = "max_entries must be at least 1"
+            raise ValueError(error)
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._vary: OrderedDict[tuple, tuple[str, ...]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._revalidations = 0
+        self._misses = 0
+        forking.track(self)
+
+    @property
+    def hits(self) -> int:
+        """Return the number of responses served fresh from the cache, without any request."""
+        return self._hits
+
+    @property
+    def revalidations(self) -> int:
+        """Return the number of responses served from the cache after a `304 Not Modified`."""
+        return self._revalidations
+
+    @property
+    def misses(self) -> int:
+        """Return the number of responses downloaded from the server."""
+        return self._misses
+
+    def __len__(self) -> int:
+        """Return the number of responses cached."""
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._entries.clear()
+            self._vary.clear()
+
+    def fetch(
+            self,
+            url: str,
+            params: dict | None,
+            headers: dict | None,
+            send: Callable[[dict], requests.Response],
+    ) -> requests.Response:
+        """Return the response of a GET request, from the cache when possible.
+
+        Args:
+            url: The URL of the request
+            params: The query parameters of the request
+            headers: The headers of the request, used to key the credentials and the varied headers
+            send: The callable that sends the request with the given extra headers
+
+        Returns:
+            The response, either from the server or a copy of the cached one
+
+        """
+        headers = CaseInsensitiveDict(headers or {})
+        resource = (f"{url}?{urlencode(sorted((params or {}).items()), doseq=True)}", _identity(headers))
+        with self._lock:
+            key = _key(resource, self._vary.get(resource, ()), headers)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry.fresh:
+                    self._hits += 1
+                    return _copy(entry.response)
+        not_modified = 304
+        response = send(entry.validators if entry is not None else {})
+        if entry is not None and response.status_code == not_modified:
+            with self._lock:
+                entry.response.headers.update(
+                    {name: value for name, value in response.headers.items() if name.lower() != "content-length"},
+                )
+                self._revalidations += 1
+                response = _copy(entry.response)
+            self._store(resource, headers, response)
+            return response
+        with self._lock:
+            self._misses += 1
+        self._store(resource, headers, response)
+        return response
+
+    def _after_fork(self) -> None:
+        """Replace the lock inherited from the parent process, which one of its threads may hold."""
+        self._lock = threading.Lock()
+
+    def _store(self, resource: tuple, headers: CaseInsensitiveDict, response: requests.Response) -> None:
+        """Store a successful response, unless the server forbids it."""
+        ok = 200
+        directives = _cache_control(response.headers.get("Cache-Control", ""))
+        vary = tuple(sorted({name.strip().lower() for name in response.headers.get("Vary", "").split(",") if name.strip()}))
+        if response.status_code != ok or "no-store" in directives or "*" in vary:
+            with self._lock:
+                self._entries.pop(_key(resource, self._vary.get(resource, ()), headers), None)
+            return
+        entry = _Entry(_copy(response), time.monotonic() + _lifetime(response, directives), "no-cache" in directives)
+        with self._lock:
+            self._vary[resource] = vary
+            self._vary.move_to_end(resource)
+            key = _key(resource, vary, headers)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            while len(self._vary) > self._max_entries:
+                self._vary.popitem(last=False)
+
+
+def _identity(headers: CaseInsensitiveDict) -> str:
+    """Return a hash of the credentials of a request, so they are not kept in the keys."""
+    credentials = "\0".join(str(headers.get(name, "")) for name in _AUTH_HEADERS)
+    return hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def _key(resource: tuple, vary: tuple[str, ...], headers: CaseInsensitiveDict) -> tuple:
+    """Return the key of a response, from its resource and the request headers it varies on."""
+    return (*resource, tuple((name, headers.get(name)) for name in vary))
+
+
+def _cache_control(value: str) -> dict[str, str | None]:
+    """Parse the directives of a `Cache-Control` header."""
+    directives = {}
+    for directive in value.split(","):
+        name, _, argument = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _lifetime(response: requests.Response, directives: dict[str, str | None]) -> float:
+    """Return the seconds a response stays fresh, 0 if it must always be revalidated."""
+    try:
+        if directives.get("max-age") is not None:
+            return max(0.0, float(directives["max-age"]) - float(response.headers.get("Age", 0)))
+        if "Expires" in response.headers:
+            expires = parsedate_to_datetime(response.headers["Expires"])
+            date = parsedate_to_datetime(response.headers["Date"]) if "Date" in response.headers else None
+            now = date.timestamp() if date is not None else time.time()
+            return max(0.0, expires.timestamp() - now)
+    except (TypeError, ValueError):
+        pass
+    return 0.0
+
+
+def _copy(response: requests.Response) -> requests.Response:
+    """Return a copy of a response, so cached responses are not modified by the callers."""
+    copied = requests.Response()
+    copied.status_code = response.status_code
+    copied.reason = response.reason
+    copied.headers = CaseInsensitiveDict(response.headers)
+    copied.url = response.url
+    copied.encoding = response.encoding
+    copied.elapsed = response.elapsed
+    copied._content = response.content  # noqa: SLF001
+    return copied
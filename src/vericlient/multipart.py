@@ -0,0 +1,110 @@
+"""Streaming encoder of `multipart/form-data` request bodies."""
+import os
+import uuid
+from collections.abc import Iterator
+from pathlib import Path
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class MultipartEncoder:
+    """Encode form fields and files as a `multipart/form-data` body without copying the files.
+
+    `requests` builds multipart bodies by concatenating every part in memory,
+    so each audio is briefly held several times. The encoder instead yields the
+    part headers and `memoryview` slices of the file contents, or chunks read
+    from disk for paths, which are written straight to the connection. Its
+    length is known in advance, so the request is sent with a `Content-Length`
+    header. The encoder can be iterated more than once, so the body can be sent
+    again on retries.
+    """
+
+    def __init__(self, fields: dict | None = None, files: dict | None = None, boundary: str | None = None) -> None:
+        """Create the MultipartEncoder class.
+
+        Args:
+            fields: The form fields. `None` values are skipped, and the rest are sent as strings
+            files: The files, as `requests` accepts them: `{name: (filename, content, content_type)}`.
+                The content can be a bytes-like object, a path or a seekable binary file
+            boundary: The boundary between parts, random by default
+
+        """
+        self._boundary = boundary or uuid.uuid4().hex
+        self._parts: list[tuple[bytes, object, int]] = []
+        for name, value in (fields or {}).items():
+            if value is None:
+                continue
+            content = memoryview(str(value).encode())
+            self._add_part(f'Content-Disposition: form-data; name="{name}"', content, content.nbytes)
+        self._fields_size = sum(len(headers) + size + 2 for headers, _, size in self._parts)
+        for name, (filename, content, content_type) in (files or {}).items():
+            headers = f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\nContent-Type: {content_type}'
+            self._add_part(headers, *self._source(content))
+        self._closing = f"--{self._boundary}--\r\n".encode()
+
+    @property
+    def content_type(self) -> str:
+        """Return the value of the `Content-Type` header of the body."""
+        return f"multipart/form-data; boundary={self._boundary}"
+
+    @property
+    def fields_size(self) -> int:
+        """Return the length in bytes of the parts of the form fields, without the files."""
+        return self._fields_size
+
+    def __len__(self) -> int:
+        """Return the length in bytes of the body."""
+        return sum(len(headers) + size + 2 for headers, _, size in self._parts) + len(self._closing)
+
+    def __iter__(self) -> Iterator[bytes | memoryview]:
+        """Yield the body in chunks, without copying the contents of the files."""
+        for headers, source, size in self._parts:
+            yield headers
+            yield from self._chunks(source, size)
+            yield b"\r\n"
+        yield self._closing
+
+    def to_bytes(self) -> bytes:
+        """Return the whole body. It copies the contents, so it is meant for small bodies and tests."""
+        return b"".join(bytes(chunk) for chunk in self)
+
+    def _add_part(self, headers: str, source: object, size: int) -> None:
+        self._parts.append((f"--{self._boundary}\r\n{headers}\r\n\r\n".encode(), source, size))
+
+    @staticmethod
+    def _source(content: object) -> tuple[object, int]:
+        """Return the source of a file content and its size."""
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            view = memoryview(content).cast("B")
+            return view, view.nbytes
+        if isinstance(content, (str, Path)):
+            path = Path(content)
+            return path, path.stat().st_size
+        if hasattr(content, "read") and hasattr(content, "seek"):
+            start = content.tell()
+            size = content.seek(0, os.SEEK_END) - start
+            content.seek(start)
+            return (content, start), size
+        error = "file content must be a bytes-like object, a path or a seekable binary file"
+        raise TypeError(error)
+
+    @staticmethod
+    def _chunks(source: object, size: int) -> Iterator[bytes | memoryview]:
+        if isinstance(source, memoryview):
+            for offset in range(0, size, _CHUNK_SIZE):
+                yield source[offset:offset + _CHUNK_SIZE]
+            return
+        if isinstance(source, Path):
+            with open(source, "rb") as f:
+                while chunk := f.read(_CHUNK_SIZE):
+                    yield chunk
+            return
+        file, start = source
+        file.seek(start)
+        remaining = size
+        try:
+            while remaining > 0 and (chunk := file.read(min(_CHUNK_SIZE, remaining))):
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            file.seek(start)
@@ -0,0 +1,184 @@
+"""Two-stage executor: CPU-bound preparation in processes, I/O-bound uploads in threads."""
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing.context import BaseContext
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+P = TypeVar("P")
+R = TypeVar("R")
+
+_DONE = object()
+_POLL_INTERVAL = 0.1
+
+
+def default_mp_context() -> BaseContext:
+    """Return the `forkserver` context where it is available, and `spawn` otherwise.
+
+    The workers are not forked from the process running the pipeline, so they
+    inherit neither its clients, sockets and locks nor the state of its threads.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+class Pipeline(Generic[T, P, R]):
+    """Prepare items in a process pool and upload them from a thread pool.
+
+    Preparation (decoding, hashing, validating audios...) is CPU-bound and is
+    limited by the GIL when it runs in the same threads as the requests, so it
+    runs in a process pool instead, which scales with the number of cores. The
+    prepared payloads are handed to the upload threads through a bounded queue,
+    so the network is kept busy while memory stays flat.
+    """
+
+    def __init__(
+            self,
+            prepare: Callable[[T], P],
+            upload: Callable[[P], R],
+            processes: int | None = None,
+            threads: int = 8,
+            queue_size: int | None = None,
+            mp_context: BaseContext | None = None,
+    ) -> None:
+        """Create the Pipeline class.
+
+        Args:
+            prepare: The preparation function. It runs in another process, so it
+                must be picklable (a module-level function), as must be its
+                arguments and results
+            upload: The function sending a prepared payload. It runs in a thread
+            processes: The number of preparation processes, the number of CPUs by default
+            threads: The number of upload threads
+            queue_size: The maximum number of prepared payloads waiting to be uploaded,
+                twice the number of threads by default
+            mp_context: The `multiprocessing` context the processes are started with,
+                `default_mp_context()` by default
+
+        """
+        self._prepare = prepare
+        self._upload = upload
+        self._processes = processes or os.cpu_count() or 1
+        self._threads = threads
+        self._queue_size = queue_size or 2 * threads
+        self._mp_context = mp_context or default_mp_context()
+
+    def run(self, items: Iterable[tuple[Hashable, T]]) -> Iterator[tuple[Hashable, R | Exception]]:
+        """Prepare and upload every item, yielding the results as they complete.
+
+        Args:
+            items: The `(item_id, item)` pairs to process. They are pulled lazily
+
+        Yields:
+            `(item_id, result)` pairs in completion order. If the preparation or the
+            upload of an item raised, the exception is yielded instead of the result
+
+        """
+        run = _PipelineRun(
+            self._prepare, self._upload, self._processes, self._threads, self._queue_size, self._mp_context,
+        )
+        return run.results(items)
+
+
+class _PipelineRun:
+    """State of a single `Pipeline.run`: the queues between stages and their threads."""
+
+    def __init__(
+            self,
+            prepare: Callable,
+            upload: Callable,
+            processes: int,
+            threads: int,
+            queue_size: int,
+            mp_context: BaseContext,
+    ) -> None:
+        self._prepare = prepare
+        self._upload = upload
+        self._processes = processes
+        self._threads = threads
+        self._mp_context = mp_context
+        self._prepared: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._results: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._errors: list[BaseException] = []
+
+    def results(self, items: Iterable[tuple[Hashable, object]]) -> Iterator[tuple[Hashable, object]]:
+        workers = [threading.Thread(target=self._feed, args=(items,), name="vericlient-pipeline-feeder", daemon=True)]
+        workers += [
+            threading.Thread(target=self._send, name=f"vericlient-pipeline-upload-{i}", daemon=True)
+            for i in range(self._threads)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            running = self._threads
+            while running:
+                value = self._results.get()
+                if value is _DONE:
+                    running -= 1
+                    continue
+                yield value
+        finally:
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def _put(self, target: queue.Queue, value: object) -> None:
+        """Put a value in a bounded queue, giving up if the run is stopped."""
+        while not self._stop.is_set():
+            try:
+                target.put(value, timeout=_POLL_INTERVAL)
+            except queue.Full:
+                continue
+            return
+
+    def _feed(self, items: Iterable[tuple[Hashable, object]]) -> None:
+        """Submit the items to the process pool and queue the prepared payloads."""
+        capacity = 2 * self._processes
+        try:
+            with ProcessPoolExecutor(max_workers=self._processes, mp_context=self._mp_context) as executor:
+                pending: dict[Future, Hashable] = {}
+                iterator = iter(items)
+                exhausted = False
+                while (pending or not exhausted) and not self._stop.is_set():
+                    for item_id, item in itertools.islice(iterator, capacity - len(pending)):
+                        pending[executor.submit(self._prepare, item)] = item_id
+                    exhausted = exhausted or len(pending) < capacity
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        error = future.exception()
+                        self._put(self._prepared, (pending.pop(future), future.result() if error is None else error))
+                for future in pending:
+                    future.cancel()
+        except BaseException as e:     # noqa: BLE001
+            self._errors.append(e)
+        finally:
+            for _ in range(self._threads):
+                self._put(self._prepared, _DONE)
+
+    def _send(self) -> None:
+        """Upload the prepared payloads until the feeder is done."""
+        while not self._stop.is_set():
+            try:
+                value = self._prepared.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if value is _DONE:
+                break
+            item_id, payload = value
+            if not isinstance(payload, Exception):
+                try:
+                    payload = self._upload(payload)
+                except Exception as e:  # noqa: BLE001
+                    payload = e
+            self._put(self._results, (item_id, payload))
+        self._put(self._results, _DONE)
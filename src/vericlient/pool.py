@@ -0,0 +1,179 @@
+"""Connection pools of the clients, shared by host and resuming their TLS sessions."""
+import ssl
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from vericlient import forking
+
+
+def reset_connections(adapter: HTTPAdapter) -> None:
+    """Replace the connection pools of an adapter with empty ones, without closing them.
+
+    After a fork, the sockets of the pools are shared with the parent process,
+    so the child must stop using them instead of closing them on the parent.
+    """
+    adapter.init_poolmanager(
+        adapter._pool_connections, adapter._pool_maxsize, block=adapter._pool_block,  # noqa: SLF001
+    )
+    adapter.proxy_manager = {}
+
+
+class _ResumingSocket(ssl.SSLSocket):
+    """SSL socket that hands its TLS session to its context before closing."""
+
+    def _real_close(self) -> None:
+        self.context.keep_session(self)
+        super()._real_close()
+
+
+class _ResumingContext(ssl.SSLContext):
+    """SSL context that resumes the last TLS session of each host in its new connections."""
+
+    sslsocket_class = _ResumingSocket
+
+    def __init__(self, protocol: int) -> None:  # noqa: ARG002
+        # The protocol is taken by ssl.SSLContext.__new__, from the same arguments
+        super().__init__()
+        # The hostnames are matched by urllib3, which also sets the verification mode of each connection
+        self.check_hostname = False
+        self.minimum_version = ssl.TLSVersion.TLSv1_2
+        self._sessions: dict[str | None, ssl.SSLSession] = {}
+
+    def wrap_socket(
+            self, sock: object, *args: object, server_hostname: str | None = None, session: object = None, **kwargs: object,
+    ) -> ssl.SSLSocket:
+        """Wrap a socket, resuming the last session of the host unless another one is given."""
+        ssl_sock = super().wrap_socket(
+            sock, *args, server_hostname=server_hostname, session=session or self._sessions.get(server_hostname), **kwargs,
+        )
+        self.keep_session(ssl_sock)
+        return ssl_sock
+
+    def keep_session(self, ssl_sock: ssl.SSLSocket) -> None:
+        """Keep the session of a connection to resume it later, if it can be resumed.
+
+        With TLS 1.3, the session tickets arrive after the handshake, so the
+        session is only resumable once the connection has read some data.
+        """
+        try:
+            session = ssl_sock.session
+        except ValueError:
+            # Raised by the connections whose handshake failed
+            return
+        if session is not None and (session.has_ticket or ssl_sock.version() != "TLSv1.3"):
+            self._sessions[ssl_sock.server_hostname] = session
+
+
+class ResumingAdapter(HTTPAdapter):
+    """Adapter that resumes the TLS sessions of a host when it opens new connections to it.
+
+    A resumed session skips the exchange of certificates and keys of a full TLS
+    handshake, so reconnecting to the API, for example after an idle connection
+    is closed by the server, costs about one round trip less. Servers that do
+    not support it answer with a full handshake.
+    """
+
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        """Create the ResumingAdapter class, with the arguments of `HTTPAdapter`."""
+        self._contexts: dict[tuple, _ResumingContext] = {}
+        super().__init__(*args, **kwargs)
+
+    def build_connection_pool_key_attributes(
+            self, request: requests.PreparedRequest, verify: bool | str, cert: str | tuple | None = None,
+    ) -> tuple[dict, dict]:
+        """Return the attributes of the pool of a request, with the SSL context of its TLS settings.
+
+        Each combination of `verify` and `cert` has its own context, so the
+        sessions are only resumed by connections with the same verification.
+        """
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        if host_params["scheme"] == "https":
+            key = (verify, cert)
+            context = self._contexts.get(key)
+            if context is None:
+                context = self._contexts.setdefault(key, _ResumingContext(ssl.PROTOCOL_TLS_CLIENT))
+            pool_kwargs["ssl_context"] = context
+        return host_params, pool_kwargs
+
+
+class _SharedAdapter(ResumingAdapter):
+    """Adapter whose connections outlive the sessions it is mounted on."""
+
+    def close(self) -> None:
+        """Keep the connections open when a session that uses them is closed."""
+
+    def release(self) -> None:
+        """Close the connections of the adapter."""
+        super().close()
+
+
+class ConnectionRegistry:
+    """Registry of connection pools keyed by host, shared by the sessions of many clients.
+
+    Each client keeps its own `requests.Session`, so its headers, `apikey` and
+    cookies stay separate, but the sessions of the clients that use the same
+    registry send their requests through the same adapter for each host. A
+    `DaspeakClient` and a `VcspClient`, or one client per tenant, then reuse
+    the same warm connections instead of each paying its own TCP and TLS
+    handshakes.
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10) -> None:
+        """Create the ConnectionRegistry class.
+
+        Args:
+            pool_connections: The number of hosts whose pools are kept by each adapter
+            pool_maxsize: The maximum number of connections kept open to each host
+
+        """
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._lock = threading.Lock()
+        self._adapters: dict[str, _SharedAdapter] = {}
+        forking.track(self)
+
+    def __len__(self) -> int:
+        """Return the number of hosts with a shared pool."""
+        with self._lock:
+            return len(self._adapters)
+
+    def adapter(self, url: str) -> HTTPAdapter:
+        """Return the shared adapter of the host of a URL, creating it if needed."""
+        parts = urlsplit(url)
+        prefix = f"{parts.scheme}://{parts.netloc}/"
+        with self._lock:
+            adapter = self._adapters.get(prefix)
+            if adapter is None:
+                adapter = self._adapters[prefix] = _SharedAdapter(
+                    pool_connections=self._pool_connections, pool_maxsize=self._pool_maxsize,
+                )
+            return adapter
+
+    def mount(self, session: requests.Session, url: str) -> None:
+        """Send the requests of a session to the host of a URL through the shared adapter."""
+        parts = urlsplit(url)
+        session.mount(f"{parts.scheme}://{parts.netloc}/", self.adapter(url))
+
+    def clear(self) -> None:
+        """Close every shared connection and forget the adapters.
+
+        The sessions where they are mounted keep working, opening new connections when needed.
+        """
+        with self._lock:
+            adapters = list(self._adapters.values())
+            self._adapters.clear()
+        for adapter in adapters:
+            adapter.release()
+
+    def _after_fork(self) -> None:
+        """Stop using the connections inherited from the parent process."""
+        self._lock = threading.Lock()
+        for adapter in self._adapters.values():
+            reset_connections(adapter)
+
+
+shared_connections = ConnectionRegistry()
+"""The registry of the process, used by the clients when `VERICLIENT_SHARE_CONNECTIONS` is enabled."""
@@ -0,0 +1,65 @@
+"""Coalescing of identical concurrent calls."""
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from typing import TypeVar
+
+from vericlient import forking
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Share one execution among the concurrent calls made with the same key.
+
+    The first caller of a key runs the function. Callers arriving while it is
+    still running wait for it and get the same result, or the same exception.
+    Once it finishes, the key is forgotten, so results are never cached.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        forking.track(self)
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of calls currently running."""
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """Run `func`, or wait for the call already running with the same `key`.
+
+        Args:
+            key: The key identifying identical calls
+            func: The function to run if no call with `key` is running
+
+        Returns:
+            The result of the call
+
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def _after_fork(self) -> None:
+        """Forget the calls of the parent process, whose threads were not inherited."""
+        self._lock = threading.Lock()
+        self._calls = {}
@@ -0,0 +1,74 @@
+"""Detection of the requests slow enough to be logged with their details."""
+from vericlient.timeouts import LatencyTracker
+
+
+class SlowRequestLog:
+    """Decide which requests of a client are slow enough to log.
+
+    A request is slow if it takes at least `threshold` seconds, or, once
+    `min_samples` requests to the same endpoint have been observed, longer than
+    the `percentile` of their latencies. The clients log each slow request as a
+    `Slow request` warning with its endpoint, upload size, number of credentials,
+    audio duration, phase timings and response size, but never its headers, so
+    the `apikey` is never logged.
+    """
+
+    def __init__(
+            self,
+            threshold: float | None = 5.0,
+            percentile: float | None = None,
+            min_samples: int = 50,
+            window: int = 256,
+    ) -> None:
+        """Create the SlowRequestLog class.
+
+        Args:
+            threshold: The seconds from which a request is slow. None to only use the percentile
+            percentile: The percentile of the latencies of an endpoint, between 0 and 1, above
+                which a request to it is slow. None to only use the threshold
+            min_samples: The number of latencies of an endpoint needed before using the percentile
+            window: The number of latencies kept per endpoint
+
+        """
+        if threshold is None and percentile is None:
+            error = "Either threshold or percentile must be given"
+            raise ValueError(error)
+        if percentile is not None and not 0 < percentile < 1:
+            error = "percentile must be between 0 and 1"
+            raise ValueError(error)
+        self._threshold = threshold
+        self._percentile = percentile
+        self._min_samples = min_samples
+        self._latencies = LatencyTracker(window)
+
+    @property
+    def threshold(self) -> float | None:
+        """Return the seconds from which a request is slow."""
+        return self._threshold
+
+    @property
+    def percentile(self) -> float | None:
+        """Return the percentile of the latencies above which a request is slow."""
+        return self._percentile
+
+    def observe(self, endpoint: str, duration: float) -> float | None:
+        """Record the duration of a request and return the limit it exceeded, if any.
+
+        Args:
+            endpoint: The endpoint the request was made to
+            duration: The seconds the request took
+
+        Returns:
+            The threshold or the percentile latency exceeded by the request, or None
+            if it is not slow
+
+        """
+        limit = None
+        if self._percentile is not None and self._latencies.count(endpoint) >= self._min_samples:
+            limit = self._latencies.percentile(endpoint, self._percentile)
+        self._latencies.observe(endpoint, duration)
+        if self._threshold is not None and duration >= self._threshold:
+            return self._threshold
+        if limit is not None and duration > limit:
+            return limit
+        return None
@@ -0,0 +1,186 @@
+"""Timeout policies for the requests made to the Veridas APIs."""
+import math
+import re
+import threading
+from collections import deque
+from enum import Enum
+
+from vericlient import forking
+
+
+class LatencyTracker:
+    """Keep a sliding window of the latencies observed per endpoint."""
+
+    def __init__(self, window: int = 256) -> None:
+        """Create the LatencyTracker class.
+
+        Args:
+            window: The number of latencies kept per endpoint
+
+        """
+        self._window = window
+        self._latencies: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+        forking.track(self)
+
+    def observe(self, endpoint: str, latency: float) -> None:
+        """Record the latency, in seconds, of a request to `endpoint`."""
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = self._latencies[endpoint] = deque(maxlen=self._window)
+            latencies.append(latency)
+
+    def count(self, endpoint: str) -> int:
+        """Return the number of latencies recorded for `endpoint`."""
+        with self._lock:
+            return len(self._latencies.get(endpoint, ()))
+
+    def percentile(self, endpoint: str, percentile: float) -> float | None:
+        """Return a percentile of the latencies recorded for `endpoint`.
+
+        Args:
+            endpoint: The endpoint to look up
+            percentile: The percentile to compute, between 0 and 1
+
+        Returns:
+            The latency, or None if nothing has been recorded for the endpoint
+
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(endpoint, ()))
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, math.ceil(percentile * len(latencies)) - 1)
+        return latencies[max(index, 0)]
+
+    def _after_fork(self) -> None:
+        """Replace the lock of the parent process, which may be held by a thread that no longer exists."""
+        self._lock = threading.Lock()
+
+
+class TimeoutPolicy:
+    """Compute the `(connect, read)` timeouts to use for each request.
+
+    The policy supports per-endpoint overrides and an adaptive mode. In
+    adaptive mode, the read timeout is derived from the size of the upload, the
+    duration of the audio sent and a percentile of the latencies previously
+    observed for the same endpoint. Explicit per-endpoint overrides are never
+    replaced by the observed latencies.
+    """
+
+    def __init__(
+            self,
+            connect: float = 3.05,
+            read: float = 10,
+            endpoints: dict[Enum | str, float | tuple[float, float]] | None = None,
+            adaptive: bool = False,     # noqa: FBT001, FBT002
+            upload_rate: float = 256 * 1024,
+            audio_factor: float = 0.5,
+            percentile: float = 0.99,
+            margin: float = 1.5,
+            min_samples: int = 20,
+            min_read: float = 1,
+            max_read: float = 120,
+    ) -> None:
+        """Create the TimeoutPolicy class.
+
+        Args:
+            connect: The number of seconds to wait to establish a connection
+            read: The number of seconds to wait for the server to send data
+            endpoints: Per-endpoint overrides, keyed by the endpoint enums (or their values).
+                A number overrides the read timeout and a tuple overrides both timeouts
+            adaptive: Whether to derive the read timeout from the request payload and
+                the observed latencies
+            upload_rate: In adaptive mode, the expected upload rate in bytes per second
+            audio_factor: In adaptive mode, the seconds added per second of audio uploaded
+            percentile: In adaptive mode, the percentile of the observed latencies used
+                as the base read timeout
+            margin: In adaptive mode, the factor applied to the observed percentile
+            min_samples: In adaptive mode, the number of observed latencies needed before
+                using them instead of `read`
+            min_read: In adaptive mode, the lower bound of the read timeout
+            max_read: In adaptive mode, the upper bound of the read timeout
+
+        """
+        self._connect = connect
+        self._read = read
+        self._adaptive = adaptive
+        self._upload_rate = upload_rate
+        self._audio_factor = audio_factor
+        self._percentile = percentile
+        self._margin = margin
+        self._min_samples = min_samples
+        self._min_read = min_read
+        self._max_read = max_read
+        self._latencies = LatencyTracker()
+        self._overrides: dict[str, tuple[float, float]] = {}
+        self._patterns: list[tuple[re.Pattern, str]] = []
+        for endpoint, timeout in (endpoints or {}).items():
+            template = endpoint.value if isinstance(endpoint, Enum) else endpoint
+            self._overrides[template] = timeout if isinstance(timeout, tuple) else (connect, timeout)
+            if "<" in template:
+                pattern = re.sub(r"<\w+>", "[^/]+", re.escape(template))
+                self._patterns.append((re.compile(f"^{pattern}$"), template))
+
+    @property
+    def connect(self) -> float:
+        """Return the default connect timeout."""
+        return self._connect
+
+    @property
+    def read(self) -> float:
+        """Return the default read timeout."""
+        return self._read
+
+    @property
+    def adaptive(self) -> bool:
+        """Return whether the adaptive mode is enabled."""
+        return self._adaptive
+
+    @property
+    def latencies(self) -> LatencyTracker:
+        """Return the latencies observed per endpoint."""
+        return self._latencies
+
+    def template(self, endpoint: str) -> str:
+        """Return the endpoint template that `endpoint` was built from, if it has an override."""
+        if endpoint in self._overrides:
+            return endpoint
+        for pattern, template in self._patterns:
+            if pattern.match(endpoint):
+                return template
+        return endpoint
+
+    def for_request(
+            self,
+            endpoint: str,
+            upload_bytes: int = 0,
+            audio_duration: float | None = None,
+    ) -> tuple[float, float]:
+        """Return the `(connect, read)` timeouts for a request.
+
+        Args:
+            endpoint: The endpoint the request is made to
+            upload_bytes: The size of the request body
+            audio_duration: The total duration of the audio uploaded, in seconds
+
+        Returns:
+            The timeouts to pass to the HTTP session
+
+        """
+        key = self.template(endpoint)
+        connect, read = self._overrides.get(key, (self._connect, self._read))
+        if not self._adaptive:
+            return connect, read
+        if key not in self._overrides and self._latencies.count(key) >= self._min_samples:
+            # The observed latencies already include the time to upload the bodies
+            read = self._latencies.percentile(key, self._percentile) * self._margin
+        else:
+            read += upload_bytes / self._upload_rate
+        read += (audio_duration or 0) * self._audio_factor
+        return connect, min(max(read, self._min_read), self._max_read)
+
+    def observe(self, endpoint: str, latency: float) -> None:
+        """Record the latency, in seconds, of a request to `endpoint`."""
+        self._latencies.observe(self.template(endpoint), latency)
@@ -0,0 +1,218 @@
+"""Transports sending the HTTP requests of the clients."""
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Coroutine, Iterable
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from vericlient import forking
+from vericlient.pool import reset_connections
+
+
+class Transport(ABC):
+    """Send the requests of a client and return `requests` responses.
+
+    Every transport returns `requests.Response` objects and raises `requests`
+    exceptions, so the error handling of the clients does not depend on the
+    transport in use.
+    """
+
+    @abstractmethod
+    def request(
+            self,
+            method: str,
+            url: str,
+            data: object = None,
+            json_: dict | None = None,
+            params: dict | None = None,
+            headers: dict | None = None,
+            timeout: tuple[float, float] | None = None,
+    ) -> requests.Response:
+        """Send a request.
+
+        Args:
+            method: The HTTP method
+            url: The URL of the request
+            data: The form fields, or an iterable body such as a `MultipartEncoder`.
+                Iterables without a length are sent with chunked transfer encoding
+            json_: The JSON body
+            params: The query parameters
+            headers: The headers of the request
+            timeout: The `(connect, read)` timeouts in seconds
+
+        Returns:
+            The response of the server
+
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release the connections of the transport."""
+
+
+class RequestsTransport(Transport):
+    """HTTP/1.1 transport over a `requests.Session`, the default of the clients.
+
+    Each request in flight uses its own pooled connection.
+    """
+
+    def __init__(self, session: requests.Session | None = None) -> None:
+        """Create the RequestsTransport class.
+
+        Args:
+            session: The session used to send the requests, a new one by default
+
+        """
+        self._session = session or requests.Session()
+        forking.track(self)
+
+    @property
+    def session(self) -> requests.Session:
+        """Return the session used to send the requests."""
+        return self._session
+
+    def request(
+            self,
+            method: str,
+            url: str,
+            data: object = None,
+            json_: dict | None = None,
+            params: dict | None = None,
+            headers: dict | None = None,
+            timeout: tuple[float, float] | None = None,
+    ) -> requests.Response:
+        """Send a request with the session."""
+        return self._session.request(method, url, params=params, data=data, json=json_, headers=headers, timeout=timeout)
+
+    def close(self) -> None:
+        """Close the session."""
+        self._session.close()
+
+    def _after_fork(self) -> None:
+        """Stop using the connections inherited from the parent process, keeping the adapters."""
+        for adapter in self._session.adapters.values():
+            if isinstance(adapter, HTTPAdapter):
+                reset_connections(adapter)
+
+
+class Http2Transport(Transport):
+    """HTTP/2 transport that multiplexes concurrent requests over a few connections.
+
+    It requires the `http2` extra: `pip install vericlient[http2]`. Concurrent
+    requests, for example those of `iter_compare`, share the connections as
+    separate streams, instead of opening one TCP and TLS connection each.
+
+    The connections are driven by an asyncio event loop in a background
+    thread, and the calling threads wait for their responses. The synchronous
+    HTTP/2 client of `httpx` is not used because it can open streams out of
+    order when it is shared by many threads.
+    """
+
+    def __init__(
+            self,
+            max_connections: int = 4,
+            http1: bool = True,     # noqa: FBT001, FBT002
+            verify: bool = True,    # noqa: FBT001, FBT002
+    ) -> None:
+        """Create the Http2Transport class.
+
+        Args:
+            max_connections: The maximum number of connections open to the server
+            http1: Whether HTTP/1.1 is allowed when the server does not negotiate HTTP/2.
+                If False, HTTP/2 is also used without TLS, which requires a server
+                that accepts it with prior knowledge
+            verify: Whether the TLS certificate of the server is verified
+
+        """
+        try:
+            import httpx
+        except ImportError as e:
+            error = "Http2Transport requires the http2 extra: pip install vericlient[http2]"
+            raise ImportError(error) from e
+        self._httpx = httpx
+        self._options = (http1, verify, httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections))
+        self._start()
+        forking.track(self)
+
+    def request(
+            self,
+            method: str,
+            url: str,
+            data: object = None,
+            json_: dict | None = None,
+            params: dict | None = None,
+            headers: dict | None = None,
+            timeout: tuple[float, float] | None = None,
+    ) -> requests.Response:
+        """Send a request over a multiplexed connection."""
+        httpx = self._httpx
+        kwargs = {"json": json_, "params": params, "headers": headers}
+        if isinstance(data, dict):
+            kwargs["data"] = {key: str(value) for key, value in data.items() if value is not None}
+        elif isinstance(data, bytes):
+            kwargs["content"] = data
+        elif data is not None:
+            kwargs["content"] = _aiter(data)
+            if hasattr(data, "__len__"):
+                kwargs["headers"] = {"Content-Length": str(len(data)), **(headers or {})}
+        if timeout is not None:
+            connect, read = timeout
+            kwargs["timeout"] = httpx.Timeout(read, connect=connect, pool=connect)
+        try:
+            response = self._run(self._client.request(method, url, **kwargs))
+        except httpx.ConnectTimeout as e:
+            raise requests.ConnectTimeout(str(e)) from e
+        except httpx.TimeoutException as e:
+            raise requests.ReadTimeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+        return self._to_requests_response(response)
+
+    def close(self) -> None:
+        """Close the connections and stop the event loop."""
+        if self._loop.is_closed():
+            return
+        self._run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _start(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="vericlient-http2", daemon=True)
+        self._thread.start()
+        self._client = self._run(self._create_client(*self._options))
+
+    def _after_fork(self) -> None:
+        """Open new connections from a new event loop, since the thread of the parent is gone."""
+        if not self._loop.is_closed():
+            self._start()
+
+    def _run(self, coroutine: Coroutine) -> object:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _create_client(self, http1: bool, verify: bool, limits: object) -> object:  # noqa: FBT001
+        return self._httpx.AsyncClient(http1=http1, http2=True, verify=verify, limits=limits)
+
+    @staticmethod
+    def _to_requests_response(response: object) -> requests.Response:
+        converted = requests.Response()
+        converted.status_code = response.status_code
+        converted.reason = response.reason_phrase
+        converted.headers = CaseInsensitiveDict(response.headers)
+        converted.url = str(response.url)
+        converted.encoding = response.encoding
+        converted.elapsed = response.elapsed
+        converted._content = response.content  # noqa: SLF001
+        return converted
+
+
+async def _aiter(chunks: Iterable) -> AsyncIterator:
+    """Iterate a body in a worker thread, so reading its files does not block the event loop."""
+    iterator = iter(chunks)
+    end = object()
+    while (chunk := await asyncio.to_thread(next, iterator, end)) is not end:
+        yield chunk
@@ -1,9 +1,35 @@
 """Implementation of the client for the VCSP service."""
+import itertools
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import wait
+
 from requests.models import Response
 
 from vericlient.apis import APIs
 from vericlient.client import Client
+from vericlient.compression import RequestCompression
+from vericlient.concurrency import iter_as_completed
+from vericlient.http_cache import HttpCache
+from vericlient.pool import ConnectionRegistry
+from vericlient.slowlog import SlowRequestLog
+from vericlient.timeouts import TimeoutPolicy
+from vericlient.transports import Transport
 from vericlient.vcsp.endpoints import VcspEndpoints
+from vericlient.vcsp.exceptions import NotFoundError, PayloadTooLargeError, TaskFailedError, TaskTimeoutError
+from vericlient.vcsp.models import (
+    BatchEnrollmentOutput,
+    EnrollmentInput,
+    EnrollmentResult,
+    MembershipOutput,
+    Resource,
+    Task,
+)
+from vericlient.vcsp.pagination import Paginator
+from vericlient.vcsp.tasks import Backoff, TaskFuture, TaskTracker
+
+MAX_ENROLLMENT_BATCH_SIZE = 100
+"""The default number of subjects sent in each request to `enrollments/batch`."""
 
 
 class VcspClient(Client):
@@ -13,22 +39,38 @@ class VcspClient(Client):
             self,
             api: str = APIs.VCSP.value,
             apikey: str | None = None,
-            timeout: int | None = None,
+            timeout: float | tuple[float, float] | TimeoutPolicy | None = None,
             environment: str | None = None,
             location: str | None = None,
             url: str | None = None,
             headers: dict | None = None,
+            transport: Transport | None = None,
+            http_cache: HttpCache | None = None,
+            compression: RequestCompression | None = None,
+            connection_registry: ConnectionRegistry | None = None,
+            slow_request_log: SlowRequestLog | None = None,
     ) -> None:
         """Create the VcspClient class.
 
         Args:
             api: The API to use
             apikey: The API key to use
-            timeout: The timeout to use in the requests
+            timeout: The timeout to use in the requests. It can be a number of seconds,
+                a `(connect, read)` tuple or a `TimeoutPolicy`
             environment: The environment to use
             location: The location to use
             url: The URL to use in case of a custom target
             headers: The headers to be used in the requests
+            transport: The transport sending the requests, a `RequestsTransport` over
+                HTTP/1.1 by default. Use an `Http2Transport` to multiplex them over HTTP/2
+            http_cache: The cache of the GET responses, such as the models. Fresh responses
+                are served from it and stale ones are revalidated with conditional requests
+            compression: The compression of the request bodies above a size threshold, such as
+                large credential lists. Disabled by default
+            connection_registry: The registry of connection pools shared with other clients of the
+                same host. Ignored if a `transport` is given
+            slow_request_log: The detector of the slow requests, logged with the details of their
+                payload and phases. Disabled by default
 
         """
         super().__init__(
@@ -39,20 +81,467 @@ class VcspClient(Client):
             location=location,
             url=url,
             headers=headers,
+            transport=transport,
+            http_cache=http_cache,
+            compression=compression,
+            connection_registry=connection_registry,
+            slow_request_log=slow_request_log,
         )
         self._exceptions = [
         ]
+        self._task_tracker_lock = threading.Lock()
+        self._task_tracker: TaskTracker | None = None
 
     def alive(self) -> bool:
         """Check if the service is alive.
 
+        The check always reaches the service, even with an `http_cache`.
+
         Returns
             bool: True if the service is alive, False otherwise
 
         """
-        response = self._get(endpoint=VcspEndpoints.ALIVE.value)
+        response = self._get(endpoint=VcspEndpoints.ALIVE.value, cached=False)
         accepted_status_code = 204
         return response.status_code == accepted_status_code
 
     def _handle_error_response(self, response: Response) -> None:
         """Handle error responses from the API."""
+        not_found = 404
+        payload_too_large = 413
+        if response.status_code == not_found:
+            raise NotFoundError
+        if response.status_code == payload_too_large:
+            raise PayloadTooLargeError
+        self._raise_server_error(response)
+
+    def enroll_batch(
+            self,
+            inputs: Iterable[EnrollmentInput],
+            batch_size: int = MAX_ENROLLMENT_BATCH_SIZE,
+            max_in_flight: int = 4,
+    ) -> BatchEnrollmentOutput:
+        """Enroll many subjects through the `enrollments/batch` endpoint.
+
+        See `iter_enroll_batch` for how the inputs are chunked and sent.
+
+        Args:
+            inputs: The subjects to enroll. They are pulled lazily
+            batch_size: The maximum number of subjects sent in each request
+            max_in_flight: The maximum number of requests sent concurrently
+
+        Returns:
+            BatchEnrollmentOutput: The number of subjects enrolled and the errors of the rest
+
+        """
+        output = BatchEnrollmentOutput()
+        for result in self.iter_enroll_batch(inputs, batch_size, max_in_flight):
+            if result.ok:
+                output.succeeded += 1
+            else:
+                output.failed += 1
+                output.errors[result.subject_id] = result.error
+        return output
+
+    def iter_enroll_batch(
+            self,
+            inputs: Iterable[EnrollmentInput],
+            batch_size: int = MAX_ENROLLMENT_BATCH_SIZE,
+            max_in_flight: int = 4,
+    ) -> Iterator[EnrollmentResult]:
+        """Enroll many subjects, yielding the result of each one as its batch completes.
+
+        The inputs are read lazily and split in chunks of `batch_size` subjects,
+        and at most `max_in_flight` chunks are in flight at any time, so memory
+        stays flat for any number of subjects. If the service rejects a chunk
+        as too large, it is split in halves and sent again. If a whole chunk
+        fails, every subject in it is yielded as failed with the error.
+
+        Args:
+            inputs: The subjects to enroll. They are pulled lazily
+            batch_size: The maximum number of subjects sent in each request
+            max_in_flight: The maximum number of requests sent concurrently
+
+        Yields:
+            EnrollmentResult: The result of each subject, in completion order
+
+        """
+        if batch_size < 1:
+            error = "batch_size must be at least 1"
+            raise ValueError(error)
+        iterator = iter(inputs)
+        chunks = iter(lambda: list(itertools.islice(iterator, batch_size)), [])
+        keyed_chunks = ((tuple(item.subject_id for item in chunk), chunk) for chunk in chunks)
+        for subject_ids, results in iter_as_completed(self._enroll_chunk, keyed_chunks, max_in_flight):
+            if isinstance(results, Exception):
+                error = f"{type(results).__name__}: {results}"
+                yield from (EnrollmentResult(subject_id=subject_id, ok=False, error=error) for subject_id in subject_ids)
+            else:
+                yield from results
+
+    def _enroll_chunk(self, chunk: list[EnrollmentInput]) -> list[EnrollmentResult]:
+        """Send a chunk to `enrollments/batch`, splitting it if the service rejects it as too large."""
+        try:
+            response = self._post(
+                endpoint=VcspEndpoints.ENROLLMENTS_BATCH.value,
+                json_={"enrollments": [item.model_dump(exclude_none=True) for item in chunk]},
+            )
+        except PayloadTooLargeError:
+            if len(chunk) == 1:
+                raise
+            half = len(chunk) // 2
+            return self._enroll_chunk(chunk[:half]) + self._enroll_chunk(chunk[half:])
+        results = response.json().get("results", [])
+        return [self._enrollment_result(item, result) for item, result in itertools.zip_longest(chunk, results[:len(chunk)])]
+
+    def _enrollment_result(self, item: EnrollmentInput, result: dict | None) -> EnrollmentResult:
+        if result is None:
+            return EnrollmentResult(subject_id=item.subject_id, ok=False, error="The service returned no result")
+        error = result.get("error")
+        return EnrollmentResult(subject_id=item.subject_id, ok=not error, result=result, error=error)
+
+    def add_subjects_to_group(self, group: str, subject_ids: Iterable[str], max_in_flight: int = 8) -> MembershipOutput:
+        """Add many subjects to a group.
+
+        One request is sent per subject, with at most `max_in_flight` in flight.
+        The subject ids are pulled lazily and repeated ones are sent only once,
+        and a failure is recorded for its subject instead of stopping the rest.
+        The same applies to `remove_subjects_from_group`, `tag_subjects` and
+        `untag_subjects`.
+
+        Args:
+            group: The name of the group
+            subject_ids: The ids of the subjects to add
+            max_in_flight: The maximum number of requests sent concurrently
+
+        Returns:
+            MembershipOutput: The number of subjects added and the errors of the rest
+
+        """
+        endpoint = VcspEndpoints.GROUP_SUBJECT.value.replace("<group_name>", group)
+        return self._update_memberships(self._put, endpoint, subject_ids, max_in_flight)
+
+    def remove_subjects_from_group(self, group: str, subject_ids: Iterable[str], max_in_flight: int = 8) -> MembershipOutput:
+        """Remove many subjects from a group.
+
+        Args:
+            group: The name of the group
+            subject_ids: The ids of the subjects to remove
+            max_in_flight: The maximum number of requests sent concurrently
+
+        Returns:
+            MembershipOutput: The number of subjects removed and the errors of the rest
+
+        """
+        endpoint = VcspEndpoints.GROUP_SUBJECT.value.replace("<group_name>", group)
+        return self._update_memberships(self._delete, endpoint, subject_ids, max_in_flight)
+
+    def tag_subjects(self, tag: str, subject_ids: Iterable[str], max_in_flight: int = 8) -> MembershipOutput:
+        """Add a tag to many subjects.
+
+        Args:
+            tag: The name of the tag
+            subject_ids: The ids of the subjects to tag
+            max_in_flight: The maximum number of requests sent concurrently
+
+        Returns:
+            MembershipOutput: The number of subjects tagged and the errors of the rest
+
+        """
+        endpoint = VcspEndpoints.TAG_SUBJECT.value.replace("<tag_name>", tag)
+        return self._update_memberships(self._put, endpoint, subject_ids, max_in_flight)
+
+    def untag_subjects(self, tag: str, subject_ids: Iterable[str], max_in_flight: int = 8) -> MembershipOutput:
+        """Remove a tag from many subjects.
+
+        Args:
+            tag: The name of the tag
+            subject_ids: The ids of the subjects to untag
+            max_in_flight: The maximum number of requests sent concurrently
+
+        Returns:
+            MembershipOutput: The number of subjects untagged and the errors of the rest
+
+        """
+        endpoint = VcspEndpoints.TAG_SUBJECT.value.replace("<tag_name>", tag)
+        return self._update_memberships(self._delete, endpoint, subject_ids, max_in_flight)
+
+    def _update_memberships(
+            self,
+            send: Callable[[str], Response],
+            endpoint: str,
+            subject_ids: Iterable[str],
+            max_in_flight: int,
+    ) -> MembershipOutput:
+        """Send one membership request per subject, at most `max_in_flight` at a time.
+
+        The subject ids are pulled lazily and repeated ones are sent only once.
+        A failure is recorded for its subject and does not stop the rest.
+        """
+        seen = set()
+
+        def unique() -> Iterator[tuple[str, str]]:
+            for subject_id in subject_ids:
+                if subject_id not in seen:
+                    seen.add(subject_id)
+                    yield subject_id, endpoint.replace("<subject_id>", subject_id)
+
+        output = MembershipOutput()
+        for subject_id, result in iter_as_completed(send, unique(), max_in_flight):
+            if isinstance(result, Exception):
+                output.failed += 1
+                output.errors[subject_id] = f"{type(result).__name__}: {result}"
+            else:
+                output.succeeded += 1
+        return output
+
+    def get_account(self, subject_id: str, etag: str | None = None) -> Resource:
+        """Get the account of a subject.
+
+        Args:
+            subject_id: The id of the subject
+            etag: The entity tag of the version already known. If the account has not
+                changed, it is not downloaded again
+
+        Returns:
+            Resource: The account, or `modified=False` if it has not changed
+
+        Raises:
+            NotFoundError: If the subject does not exist
+
+        """
+        return self._get_resource(VcspEndpoints.ACCOUNTS.value.replace("<subject_id>", subject_id), etag)
+
+    def get_credentials(self, subject_id: str, etag: str | None = None) -> Resource:
+        """Get the credentials of a subject.
+
+        Args:
+            subject_id: The id of the subject
+            etag: The entity tag of the version already known. If the credentials have
+                not changed, they are not downloaded again
+
+        Returns:
+            Resource: The credentials, or `modified=False` if they have not changed
+
+        Raises:
+            NotFoundError: If the subject does not exist
+
+        """
+        return self._get_resource(VcspEndpoints.CREDENTIALS.value.replace("<subject_id>", subject_id), etag)
+
+    def _get_resource(self, endpoint: str, etag: str | None) -> Resource:
+        """Make a conditional GET request, sending the known entity tag in `If-None-Match`."""
+        headers = {"If-None-Match": etag} if etag else None
+        response = self._get(endpoint=endpoint, headers=headers)
+        not_modified = 304
+        if response.status_code == not_modified:
+            return Resource(etag=etag, modified=False)
+        return Resource(data=response.json(), etag=response.headers.get("ETag"))
+
+    def submit_task(self, payload: dict) -> str:
+        """Submit an asynchronous task.
+
+        Args:
+            payload: The definition of the task, sent as it is
+
+        Returns:
+            The id of the task
+
+        """
+        response = self._post(endpoint=VcspEndpoints.TASKS.value, json_=payload)
+        response_json = response.json()
+        return str(response_json.get("task_id", response_json.get("id")))
+
+    def get_task(self, task_id: str) -> Task:
+        """Get the status of a task.
+
+        Args:
+            task_id: The id of the task
+
+        Returns:
+            Task: The status of the task
+
+        """
+        response = self._get(endpoint=VcspEndpoints.TASK_ID.value.replace("<task_id>", task_id))
+        return Task.model_validate({"task_id": task_id, **response.json()})
+
+    def get_task_result(self, task_id: str) -> dict:
+        """Get the result of a finished task.
+
+        Args:
+            task_id: The id of the task
+
+        Returns:
+            dict: The result of the task
+
+        """
+        response = self._get(endpoint=VcspEndpoints.TASK_RESULT.value.replace("<task_id>", task_id))
+        return response.json()
+
+    def track_task(self, task_id: str) -> TaskFuture:
+        """Track a task in the background, returning a future resolved when it finishes.
+
+        Every task tracked by the client is polled from a single background
+        thread, in concurrent rounds spaced with an adaptive backoff. The future
+        raises `TaskFailedError` if the task fails, and its `output` method
+        fetches the result of the task lazily. It can be awaited from asyncio
+        code with `asyncio.wrap_future`.
+
+        Args:
+            task_id: The id of the task
+
+        Returns:
+            TaskFuture: The future of the task
+
+        """
+        with self._task_tracker_lock:
+            if self._task_tracker is None:
+                self._task_tracker = TaskTracker(self)
+            return self._task_tracker.track(task_id)
+
+    def wait_task(self, task_id: str, timeout: float | None = None) -> Task:
+        """Wait for a task to finish.
+
+        Args:
+            task_id: The id of the task
+            timeout: The maximum seconds to wait
+
+        Returns:
+            Task: The final status of the task
+
+        Raises:
+            TaskFailedError: If the task finishes without a result
+            TaskTimeoutError: If the task does not finish in time
+
+        """
+        future = self.track_task(task_id)
+        done, _ = wait([future], timeout=timeout)
+        if not done:
+            raise TaskTimeoutError([task_id])
+        return future.result()
+
+    def wait_all(
+            self,
+            task_ids: Iterable[str],
+            timeout: float | None = None,
+            max_in_flight: int = 8,
+            backoff: Backoff | None = None,
+    ) -> dict[str, Task]:
+        """Wait for many tasks to finish.
+
+        The status of the unfinished tasks is checked in rounds, with at most
+        `max_in_flight` concurrent requests, and the rounds are spaced with an
+        adaptive backoff instead of polling each task on its own.
+
+        Args:
+            task_ids: The ids of the tasks
+            timeout: The maximum seconds to wait for all of them
+            max_in_flight: The maximum number of status checks sent concurrently
+            backoff: The policy of the interval between rounds of checks
+
+        Returns:
+            dict: The final status of each task, by task id, including the failed ones
+
+        Raises:
+            TaskTimeoutError: If any task does not finish in time
+
+        """
+        tracker = TaskTracker(self, max_in_flight=max_in_flight, backoff=backoff)
+        try:
+            futures = [tracker.track(task_id) for task_id in task_ids]
+            _, not_done = wait(futures, timeout=timeout)
+            if not_done:
+                raise TaskTimeoutError([future.task_id for future in not_done])
+        finally:
+            tracker.close()
+        tasks = {}
+        for future in futures:
+            error = future.exception()
+            if isinstance(error, TaskFailedError):
+                tasks[future.task_id] = error.task
+            elif error is not None:
+                raise error
+            else:
+                tasks[future.task_id] = future.result()
+        return tasks
+
+    def iter_enrollments(self, page_size: int = 100, **filters: object) -> Iterator[dict]:
+        """Iterate lazily over the enrollments, prefetching the next page while the current one is consumed.
+
+        Args:
+            page_size: The number of items requested per page
+            **filters: Query parameters filtering the collection on the server side
+
+        Returns:
+            Iterator[dict]: The enrollments, one at a time
+
+        """
+        return self._paginate(VcspEndpoints.ENROLLMENTS.value, page_size, filters)
+
+    def iter_groups(self, page_size: int = 100, **filters: object) -> Iterator[dict]:
+        """Iterate lazily over the groups, prefetching the next page while the current one is consumed.
+
+        Args:
+            page_size: The number of items requested per page
+            **filters: Query parameters filtering the collection on the server side
+
+        Returns:
+            Iterator[dict]: The groups, one at a time
+
+        """
+        return self._paginate(VcspEndpoints.GROUPS.value, page_size, filters)
+
+    def iter_tags(self, page_size: int = 100, **filters: object) -> Iterator[dict]:
+        """Iterate lazily over the tags, prefetching the next page while the current one is consumed.
+
+        Args:
+            page_size: The number of items requested per page
+            **filters: Query parameters filtering the collection on the server side
+
+        Returns:
+            Iterator[dict]: The tags, one at a time
+
+        """
+        return self._paginate(VcspEndpoints.TAGS.value, page_size, filters)
+
+    def iter_matchings(self, page_size: int = 100, **filters: object) -> Iterator[dict]:
+        """Iterate lazily over the matchings, prefetching the next page while the current one is consumed.
+
+        Args:
+            page_size: The number of items requested per page
+            **filters: Query parameters filtering the collection on the server side
+
+        Returns:
+            Iterator[dict]: The matchings, one at a time
+
+        """
+        return self._paginate(VcspEndpoints.MATCHINGS.value, page_size, filters)
+
+    def iter_credential_configurations(self, page_size: int = 100, **filters: object) -> Iterator[dict]:
+        """Iterate lazily over the credential configurations, prefetching the next page while the current one is consumed.
+
+        Args:
+            page_size: The number of items requested per page
+            **filters: Query parameters filtering the collection on the server side
+
+        Returns:
+            Iterator[dict]: The credential configurations, one at a time
+
+        """
+        return self._paginate(VcspEndpoints.CREDENTIAL_CONFIGURATIONS.value, page_size, filters)
+
+    def iter_assurance_methods(self, page_size: int = 100, **filters: object) -> Iterator[dict]:
+        """Iterate lazily over the assurance methods, prefetching the next page while the current one is consumed.
+
+        Args:
+            page_size: The number of items requested per page
+            **filters: Query parameters filtering the collection on the server side
+
+        Returns:
+            Iterator[dict]: The assurance methods, one at a time
+
+        """
+        return self._paginate(VcspEndpoints.ASSURANCE_METHODS.value, page_size, filters)
+
+    def _paginate(self, endpoint: str, page_size: int, filters: dict) -> Iterator[dict]:
+        return iter(Paginator(lambda params: self._get(endpoint=endpoint, params=params), filters, page_size))
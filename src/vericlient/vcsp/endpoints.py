@@ -13,6 +13,7 @@ class VcspEndpoints(Enum):   # noqa: D101
     CREDENTIAL_ID = "accounts/<subject_id>/credentials/<credential_id>"
     GROUPS = "groups"
     GROUP_NAME = "groups/<group_name>"
+    GROUP_SUBJECT = "groups/<group_name>/subjects/<subject_id>"
     MATCHINGS = "matchings"
     CREDENTIAL_CONFIGURATIONS = "credential_configurations"
     CREDENTIAL_CONFIGURATION_URN = "credential_configurations/<urn>"
@@ -20,6 +21,7 @@ class VcspEndpoints(Enum):   # noqa: D101
     ASSURANCE_METHOD_URN = "assurance_methods/<urn>"
     TAGS = "tags"
     TAGS_NAME = "tags/<tag_name>"
+    TAG_SUBJECT = "tags/<tag_name>/subjects/<subject_id>"
     TASKS = "tasks"
     TASK_ID = "tasks/<task_id>"
     TASK_RESULT = "tasks/<task_id>/result"
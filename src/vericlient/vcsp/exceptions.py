@@ -0,0 +1,44 @@
+"""Module to define the exceptions for the VCSP API."""
+from vericlient.exceptions import VeriClientError
+from vericlient.vcsp.models import Task
+
+
+class VcspError(VeriClientError):
+    """Base class for exceptions in the VCSP API."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+
+
+class PayloadTooLargeError(VcspError):
+    """Exception raised when the request body exceeds the maximum size accepted by the service."""
+
+    def __init__(self) -> None:
+        message = "The request is larger than the service accepts"
+        super().__init__(message)
+
+
+class TaskFailedError(VcspError):
+    """Exception raised when an asynchronous task finishes without a result."""
+
+    def __init__(self, task: Task) -> None:
+        self.task = task
+        message = f"The task {task.task_id} finished with status {task.status}"
+        super().__init__(message)
+
+
+class TaskTimeoutError(VcspError):
+    """Exception raised when tasks do not finish in time."""
+
+    def __init__(self, task_ids: list[str]) -> None:
+        self.task_ids = task_ids
+        message = f"{len(task_ids)} tasks did not finish in time"
+        super().__init__(message)
+
+
+class NotFoundError(VcspError):
+    """Exception raised when the requested resource does not exist."""
+
+    def __init__(self) -> None:
+        message = "The requested resource does not exist"
+        super().__init__(message)
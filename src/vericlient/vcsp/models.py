@@ -0,0 +1,118 @@
+"""Module to define the models for the VCSP API."""
+from pydantic import BaseModel
+
+
+class EnrollmentInput(BaseModel):
+    """Input class for the enrollment of a subject.
+
+    Any field besides `subject_id` is sent to the service as it is.
+
+    Attributes:
+        subject_id: The id of the subject to enroll
+
+    """
+
+    subject_id: str
+
+    class Config:
+        extra = "allow"
+
+
+class EnrollmentResult(BaseModel):
+    """Result of the enrollment of a subject in a batch.
+
+    Attributes:
+        subject_id: The id of the subject
+        ok: Whether the subject was enrolled
+        result: The result returned by the service for the subject, if any
+        error: The reason why the subject was not enrolled, if it failed
+
+    """
+
+    subject_id: str
+    ok: bool
+    result: dict | None = None
+    error: str | None = None
+
+
+class BatchEnrollmentOutput(BaseModel):
+    """Aggregated results of a batch enrollment.
+
+    Only the errors are kept per subject, so the output stays small for any
+    number of subjects.
+
+    Attributes:
+        succeeded: The number of subjects enrolled
+        failed: The number of subjects not enrolled
+        errors: The reason of each failure, by subject id
+
+    """
+
+    succeeded: int = 0
+    failed: int = 0
+    errors: dict[str, str] = {}
+
+
+class MembershipOutput(BaseModel):
+    """Aggregated results of a bulk group or tag membership operation.
+
+    Attributes:
+        succeeded: The number of subjects updated
+        failed: The number of subjects not updated
+        errors: The reason of each failure, by subject id
+
+    """
+
+    succeeded: int = 0
+    failed: int = 0
+    errors: dict[str, str] = {}
+
+
+FINISHED_TASK_STATUSES = frozenset({"completed", "succeeded", "finished", "failed", "error", "cancelled", "canceled"})
+"""Statuses of a task that will not change anymore."""
+
+FAILED_TASK_STATUSES = frozenset({"failed", "error", "cancelled", "canceled"})
+"""Statuses of a task that finished without a result."""
+
+
+class Task(BaseModel):
+    """Status of an asynchronous task of the service.
+
+    Any other field returned by the service is kept as it is.
+
+    Attributes:
+        task_id: The id of the task
+        status: The status of the task
+
+    """
+
+    task_id: str
+    status: str
+
+    class Config:
+        extra = "allow"
+
+    @property
+    def done(self) -> bool:
+        """Return whether the task has finished, successfully or not."""
+        return self.status.lower() in FINISHED_TASK_STATUSES
+
+    @property
+    def failed(self) -> bool:
+        """Return whether the task has finished without a result."""
+        return self.status.lower() in FAILED_TASK_STATUSES
+
+
+class Resource(BaseModel):
+    """A resource fetched with a conditional request.
+
+    Attributes:
+        data: The resource, or None if it has not been modified
+        etag: The entity tag of the current version of the resource, if the service sent one
+        modified: Whether the resource changed since the version of the given entity tag
+
+    """
+
+    data: dict | list | None = None
+    etag: str | None = None
+    modified: bool = True
@@ -0,0 +1,75 @@
+"""Lazy iteration over the paginated collections of the VCSP API."""
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+Page = tuple[list[dict], str | None]
+
+
+def parse_page(response: requests.Response) -> Page:
+    """Return the items of a page and the cursor of the next one, if any.
+
+    The items are read from `items` (or `data`) and the cursor from
+    `next_cursor` (or `next`). A bare list is a single, last page.
+    """
+    response_json = response.json()
+    if isinstance(response_json, list):
+        return response_json, None
+    items = response_json.get("items", response_json.get("data", []))
+    return items, response_json.get("next_cursor", response_json.get("next"))
+
+
+class Paginator:
+    """Iterate lazily over every item of a paginated collection.
+
+    While the items of a page are consumed, the next page is already being
+    fetched in the background, so there are no stalls between pages. At most
+    two pages are held in memory at any time, no matter the size of the
+    collection.
+    """
+
+    def __init__(
+            self,
+            fetch: Callable[[dict], requests.Response],
+            params: dict | None = None,
+            page_size: int = 100,
+            prefetch: bool = True,  # noqa: FBT001, FBT002
+    ) -> None:
+        """Create the Paginator class.
+
+        Args:
+            fetch: A callable sending the request for a page with the given query parameters
+            params: The query parameters of every page, such as server-side filters
+            page_size: The number of items requested per page
+            prefetch: Whether the next page is fetched while the current one is consumed
+
+        """
+        self._fetch = fetch
+        self._params = {key: value for key, value in (params or {}).items() if value is not None}
+        self._page_size = page_size
+        self._prefetch = prefetch
+
+    def __iter__(self) -> Iterator[dict]:
+        """Yield the items of the collection, page after page."""
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vericlient-paginator") if self._prefetch else None
+        try:
+            page = self._get_page(None)
+            while True:
+                items, cursor = page
+                following = None
+                if cursor is not None and executor is not None:
+                    following = executor.submit(self._get_page, cursor)
+                yield from items
+                if cursor is None:
+                    return
+                page = following.result() if following is not None else self._get_page(cursor)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_page(self, cursor: str | None) -> Page:
+        params = {**self._params, "limit": self._page_size}
+        if cursor is not None:
+            params["cursor"] = cursor
+        return parse_page(self._fetch(params))
@@ -0,0 +1,298 @@
+"""Incremental local mirror of the VCSP accounts, credentials, groups and tags."""
+import json
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import structlog
+from pydantic import BaseModel
+
+from vericlient.concurrency import iter_as_completed
+from vericlient.vcsp.client import VcspClient
+from vericlient.vcsp.exceptions import NotFoundError
+
+logger = structlog.get_logger(__name__)
+
+_SCHEMA = (
+    (
+        "CREATE TABLE IF NOT EXISTS accounts (subject_id TEXT PRIMARY KEY, data TEXT, etag TEXT, "
+        "credentials TEXT, credentials_etag TEXT, synced_at TEXT NOT NULL) WITHOUT ROWID"
+    ),
+    (
+        "CREATE TABLE IF NOT EXISTS collections (kind TEXT NOT NULL, name TEXT NOT NULL, data TEXT NOT NULL, "
+        "PRIMARY KEY (kind, name)) WITHOUT ROWID"
+    ),
+    "CREATE TABLE IF NOT EXISTS pending (subject_id TEXT PRIMARY KEY) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID",
+)
+
+
+class SyncSummary(BaseModel):
+    """Counters of a mirror synchronization.
+
+    Attributes:
+        checked: The number of subjects checked
+        updated: The number of subjects whose account or credentials changed
+        unchanged: The number of subjects that did not change
+        removed: The number of subjects that no longer exist
+        failed: The number of subjects that could not be checked. They are checked again in the next run
+        errors: The reason of each failure, by subject id
+        reconciled: Whether every enrollment was listed, removing the subjects deleted on the server
+        watermark: The latest `updated_at` of the listed enrollments, from which the next run lists them
+
+    """
+
+    checked: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    failed: int = 0
+    errors: dict[str, str] = {}
+    reconciled: bool = False
+    watermark: str | None = None
+
+
+class VcspMirror:
+    """Keep a local SQLite mirror of the accounts, credentials, groups and tags of VCSP.
+
+    Each run only downloads what changed since the previous one:
+
+    - When no subjects are given, only those enrolled or updated since the last
+      run are listed, with the `updated_since` filter of `enrollments`. The
+      watermark is the latest `updated_at` returned by the server, so the clock
+      of this machine plays no part in it.
+    - Every `reconcile_interval`, all the enrollments are listed instead, and
+      the mirrored subjects that are not listed anymore are checked, so those
+      deleted on the server are removed from the mirror.
+    - The account and the credentials of each subject are fetched with
+      conditional requests, so those that did not change cost a `304` response
+      without body.
+    - Subjects that failed are checked again in the next run.
+
+    The subjects are checked concurrently, with at most `max_in_flight` requests in flight.
+    """
+
+    def __init__(
+            self,
+            client: VcspClient,
+            path: str | Path,
+            max_in_flight: int = 8,
+            reconcile_interval: timedelta | None = timedelta(days=1),
+    ) -> None:
+        """Create the VcspMirror class.
+
+        Args:
+            client: The client used to fetch the resources
+            path: The path of the SQLite database, created if it does not exist
+            max_in_flight: The maximum number of subjects checked concurrently
+            reconcile_interval: How often a run lists every enrollment to drop the
+                subjects deleted on the server. If None, only the first run does
+
+        """
+        self._client = client
+        self._max_in_flight = max_in_flight
+        self._reconcile_interval = reconcile_interval
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                self._connection.execute(statement)
+            self._connection.commit()
+
+    @property
+    def last_sync(self) -> datetime | None:
+        """Return when the last successful synchronization started, if any."""
+        last_sync = self._meta("last_sync")
+        return datetime.fromisoformat(last_sync) if last_sync else None
+
+    def sync(
+            self,
+            subject_ids: Iterable[str] | None = None,
+            collections: bool = True,  # noqa: FBT001, FBT002
+            full: bool = False,  # noqa: FBT001, FBT002
+    ) -> SyncSummary:
+        """Bring the mirror up to date.
+
+        Args:
+            subject_ids: The subjects to check. By default, those enrolled or updated
+                since the last run, or every subject in the first run and when a
+                reconciliation is due
+            collections: Whether the groups and tags are mirrored too
+            full: Whether every enrollment is listed to reconcile the mirror, even
+                if `reconcile_interval` did not elapse. Ignored if `subject_ids` is given
+
+        Returns:
+            The counters of the run
+
+        """
+        started_at = datetime.now(timezone.utc)
+        if collections:
+            self._replace_collection("group", self._client.iter_groups())
+            self._replace_collection("tag", self._client.iter_tags())
+        summary = SyncSummary()
+        if subject_ids is None:
+            summary.reconciled = full or self._reconcile_due(started_at)
+        items = ((subject_id, subject_id) for subject_id in self._scope(subject_ids, summary))
+        for subject_id, result in iter_as_completed(self._sync_subject, items, self._max_in_flight):
+            summary.checked += 1
+            if isinstance(result, Exception):
+                summary.failed += 1
+                summary.errors[subject_id] = f"{type(result).__name__}: {result}"
+                self._execute("INSERT OR IGNORE INTO pending (subject_id) VALUES (?)", (subject_id,))
+                continue
+            self._execute("DELETE FROM pending WHERE subject_id = ?", (subject_id,))
+            if result == "removed":
+                summary.removed += 1
+            elif result == "updated":
+                summary.updated += 1
+            else:
+                summary.unchanged += 1
+        if subject_ids is None:
+            meta = [("last_sync", started_at.isoformat())]
+            if summary.reconciled:
+                meta.append(("last_reconcile", started_at.isoformat()))
+            if summary.watermark:
+                meta.append(("watermark", summary.watermark))
+            with self._lock:
+                self._connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta)
+                self._connection.commit()
+        logger.info("VCSP mirror synchronized", **summary.model_dump(exclude={"errors"}))
+        return summary
+
+    def account(self, subject_id: str) -> dict | None:
+        """Return the mirrored account of a subject, or None if it is not mirrored."""
+        return self._load("data", subject_id)
+
+    def credentials(self, subject_id: str) -> list | dict | None:
+        """Return the mirrored credentials of a subject, or None if they are not mirrored."""
+        return self._load("credentials", subject_id)
+
+    def subjects(self) -> list[str]:
+        """Return the ids of the mirrored subjects."""
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT subject_id FROM accounts ORDER BY subject_id")]
+
+    def groups(self) -> list[dict]:
+        """Return the mirrored groups."""
+        return self._collection("group")
+
+    def tags(self) -> list[dict]:
+        """Return the mirrored tags."""
+        return self._collection("tag")
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    def _scope(self, subject_ids: Iterable[str] | None, summary: SyncSummary) -> Iterator[str]:
+        """Yield the subjects to check: the given ones, or the changed ones plus the pending ones.
+
+        When reconciling, the mirrored subjects that are not enrolled anymore are
+        yielded too, so checking them removes them. The watermark of the listed
+        enrollments is recorded in `summary`.
+        """
+        with self._lock:
+            pending = {row[0] for row in self._connection.execute("SELECT subject_id FROM pending")}
+        yield from pending
+        if subject_ids is not None:
+            yield from (subject_id for subject_id in subject_ids if subject_id not in pending)
+            return
+        watermark = None if summary.reconciled else self._meta("watermark")
+        filters = {"updated_since": watermark} if watermark else {}
+        latest = _timestamp(watermark)
+        listed = set()
+        for enrollment in self._client.iter_enrollments(**filters):
+            subject_id = enrollment["subject_id"]
+            updated_at = _timestamp(enrollment.get("updated_at"))
+            if updated_at is not None and (latest is None or updated_at > latest):
+                latest = updated_at
+            if summary.reconciled:
+                listed.add(subject_id)
+            if subject_id not in pending:
+                yield subject_id
+        summary.watermark = latest.isoformat() if latest else None
+        if summary.reconciled:
+            known = listed | pending
+            yield from (subject_id for subject_id in self.subjects() if subject_id not in known)
+
+    def _reconcile_due(self, now: datetime) -> bool:
+        last_reconcile = self._meta("last_reconcile")
+        if last_reconcile is None:
+            return True
+        if self._reconcile_interval is None:
+            return False
+        return now - datetime.fromisoformat(last_reconcile) >= self._reconcile_interval
+
+    def _meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _sync_subject(self, subject_id: str) -> str:
+        """Fetch the account and credentials of a subject if they changed, returning what happened."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT etag, credentials_etag FROM accounts WHERE subject_id = ?", (subject_id,),
+            ).fetchone()
+        etag, credentials_etag = row or (None, None)
+        try:
+            account = self._client.get_account(subject_id, etag)
+            credentials = self._client.get_credentials(subject_id, credentials_etag)
+        except NotFoundError:
+            self._execute("DELETE FROM accounts WHERE subject_id = ?", (subject_id,))
+            return "removed"
+        if not account.modified and not credentials.modified:
+            return "unchanged"
+        columns, values = ["synced_at"], [datetime.now(timezone.utc).isoformat()]
+        if account.modified:
+            columns += ["data", "etag"]
+            values += [json.dumps(account.data), account.etag]
+        if credentials.modified:
+            columns += ["credentials", "credentials_etag"]
+            values += [json.dumps(credentials.data), credentials.etag]
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns)
+        self._execute(
+            f"INSERT INTO accounts (subject_id, {', '.join(columns)}) VALUES (?{', ?' * len(columns)}) "  # noqa: S608
+            f"ON CONFLICT(subject_id) DO UPDATE SET {updates}",
+            (subject_id, *values),
+        )
+        return "updated"
+
+    def _replace_collection(self, kind: str, items: Iterable[dict]) -> None:
+        rows = [(kind, str(item.get("name", item.get("id"))), json.dumps(item)) for item in items]
+        with self._lock:
+            self._connection.execute("DELETE FROM collections WHERE kind = ?", (kind,))
+            self._connection.executemany("INSERT OR REPLACE INTO collections (kind, name, data) VALUES (?, ?, ?)", rows)
+            self._connection.commit()
+
+    def _collection(self, kind: str) -> list[dict]:
+        with self._lock:
+            rows = self._connection.execute("SELECT data FROM collections WHERE kind = ? ORDER BY name", (kind,))
+            return [json.loads(row[0]) for row in rows]
+
+    def _load(self, column: str, subject_id: str) -> object:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {column} FROM accounts WHERE subject_id = ?", (subject_id,),  # noqa: S608
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def _execute(self, statement: str, parameters: tuple) -> None:
+        with self._lock:
+            self._connection.execute(statement, parameters)
+            self._connection.commit()
+
+
+def _timestamp(value: str | None) -> datetime | None:
+    """Parse an ISO 8601 timestamp of the server, assuming UTC if it has no offset."""
+    if not value:
+        return None
+    try:
+        timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
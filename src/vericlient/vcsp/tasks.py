@@ -0,0 +1,201 @@
+"""Tracking of the asynchronous tasks of the VCSP API."""
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING
+
+import structlog
+
+from vericlient.concurrency import iter_as_completed
+from vericlient.exceptions import RETRYABLE_ERRORS
+from vericlient.vcsp.exceptions import TaskFailedError
+from vericlient.vcsp.models import Task
+
+if TYPE_CHECKING:
+    from vericlient.vcsp.client import VcspClient
+
+logger = structlog.get_logger(__name__)
+
+
+class Backoff:
+    """Adaptive interval between two polls of the status of the tasks.
+
+    The interval grows by `factor` after each poll in which no task finished,
+    up to `maximum`, and shrinks back towards `initial` when tasks finish, so
+    short tasks are noticed quickly and long ones are not polled constantly.
+    """
+
+    def __init__(self, initial: float = 0.5, maximum: float = 30.0, factor: float = 2.0) -> None:
+        """Create the Backoff class.
+
+        Args:
+            initial: The seconds between polls right after tasks are tracked or finish
+            maximum: The maximum seconds between polls
+            factor: The factor the interval grows or shrinks by after each poll
+
+        """
+        self._initial = initial
+        self._maximum = maximum
+        self._factor = factor
+        self._interval = initial
+
+    @property
+    def interval(self) -> float:
+        """Return the seconds to wait before the next poll."""
+        return self._interval
+
+    def update(self, progressed: bool) -> float:  # noqa: FBT001
+        """Update the interval after a poll, returning the new interval."""
+        if progressed:
+            self._interval = max(self._initial, self._interval / self._factor)
+        else:
+            self._interval = min(self._maximum, self._interval * self._factor)
+        return self._interval
+
+    def reset(self) -> None:
+        """Go back to the initial interval."""
+        self._interval = self._initial
+
+
+class TaskFuture(Future):
+    """Future resolved with the final `Task` status once the task finishes.
+
+    If the task fails, the future raises `TaskFailedError`. The result of the
+    task is only fetched when `output` is first called. The future can be
+    awaited from asyncio code with `asyncio.wrap_future`.
+    """
+
+    def __init__(self, client: "VcspClient", task_id: str) -> None:
+        super().__init__()
+        self._client = client
+        self._task_id = task_id
+        self._output_lock = threading.Lock()
+        self._output: dict | None = None
+
+    @property
+    def task_id(self) -> str:
+        """Return the id of the task."""
+        return self._task_id
+
+    def output(self, timeout: float | None = None) -> dict:
+        """Wait for the task and return its result, fetching it only once.
+
+        Args:
+            timeout: The maximum seconds to wait for the task to finish
+
+        Returns:
+            The result of the task
+
+        """
+        self.result(timeout)
+        with self._output_lock:
+            if self._output is None:
+                self._output = self._client.get_task_result(self._task_id)
+        return self._output
+
+
+class TaskTracker:
+    """Poll the status of many tasks from a single background thread.
+
+    In each round, the status of every unfinished task is checked
+    concurrently, at most `max_in_flight` at a time, and the rounds are spaced
+    with an adaptive `Backoff`. Errors that may be transient are ignored until
+    the next round. The thread only runs while there are tasks to track.
+    """
+
+    def __init__(self, client: "VcspClient", max_in_flight: int = 8, backoff: Backoff | None = None) -> None:
+        """Create the TaskTracker class.
+
+        Args:
+            client: The client used to check the status of the tasks
+            max_in_flight: The maximum number of status checks sent concurrently
+            backoff: The policy of the interval between rounds of checks
+
+        """
+        self._client = client
+        self._max_in_flight = max_in_flight
+        self._backoff = backoff or Backoff()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._futures: dict[str, TaskFuture] = {}
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        """Return the number of tracked tasks that have not finished."""
+        with self._lock:
+            return len(self._futures)
+
+    def track(self, task_id: str) -> TaskFuture:
+        """Start tracking a task.
+
+        Args:
+            task_id: The id of the task
+
+        Returns:
+            The future of the task. Tracking the same task twice returns the same future
+
+        """
+        with self._lock:
+            if self._closed:
+                error = "The tracker is closed"
+                raise RuntimeError(error)
+            future = self._futures.get(task_id)
+            if future is None:
+                future = self._futures[task_id] = TaskFuture(self._client, task_id)
+                self._backoff.reset()
+                self._wake.set()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="vericlient-task-tracker", daemon=True)
+                self._thread.start()
+        return future
+
+    def close(self) -> None:
+        """Stop polling and cancel the futures of the unfinished tasks."""
+        with self._lock:
+            self._closed = True
+            futures = list(self._futures.values())
+            self._futures.clear()
+            self._wake.set()
+        for future in futures:
+            future.cancel()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                task_ids = list(self._futures)
+                if not task_ids:
+                    self._thread = None
+                    return
+                self._wake.clear()
+            progressed = self._poll(task_ids)
+            self._wake.wait(self._backoff.update(progressed))
+
+    def _poll(self, task_ids: list[str]) -> bool:
+        """Check the status of the tasks once, resolving the futures of those finished."""
+        progressed = False
+        for task_id, task in iter_as_completed(self._client.get_task, ((task_id, task_id) for task_id in task_ids),
+                                               self._max_in_flight):
+            if isinstance(task, RETRYABLE_ERRORS):
+                logger.warning("Failed to check the status of a task", task_id=task_id, error=str(task))
+                continue
+            if not isinstance(task, Exception) and not task.done:
+                continue
+            with self._lock:
+                future = self._futures.pop(task_id, None)
+            if future is None:
+                continue
+            progressed = True
+            self._resolve(future, task)
+        return progressed
+
+    @staticmethod
+    def _resolve(future: TaskFuture, task: Task | Exception) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        if isinstance(task, Exception):
+            future.set_exception(task)
+        elif task.failed:
+            future.set_exception(TaskFailedError(task))
+        else:
+            future.set_result(task)
@@ -1,3 +1,6 @@
+import io
+import wave
+
 import pytest
 import requests_mock
 from vericlient.environments import Environments, Locations
@@ -112,6 +115,17 @@ def provide_testing_parameters(
     return parameters
 
 
+def make_wav(seconds: float, framerate: int = 8000) -> bytes:
+    """Build a silent mono 16-bit PCM WAV file of the given duration."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(framerate)
+        w.writeframes(b"\x00\x00" * int(seconds * framerate))
+    return buffer.getvalue()
+
+
 ######################
 # RESOURCES FIXTURES #
 ######################
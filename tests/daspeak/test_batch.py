@@ -0,0 +1,60 @@
+import pytest
+from vericlient import DaspeakClient
+from vericlient.daspeak.batch import BatchJob, ItemStatus
+from vericlient.daspeak.exceptions import InsufficientQualityError
+from vericlient.daspeak.models import GenerateCredentialInput, GenerateCredentialOutput
+from vericlient.exceptions import AuthorizationError, ServerError
+
+URL = "https://custom-daspeak-url.com/daspeak/v1"
+
+
+@pytest.fixture
+def mock_daspeak(mock_server, mock_option, daspeak_generate_credential_response,
+                 daspeak_quality_error_response, daspeak_server_error_response):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    mock_server.post(f"{URL}/models/good/credential/wav", json=daspeak_generate_credential_response)
+    mock_server.post(f"{URL}/models/bad/credential/wav", json=daspeak_quality_error_response, status_code=400)
+    mock_server.post(f"{URL}/models/flaky/credential/wav", json=daspeak_server_error_response, status_code=500)
+    mock_server.post(
+        f"{URL}/models/expired/credential/wav", json={"message": "no Authorization header found"}, status_code=401,
+    )
+    mock_server.post(
+        f"{URL}/models/clipped/credential/wav",
+        json={"error": "The audio is clipped", "exception": "AudioInputException"},
+        status_code=400,
+    )
+    return mock_server
+
+
+def test_batch_job_resumes_from_checkpoint(mock_daspeak, daspeak_generate_credential_response, audio_file, tmp_path):
+    client = DaspeakClient(url=URL)
+    models = ("good", "bad", "flaky", "expired", "clipped")
+    items = [(model, GenerateCredentialInput(audio=audio_file, hash=model)) for model in models]
+    checkpoint = tmp_path / "checkpoint.db"
+    results = {}
+
+    job = BatchJob(client, checkpoint, max_workers=2, max_attempts=2, backoff=0)
+    summary = job.run(items, on_result=results.__setitem__)
+    job.close()
+
+    assert (summary.succeeded, summary.failed, summary.retryable, summary.skipped) == (1, 2, 2, 0)
+    assert isinstance(results["good"], GenerateCredentialOutput)
+    assert isinstance(results["bad"], InsufficientQualityError)
+    assert isinstance(results["clipped"], ValueError)
+    assert isinstance(results["flaky"], ServerError)
+    assert isinstance(results["expired"], AuthorizationError)
+
+    mock_daspeak.post(f"{URL}/models/flaky/credential/wav", json=daspeak_generate_credential_response)
+    mock_daspeak.post(f"{URL}/models/expired/credential/wav", json=daspeak_generate_credential_response)
+    results.clear()
+    job = BatchJob(client, checkpoint, backoff=0)
+    summary = job.run(items, on_result=results.__setitem__)
+
+    assert (summary.succeeded, summary.failed, summary.retryable, summary.skipped) == (2, 0, 0, 3)
+    assert sorted(results) == ["expired", "flaky"]
+    assert job.checkpoint.status("flaky") == ItemStatus.DONE
+    expected_runs = 2
+    assert job.checkpoint.runs("flaky") == expected_runs
+    assert [item_id for item_id, _, _ in job.checkpoint.items(ItemStatus.FAILED)] == ["bad", "clipped"]
+    job.close()
@@ -0,0 +1,72 @@
+import pytest
+from vericlient import DaspeakClient
+from vericlient.daspeak.cache import ResultCache
+from vericlient.daspeak.models import GenerateCredentialInput, GenerateCredentialOutput
+
+URL = "https://custom-daspeak-url.com/daspeak/v1"
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path, daspeak_generate_credential_response):
+    output = GenerateCredentialOutput(status_code=200, **daspeak_generate_credential_response)
+    size = len(output.model_dump_json())
+    cache = ResultCache(tmp_path / "cache.db", max_bytes=2 * size)
+
+    cache.put("a", output)
+    cache.put("b", output)
+    assert cache.get("a") == output
+    cache.put("c", output)
+
+    expected_entries = 2
+    assert len(cache) == expected_entries
+    assert cache.size() == expected_entries * size
+    assert cache.get("b") is None
+    assert cache.get("a") == output
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.close()
+
+
+def test_result_cache_keeps_the_size_and_accesses_across_restarts(tmp_path, daspeak_generate_credential_response):
+    output = GenerateCredentialOutput(status_code=200, **daspeak_generate_credential_response)
+    size = len(output.model_dump_json())
+    path = tmp_path / "cache.db"
+    cache = ResultCache(path, max_bytes=2 * size)
+    cache.put("a", output)
+    cache.put("b", output)
+    cache.put("a", output)
+    assert cache.size() == 2 * size
+    assert cache.get("a") == output
+    cache.close()
+
+    cache = ResultCache(path, max_bytes=2 * size)
+    assert cache.size() == 2 * size
+    cache.put("c", output)
+    assert cache.get("b") is None
+    assert cache.get("a") == output
+    assert cache.size() == 2 * size
+    cache.close()
+
+
+def test_daspeak_client_cache_survives_restarts(
+    mock_server, mock_option, daspeak_generate_credential_response, tmp_path, audio_file,
+):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    matcher = mock_server.post(f"{URL}/models/cached/credential/wav", json=daspeak_generate_credential_response)
+    path = tmp_path / "cache.db"
+    audio = tmp_path / "audio.wav"
+    audio.write_bytes(audio_file)
+
+    cache = ResultCache(path)
+    first = DaspeakClient(url=URL, cache=cache).generate_credential(GenerateCredentialInput(audio=audio_file, hash="cached"))
+    cache.close()
+
+    cache = ResultCache(path)
+    client = DaspeakClient(url=URL, cache=cache)
+    second = client.generate_credential(GenerateCredentialInput(audio=str(audio), hash="cached"))
+    client.generate_credential(GenerateCredentialInput(audio=audio_file, hash="cached", calibration="other"))
+
+    assert second == first
+    expected_calls = 2
+    assert matcher.call_count == expected_calls
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
@@ -0,0 +1,46 @@
+import pytest
+from vericlient.daspeak.columnar import ScoreTable
+from vericlient.daspeak.models import CompareCredential2CredentialsOutput
+
+np = pytest.importorskip("numpy")
+
+
+def test_score_table(daspeak_compare_credential2credentials_response):
+    scores = [{"id": "a", "score": 0.2}, {"id": "b", "score": 0.9}, {"id": "c", "score": 0.5}, {"id": "d", "score": 0.9}]
+    output = CompareCredential2CredentialsOutput(
+        status_code=200, **{**daspeak_compare_credential2credentials_response, "scores": scores},
+    )
+
+    table = output.score_table()
+
+    assert len(table) == len(scores)
+    assert table.top_k(2) == [("b", 0.9), ("d", 0.9)]
+    assert table.top_k(10) == [("b", 0.9), ("d", 0.9), ("c", 0.5), ("a", 0.2)]
+    assert table.above(0.5) == [("b", 0.9), ("d", 0.9), ("c", 0.5)]
+    assert table.above(0.95) == []
+    assert table.score_of("c") == pytest.approx(0.5)
+    with pytest.raises(KeyError):
+        table.score_of("unknown")
+    with pytest.raises(ValueError, match="read-only"):
+        table.scores[0] = 1
+    assert table.ids.dtype.kind == "U"
+    assert output.score_table() is table
+    assert output.scores is scores
+    with pytest.raises(ValueError, match="must be a list"):
+        CompareCredential2CredentialsOutput(
+            status_code=200, **{**daspeak_compare_credential2credentials_response, "scores": "not-a-list"},
+        )
+
+
+def test_score_table_large_gallery():
+    n_credentials = 100_000
+    rng = np.random.default_rng(0)
+    scores = rng.random(n_credentials)
+    table = ScoreTable([f"id-{i}" for i in range(n_credentials)], scores)
+
+    best = table.top_k(5)
+
+    assert [score for _, score in best] == sorted(scores, reverse=True)[:5]
+    assert table.score_of(best[0][0]) == best[0][1]
+    threshold = 0.5
+    assert len(table.above(threshold)) == int((scores >= threshold).sum())
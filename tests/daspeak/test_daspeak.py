@@ -1,5 +1,14 @@
+import array
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+import requests
 from vericlient import DaspeakClient
+from vericlient.daspeak.exceptions import InsufficientQualityError
+from vericlient.daspeak.fingerprint import fingerprint
 from vericlient.daspeak.models import (
     CompareAudio2AudioInput,
     CompareAudio2AudioOutput,
@@ -14,6 +23,10 @@ from vericlient.daspeak.models import (
     GenerateCredentialInput,
     GenerateCredentialOutput,
 )
+from vericlient.exceptions import ServerError
+from vericlient.health import HealthMonitor
+
+from tests.conftest import make_wav
 
 
 def test_daspeak_alive(mock_server, daspeak_alive_parameters):
@@ -33,6 +46,62 @@ def test_daspeak_alive(mock_server, daspeak_alive_parameters):
         assert response
 
 
+def test_daspeak_health_monitor(mock_server, daspeak_alive_parameters):
+    for param in daspeak_alive_parameters:
+        endpoint, mock_response, mock_status_code, url, environment, location, _ = param
+        if mock_server:
+            mock_server.get(endpoint, json=mock_response, status_code=mock_status_code)
+
+        daspeak_client = DaspeakClient(
+            apikey="fake-apikey",
+            environment=environment,
+            location=location,
+            url=url,
+        )
+        assert daspeak_client.health is None
+        monitor = daspeak_client.start_health_monitor(interval=60)
+        deadline = time.monotonic() + 5
+        while daspeak_client.health is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        daspeak_client.stop_health_monitor()
+
+        assert not monitor.running
+        assert daspeak_client.health.alive
+        assert daspeak_client.health.latency >= 0
+        assert daspeak_client.health.error is None
+
+
+def test_health_monitor_caches_failures():
+    def failing_check() -> bool:
+        raise ServerError(requests.Response())
+
+    monitor = HealthMonitor(failing_check, interval=60)
+    status = monitor.check_now()
+
+    assert monitor.status is status
+    assert not status.alive
+    assert status.error.startswith("ServerError")
+
+
+def test_health_monitor_survives_unexpected_errors():
+    results = iter([True])
+
+    def check() -> bool:
+        return next(results)    # raises StopIteration after the first check
+
+    monitor = HealthMonitor(check, interval=0.01)
+    monitor.start()
+    deadline = time.monotonic() + 5
+    while (monitor.status is None or monitor.status.alive) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    running = monitor.running
+    monitor.stop()
+
+    assert running
+    assert not monitor.status.alive
+    assert monitor.status.error.startswith("StopIteration")
+
+
 def test_daspeak_get_models(mock_server, daspeak_get_models_parameters):
     for param in daspeak_get_models_parameters:
         endpoint, mock_response, mock_status_code, url, environment, location, _ = param
@@ -421,3 +490,116 @@ def test_daspeak_client_invalid_file_path():
     with pytest.raises(FileNotFoundError) as excinfo:
         daspeak_client.generate_credential(GenerateCredentialInput(audio="invalid-file-path", hash="fake-hash"))
     assert f"File {invalid_audio_file_path} not found" in str(excinfo.value)
+
+
+def test_daspeak_coalesce_requests(mock_server, mock_option, daspeak_generate_credential_response, audio_file):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    calls = []
+
+    def slow_response(request, context) -> dict:   # noqa: ARG001
+        calls.append(request)
+        time.sleep(0.2)
+        return daspeak_generate_credential_response
+
+    mock_server.post(f"{url}/models/fake-model/credential/wav", json=slow_response)
+    daspeak_client = DaspeakClient(url=url, coalesce_requests=True)
+    input_model = GenerateCredentialInput(audio=audio_file, hash="fake-model")
+    n_workers = 4
+    barrier = threading.Barrier(n_workers)
+
+    def generate():  # noqa: ANN202
+        barrier.wait()
+        return daspeak_client.generate_credential(input_model)
+
+    with ThreadPoolExecutor(n_workers) as executor:
+        responses = list(executor.map(lambda _: generate(), range(n_workers)))
+
+    assert len(calls) == 1
+    assert all(response is responses[0] for response in responses)
+
+    expected_calls = 2
+    daspeak_client.generate_credential(input_model)
+    assert len(calls) == expected_calls
+
+
+def test_daspeak_fingerprint(audio_file_path, audio_file):
+    from_path = GenerateCredentialInput(audio=audio_file_path, hash="fake-model")
+    from_bytes = GenerateCredentialInput(audio=audio_file, hash="fake-model")
+    other_calibration = GenerateCredentialInput(audio=audio_file, hash="fake-model", calibration="other")
+
+    assert fingerprint(from_path) == fingerprint(from_bytes)
+    assert fingerprint(from_bytes) != fingerprint(other_calibration)
+
+
+def test_daspeak_audio_inputs(mock_server, mock_option, daspeak_generate_credential_response, tmp_path):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    mock_server.post(f"{url}/models/fake-model/credential/wav", json=daspeak_generate_credential_response)
+    daspeak_client = DaspeakClient(url=url)
+    audio = make_wav(1)
+    path = tmp_path / "audio.wav"
+    path.write_bytes(audio)
+    file = io.BytesIO(b"prefix" + audio)
+    file.seek(len(b"prefix"))
+    buffer = array.array("h")
+    buffer.frombytes(audio)
+    expected = fingerprint(GenerateCredentialInput(audio=audio, hash="fake-model"))
+
+    for content in (path, str(path), file, bytearray(audio), memoryview(audio), buffer):
+        input_model = GenerateCredentialInput(audio=content, hash="fake-model")
+        assert input_model.audio is content
+        assert fingerprint(input_model) == expected
+        daspeak_client.generate_credential(input_model)
+        body = b"".join(bytes(chunk) for chunk in mock_server.last_request.body)
+        assert audio in body
+
+    assert file.tell() == len(b"prefix")
+    with pytest.raises(TypeError):
+        GenerateCredentialInput(audio=12, hash="fake-model")
+    with pytest.raises(TypeError), path.open() as text_file:
+        GenerateCredentialInput(audio=text_file, hash="fake-model")
+    with pytest.raises(FileNotFoundError):
+        daspeak_client.generate_credential(GenerateCredentialInput(audio=tmp_path / "missing.wav", hash="fake-model"))
+
+
+def test_daspeak_iter_generate_credentials(
+    mock_server, mock_option, daspeak_generate_credential_response, daspeak_quality_error_response, audio_file,
+):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    mock_server.post(f"{url}/models/fake-model/credential/wav", json=daspeak_generate_credential_response)
+    mock_server.post(f"{url}/models/bad-model/credential/wav", json=daspeak_quality_error_response, status_code=400)
+    daspeak_client = DaspeakClient(url=url)
+    n_inputs = 20
+    max_in_flight = 3
+    pulled = []
+
+    def inputs():  # noqa: ANN202
+        for index in range(n_inputs):
+            pulled.append(index)
+            model = "bad-model" if index == 0 else "fake-model"
+            yield f"id-{index}", GenerateCredentialInput(audio=audio_file, hash=model)
+
+    results = daspeak_client.iter_generate_credentials(inputs(), max_in_flight=max_in_flight)
+    first = next(results)
+    assert len(pulled) <= max_in_flight + 1
+
+    results = dict([first, *results])
+    assert len(results) == n_inputs
+    assert isinstance(results.pop("id-0"), InsufficientQualityError)
+    assert all(isinstance(result, GenerateCredentialOutput) for result in results.values())
+
+    compare_inputs = [CompareCredential2CredentialInput(credential_reference="a", credential_to_evaluate="b")]
+    mock_server.post(f"{url}/similarity/credential2credential", json={
+        "version": "1", "score": 0.9, "model": {"hash": "h", "mode": "m"}, "calibration": "telephone-channel",
+    })
+    assert [input_id for input_id, _ in daspeak_client.iter_compare(compare_inputs)] == [0]
+
+    pulled.clear()
+    with pytest.raises(ValueError, match="max_in_flight"):
+        daspeak_client.iter_generate_credentials(inputs(), max_in_flight=0)
+    assert pulled == []
@@ -0,0 +1,53 @@
+import time
+
+import pytest
+from vericlient.daspeak.loadgen import LatencyHistogram, LoadGenerator
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram(significant_figures=2)
+    n_values = 10_000
+    for i in range(1, n_values + 1):
+        histogram.record(i / 1000)
+
+    assert histogram.count == n_values
+    assert histogram.min == pytest.approx(0.001)
+    assert histogram.max == pytest.approx(10)
+    assert histogram.percentile(50) == pytest.approx(5, rel=0.01)
+    assert histogram.percentile(99) == pytest.approx(9.9, rel=0.01)
+    assert histogram.percentile(100) == pytest.approx(10)
+    assert LatencyHistogram().percentile(50) == 0
+
+
+def test_load_generator_mix_and_errors():
+    def fail() -> None:
+        raise TimeoutError
+
+    generator = LoadGenerator(
+        {"ok": lambda: time.sleep(0.001), "fail": fail, "unused": lambda: None},
+        mix={"ok": 3, "fail": 1, "unused": 0},
+        concurrency=4,
+        seed=0,
+    )
+    n_requests = 200
+
+    report = generator.run(requests=n_requests)
+
+    assert report.requests == n_requests
+    assert set(report.operations) == {"ok", "fail"}
+    assert report.errors == {"TimeoutError": report.operations["fail"]}
+    assert report.operations["ok"] > report.operations["fail"]
+    assert report.latency["p50"] <= report.latency["p99"] <= report.latency["max"]
+    assert "requests:   200" in report.format()
+
+
+def test_load_generator_target_rate():
+    rps = 200
+    duration = 0.5
+    generator = LoadGenerator({"ok": lambda: None}, concurrency=2, rps=rps)
+
+    report = generator.run(duration=duration)
+
+    assert report.requests == pytest.approx(rps * duration, rel=0.1)
+    with pytest.raises(ValueError, match="Unknown operations"):
+        LoadGenerator({"ok": lambda: None}, mix={"other": 1})
@@ -0,0 +1,92 @@
+import json
+from urllib.parse import parse_qs
+
+import pytest
+from vericlient import DaspeakClient
+from vericlient.daspeak.models import (
+    CompareCredential2CredentialsInput,
+    CompareCredential2CredentialsOutput,
+    GenerateCredentialOutput,
+)
+from vericlient.daspeak.store import CredentialStore
+
+URL = "https://custom-daspeak-url.com/daspeak/v1"
+
+
+def test_credential_store_galleries(tmp_path, daspeak_generate_credential_response):
+    path = tmp_path / "store.db"
+    store = CredentialStore(path)
+    output = GenerateCredentialOutput(status_code=200, **daspeak_generate_credential_response)
+    n_credentials = 2
+    assert store.add_many("staff", [("alice", "credential-a"), ("bob", output)]) == n_credentials
+    store.add("visitors", "carol", "credential-c")
+
+    assert store.galleries() == ["staff", "visitors"]
+    assert store.count("staff") == n_credentials
+    assert store.credential_list("staff") == [("alice", "credential-a"), ("bob", output.credential)]
+    payload = store.credential_list_payload("staff")
+    assert store.credential_list_payload("staff") is payload
+    assert json.loads(payload) == [
+        {"id": "alice", "credential": "credential-a"}, {"id": "bob", "credential": output.credential},
+    ]
+
+    version = store.version("staff")
+    assert store.remove("staff", "alice")
+    assert not store.remove("staff", "alice")
+    assert store.version("staff") > version
+    assert json.loads(store.credential_list_payload("staff")) == [{"id": "bob", "credential": output.credential}]
+    store.close()
+
+    store = CredentialStore(path)
+    assert store.get("visitors", "carol") == "credential-c"
+    store.delete_gallery("visitors")
+    assert store.galleries() == ["staff"]
+    with pytest.raises(KeyError):
+        store.credential_list_payload("visitors")
+    store.close()
+
+
+def test_credential_store_payload_survives_gallery_recreation(tmp_path):
+    path = tmp_path / "store.db"
+    store = CredentialStore(path)
+    other = CredentialStore(path)
+    store.add("staff", "alice", "credential-a")
+    assert json.loads(store.credential_list_payload("staff")) == [{"id": "alice", "credential": "credential-a"}]
+
+    other.delete_gallery("staff")
+    other.add("staff", "bob", "credential-b")
+
+    assert json.loads(store.credential_list_payload("staff")) == [{"id": "bob", "credential": "credential-b"}]
+    store.close()
+    other.close()
+
+
+def test_identification_input_requires_list_or_gallery():
+    with pytest.raises(ValueError, match="exactly one"):
+        CompareCredential2CredentialsInput(credential_reference="fake")
+    with pytest.raises(ValueError, match="exactly one"):
+        CompareCredential2CredentialsInput(
+            credential_reference="fake", credential_list=[("id", "credential")], gallery="staff",
+        )
+
+
+def test_daspeak_compare_with_gallery(mock_server, mock_option, daspeak_compare_credential2credentials_response):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    mock_server.post(
+        f"{URL}/identification/credential2credentials", json=daspeak_compare_credential2credentials_response,
+    )
+    data_model = CompareCredential2CredentialsInput(credential_reference="fake", gallery="staff")
+    with pytest.raises(ValueError, match="credential_store"):
+        DaspeakClient(url=URL).compare(data_model)
+
+    store = CredentialStore()
+    store.add_many("staff", [("fake-id1", "credential-1"), ("fake-id2", "credential-2")])
+    client = DaspeakClient(url=URL, credential_store=store)
+    response = client.compare(data_model)
+
+    assert isinstance(response, CompareCredential2CredentialsOutput)
+    sent = parse_qs(mock_server.last_request.text)
+    assert json.loads(sent["credential_list"][0]) == [
+        {"id": "fake-id1", "credential": "credential-1"}, {"id": "fake-id2", "credential": "credential-2"},
+    ]
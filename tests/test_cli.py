@@ -0,0 +1,105 @@
+import json
+
+import pytest
+from vericlient.cli import main
+
+URL = "https://custom-daspeak-url.com/daspeak/v1"
+MODEL = {"hash": "fake-model", "mode": "fake-mode"}
+
+
+@pytest.fixture
+def mock_daspeak(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    mock_server.post(f"{URL}/models/fake-model/credential/wav", json={
+        "version": "1", "model": MODEL, "credential": "fake-credential",
+        "authenticity": 0.99, "input_audio_duration": 5.0, "net_speech_duration": 4.5,
+    })
+    mock_server.post(f"{URL}/similarity/credential2wav", json={
+        "version": "1", "score": 0.9, "model": MODEL, "calibration": "telephone-channel",
+        "authenticity_to_evaluate": 0.99, "input_audio_duration_to_evaluate": 5.0,
+        "net_speech_duration_to_evaluate": 4.5,
+    })
+    mock_server.post(f"{URL}/identification/wav2credentials", json={
+        "version": "1", "model": MODEL, "calibration": "telephone-channel", "authenticity_reference": 0.99,
+        "scores": [{"id": "a.wav", "score": 0.9}], "result": {"id": "a.wav", "score": 0.9},
+        "input_audio_duration_reference": 5.0, "net_speech_duration_reference": 4.5,
+    })
+    return mock_server
+
+
+@pytest.fixture
+def audio_dir(tmp_path, audio_file):
+    directory = tmp_path / "audios"
+    directory.mkdir()
+    for name in ("a.wav", "b.wav"):
+        (directory / name).write_bytes(audio_file)
+    return directory
+
+
+def _read_jsonl(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_cli_generate_credentials_and_identify(mock_daspeak, audio_dir, tmp_path, capsys):
+    credentials = tmp_path / "credentials.jsonl"
+    exit_code = main([
+        "--url", URL, "--output", str(credentials), "--concurrency", "2",
+        "generate-credentials", str(audio_dir), "--model", "fake-model",
+    ])
+
+    assert exit_code == 0
+    lines = _read_jsonl(credentials)
+    assert sorted(line["id"] for line in lines) == ["a.wav", "b.wav"]
+    assert all(line["ok"] and line["result"]["credential"] == "fake-credential" for line in lines)
+    assert "processed=2 errors=0" in capsys.readouterr().err
+
+    identifications = tmp_path / "identifications.jsonl"
+    exit_code = main([
+        "--url", URL, "--output", str(identifications),
+        "identify", str(audio_dir), "--gallery", str(credentials),
+    ])
+
+    assert exit_code == 0
+    assert all(line["result"]["result"]["id"] == "a.wav" for line in _read_jsonl(identifications))
+    assert mock_daspeak.last_request.text
+
+
+@pytest.mark.usefixtures("mock_daspeak")
+def test_cli_compare_reports_errors(audio_dir, tmp_path, capsys):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(
+        json.dumps({"id": "ok", "credential_reference": "fake-credential", "audio_to_evaluate": "audios/a.wav"}) + "\n"
+        + json.dumps({"id": "missing", "credential_reference": "fake-credential", "audio_to_evaluate": "nope.wav"}) + "\n",
+    )
+    results = tmp_path / "results.jsonl"
+
+    exit_code = main(["--url", URL, "--output", str(results), "compare", str(manifest)])
+
+    assert exit_code == 1
+    lines = {line["id"]: line for line in _read_jsonl(results)}
+    assert lines["ok"]["ok"]
+    assert lines["missing"]["error"] == "FileNotFoundError"
+    assert "FileNotFoundError=1" in capsys.readouterr().err
+    assert audio_dir.exists()
+
+
+@pytest.mark.usefixtures("mock_daspeak")
+def test_cli_loadgen(audio_file, tmp_path, capsys):
+    audio = tmp_path / "audio.wav"
+    audio.write_bytes(audio_file)
+    report_path = tmp_path / "report.json"
+    n_requests = 12
+
+    exit_code = main([
+        "--url", URL, "--output", str(report_path), "--concurrency", "3",
+        "loadgen", "--audio", str(audio), "--model", "fake-model", "--requests", str(n_requests),
+        "--mix", "generate_credential=1,compare=1,identify=1", "--gallery-size", "5",
+    ])
+
+    assert exit_code == 0
+    report = json.loads(report_path.read_text())
+    assert report["requests"] == n_requests
+    assert set(report["operations"]) <= {"generate_credential", "compare", "identify"}
+    assert report["errors"] == {}
+    assert "p99=" in capsys.readouterr().err
@@ -0,0 +1,564 @@
+import gzip
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import threading
+import time
+from collections.abc import Callable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+import requests
+from structlog.testing import capture_logs
+from vericlient import DaspeakClient, VcspClient, forking
+from vericlient.audio import wav_duration
+from vericlient.compression import RequestCompression
+from vericlient.config.config import settings
+from vericlient.daspeak.endpoints import DaspeakEndpoints
+from vericlient.daspeak.models import (
+    CompareAudio2CredentialsInput,
+    CompareCredential2CredentialsInput,
+    GenerateCredentialInput,
+)
+from vericlient.daspeak.store import CredentialStore
+from vericlient.exceptions import UnsupportedMediaTypeError
+from vericlient.http_cache import HttpCache
+from vericlient.pool import ConnectionRegistry, ResumingAdapter
+from vericlient.singleflight import SingleFlight
+from vericlient.slowlog import SlowRequestLog
+from vericlient.timeouts import TimeoutPolicy
+
+from scripts.standin_server import RESPONSES, serve_http1, url
+from tests.conftest import make_wav
+
+GENERATE_CREDENTIAL_RESPONSE = {
+    "version": "1",
+    "model": {"hash": "fake-model", "mode": "fake-mode"},
+    "credential": "fake-credential",
+    "authenticity": 0.99,
+    "input_audio_duration": 5.00,
+    "net_speech_duration": 4.50,
+}
+
+
+def test_wav_duration():
+    assert wav_duration(make_wav(2.5)) == pytest.approx(2.5)
+    assert wav_duration(make_wav(1, framerate=16000)[:64]) == pytest.approx(1)
+    assert wav_duration(b"not a wav") is None
+
+
+def test_timeout_policy_endpoint_overrides():
+    policy = TimeoutPolicy(
+        connect=2,
+        read=10,
+        endpoints={
+            DaspeakEndpoints.ALIVE: 1,
+            DaspeakEndpoints.MODELS_HASH_CREDENTIAL_AUDIO: (3, 30),
+        },
+    )
+
+    assert policy.for_request("alive") == (2, 1)
+    assert policy.for_request("models/fake-model/credential/wav") == (3, 30)
+    assert policy.for_request("models") == (2, 10)
+
+
+def test_timeout_policy_adaptive():
+    policy = TimeoutPolicy(read=5, adaptive=True, upload_rate=1000, audio_factor=1, min_samples=3)
+
+    assert policy.for_request("models") == (3.05, 5)
+    assert policy.for_request("models", upload_bytes=2000, audio_duration=4) == (3.05, 11)
+
+    for latency in (0.5, 1, 2):
+        policy.observe("models", latency)
+    assert policy.for_request("models") == (3.05, 3)
+    assert policy.for_request("models", upload_bytes=2000, audio_duration=4) == (3.05, 7)
+
+
+def test_timeout_policy_adaptive_keeps_overrides():
+    policy = TimeoutPolicy(read=5, adaptive=True, upload_rate=1000, endpoints={"alive": 2}, min_samples=3)
+    for latency in (0.1, 0.1, 0.1):
+        policy.observe("alive", latency)
+
+    assert policy.for_request("alive") == (3.05, 2)
+    assert policy.for_request("alive", upload_bytes=1000) == (3.05, 3)
+
+
+def test_client_timeout_configuration():
+    client = DaspeakClient(url="https://custom-daspeak-url.com/daspeak/v1", timeout=(2, 20))
+    assert (client.timeout_policy.connect, client.timeout_policy.read) == (2, 20)
+
+    client = DaspeakClient(url="https://custom-daspeak-url.com/daspeak/v1", timeout=7)
+    assert client.timeout_policy.for_request("alive") == (7, 7)
+
+    policy = TimeoutPolicy(adaptive=True)
+    client = DaspeakClient(url="https://custom-daspeak-url.com/daspeak/v1", timeout=policy)
+    assert client.timeout_policy is policy
+
+
+def test_client_sends_adaptive_timeouts(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    mock_server.post(f"{url}/models/fake-model/credential/wav", json=GENERATE_CREDENTIAL_RESPONSE)
+    policy = TimeoutPolicy(read=5, adaptive=True, upload_rate=10**9, audio_factor=2)
+    client = DaspeakClient(url=url, timeout=policy)
+
+    client.generate_credential(GenerateCredentialInput(audio=make_wav(3), hash="fake-model"))
+
+    connect, read = mock_server.last_request.timeout
+    assert connect == policy.connect
+    assert read == pytest.approx(11, abs=0.01)
+
+
+def test_client_observes_read_timeouts(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    mock_server.get(f"{url}/models", exc=requests.ReadTimeout)
+    policy = TimeoutPolicy(read=5, adaptive=True, min_samples=1)
+    client = DaspeakClient(url=url, timeout=policy)
+
+    with pytest.raises(requests.ReadTimeout):
+        client.get_models()
+
+    assert policy.latencies.percentile("models", 0.5) == policy.read
+
+
+def test_http_cache_revalidates_and_respects_cache_control(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    models = {"version": "1", "models": ["model1", "model2"]}
+    cache_control = {"value": "no-cache"}
+
+    def get_models(request, context) -> dict | None:
+        context.headers["ETag"] = '"v1"'
+        context.headers["Cache-Control"] = cache_control["value"]
+        if request.headers.get("If-None-Match") == '"v1"':
+            context.status_code = 304
+            return None
+        return models
+
+    matcher = mock_server.get(f"{url}/models", json=get_models)
+    cache = HttpCache()
+    client = DaspeakClient(url=url, http_cache=cache)
+
+    assert client.get_models().models == models["models"]
+    assert client.get_models().models == models["models"]
+    assert "If-None-Match" in matcher.last_request.headers
+    cache_control["value"] = "max-age=60"
+    client.get_models()
+    calls = matcher.call_count
+    ok = 200
+    assert client.get_models().status_code == ok
+    assert matcher.call_count == calls
+    assert (cache.hits, cache.revalidations, cache.misses) == (1, 2, 1)
+
+    cache.clear()
+    cache_control["value"] = "no-store"
+    client.get_models()
+    client.get_models()
+    assert len(cache) == 0
+    assert "If-None-Match" not in matcher.last_request.headers
+
+
+def test_http_cache_keys_credentials_and_varied_headers(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+
+    def get_models(request, context) -> dict:
+        context.headers["Cache-Control"] = "max-age=60"
+        context.headers["Vary"] = "Accept-Language"
+        return {"version": "1", "models": [request.headers["apikey"], request.headers.get("Accept-Language")]}
+
+    matcher = mock_server.get(f"{url}/models", json=get_models)
+    cache = HttpCache()
+    alice = DaspeakClient(url=url, http_cache=cache, headers={"apikey": "alice"})
+    bob = DaspeakClient(url=url, http_cache=cache, headers={"apikey": "bob"})
+    spanish = DaspeakClient(url=url, http_cache=cache, headers={"apikey": "alice", "Accept-Language": "es"})
+
+    assert alice.get_models().models == ["alice", None]
+    assert bob.get_models().models == ["bob", None]
+    assert spanish.get_models().models == ["alice", "es"]
+    assert alice.get_models().models == ["alice", None]
+    expected_requests = 3
+    assert matcher.call_count == expected_requests
+    assert cache.hits == 1
+
+
+def test_http_cache_is_bypassed_by_alive_checks(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    matcher = mock_server.get(f"{url}/alive", headers={"Cache-Control": "max-age=60"})
+    cache = HttpCache()
+    client = DaspeakClient(url=url, http_cache=cache)
+
+    assert client.alive()
+    assert client.alive()
+    expected_requests = 2
+    assert matcher.call_count == expected_requests
+    assert len(cache) == 0
+
+
+def test_request_compression_probes_and_falls_back(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    response = {
+        "version": "1",
+        "calibration": "fake-calibration",
+        "scores": [{"id": "id-0", "score": 0.99}],
+        "result": {"id": "id-0", "score": 0.99},
+    }
+    accepts_gzip = {"value": True}
+    received = []
+
+    def identify(request, context) -> dict:
+        encoding = request.headers.get("Content-Encoding")
+        if encoding and not accepts_gzip["value"]:
+            context.status_code = 415
+            return {"message": "Unsupported Content-Encoding"}
+        body = gzip.decompress(request.body) if encoding else request.body
+        received.append((encoding, parse_qs(body.decode() if isinstance(body, bytes) else body)))
+        return response
+
+    mock_server.post(f"{url}/identification/credential2credentials", json=identify)
+    credential_list = [(f"id-{i}", "credential" * 20) for i in range(100)]
+    data_model = CompareCredential2CredentialsInput(credential_reference="reference", credential_list=credential_list)
+    small = CompareCredential2CredentialsInput(credential_reference="reference", credential_list=credential_list[:1])
+
+    compression = RequestCompression(threshold=1024)
+    client = DaspeakClient(url=url, compression=compression)
+    client.compare(small)
+    client.compare(data_model)
+    assert [encoding for encoding, _ in received] == [None, "gzip"]
+    sent = json.loads(received[1][1]["credential_list"][0])
+    assert [(item["id"], item["credential"]) for item in sent] == credential_list
+    assert compression.supported
+
+    accepts_gzip["value"] = False
+    received.clear()
+    compression = RequestCompression(threshold=1024)
+    client = DaspeakClient(url=url, compression=compression)
+    client.compare(data_model)
+    client.compare(data_model)
+    assert [encoding for encoding, _ in received] == [None, None]
+    assert compression.supported is False
+    assert compression.encoding is None
+
+
+def test_request_compression_keeps_api_errors_and_streams_audios(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    credentials = {"credential_list": [(f"id-{i}", "credential" * 20) for i in range(100)]}
+    bad_media = {"value": True}
+    received = []
+
+    def identify(request, context) -> dict:
+        received.append(request.headers.get("Content-Encoding"))
+        if bad_media["value"]:
+            context.status_code = 415
+            return {"exception": "UnsupportedMediaType", "error": "Unsupported audio"}
+        return {"version": "1", "calibration": "fake", "scores": [], "result": {"id": "id-0", "score": 0.9}}
+
+    def credential(request, context) -> dict:  # noqa: ARG001
+        received.append(request.headers.get("Content-Encoding"))
+        return GENERATE_CREDENTIAL_RESPONSE
+
+    mock_server.post(f"{url}/identification/credential2credentials", json=identify)
+    mock_server.post(f"{url}/models/fake-model/credential/wav", json=credential)
+    compression = RequestCompression(threshold=1024)
+    client = DaspeakClient(url=url, compression=compression)
+    data_model = CompareCredential2CredentialsInput(credential_reference="reference", **credentials)
+
+    with pytest.raises(UnsupportedMediaTypeError):
+        client.compare(data_model)
+    assert received == ["gzip"]
+    assert compression.supported is None
+    bad_media["value"] = False
+    client.compare(data_model)
+    bad_media["value"] = True
+    with pytest.raises(UnsupportedMediaTypeError):
+        client.compare(data_model)
+    assert compression.supported
+    assert compression.encoding == "gzip"
+
+    received.clear()
+    client.generate_credential(GenerateCredentialInput(audio=make_wav(1), hash="fake-model"))
+    assert received == [None]
+
+
+def test_request_compression_streams_multipart_credential_lists(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    credential_list = [(f"id-{i}", "credential" * 20) for i in range(100)]
+    audio = make_wav(1)
+    received = []
+
+    def identify(request, context) -> dict:  # noqa: ARG001
+        body = request.body if isinstance(request.body, bytes) else b"".join(request.body)
+        received.append((request.headers.get("Content-Encoding"), request.headers.get("Content-Length")))
+        body = gzip.decompress(body) if received[-1][0] else body
+        assert b'"id": "id-0"' in body
+        assert audio in body
+        return {
+            "version": "1", "model": {"hash": "fake-hash", "mode": "fake-mode"}, "calibration": "fake",
+            "authenticity_reference": 0.99, "scores": [], "result": {"id": "id-0", "score": 0.9},
+            "input_audio_duration_reference": 1.0, "net_speech_duration_reference": 1.0,
+        }
+
+    mock_server.post(f"{url}/identification/wav2credentials", json=identify)
+    client = DaspeakClient(url=url, compression=RequestCompression(threshold=1024))
+
+    client.compare(CompareAudio2CredentialsInput(audio_reference=audio, credential_list=credential_list))
+    client.compare(CompareAudio2CredentialsInput(audio_reference=audio, credential_list=credential_list[:1]))
+
+    assert received[0] == ("gzip", None)
+    assert received[1][0] is None
+    uncompressed = 1000
+    assert len(RequestCompression(level=0).compress(b"a" * uncompressed)) > uncompressed
+
+
+@pytest.fixture
+def _real_http(mock_server) -> Iterator[None]:
+    if mock_server is not None:
+        mock_server.stop()
+    yield
+    if mock_server is not None:
+        mock_server.start()
+
+
+@pytest.mark.usefixtures("_real_http")
+def test_connection_registry_shares_pools_across_clients():
+    server = serve_http1(latency=0)
+    try:
+        registry = ConnectionRegistry()
+        first = DaspeakClient(url=url(server), headers={"apikey": "tenant-1"}, connection_registry=registry)
+        second = DaspeakClient(url=url(server), headers={"apikey": "tenant-2"}, connection_registry=registry)
+        vcsp = VcspClient(url=url(server), connection_registry=registry)
+
+        for _ in range(3):
+            assert first.alive()
+            assert second.alive()
+        first.transport.close()
+
+        assert second.alive()
+        assert server.connections == 1
+        assert len(registry) == 1
+        prefix = url(server).removesuffix("daspeak/v1")
+        assert first.transport.session.adapters[prefix] is registry.adapter(url(server))
+        assert vcsp.transport.session.adapters[prefix] is registry.adapter(url(server))
+        assert first.headers["apikey"] != second.headers["apikey"]
+        registry.clear()
+        assert len(registry) == 0
+        assert second.alive()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork")
+@pytest.mark.usefixtures("_real_http")
+def test_client_recovers_connections_after_fork(tmp_path):
+    server = serve_http1(latency=0)
+    try:
+        store = CredentialStore(tmp_path / "store.db")
+        store.add("gallery", "subject", "credential")
+        client = DaspeakClient(url=url(server), credential_store=store, timeout=5)
+        hooks_run = []
+        client.on_fork(lambda forked: hooks_run.append(forked.alive()), restart_health_monitor=True)
+        assert client.alive()
+        client.start_health_monitor(interval=60)
+        while client.health is None:
+            time.sleep(0.01)
+        checked_at = client.health.checked_at
+        pool_manager = client.transport.session.get_adapter(client.url).poolmanager
+
+        def child_checks() -> list:
+            while client.health is None or client.health.checked_at == checked_at:
+                time.sleep(0.01)
+            return [
+                client.transport.session.get_adapter(client.url).poolmanager is not pool_manager,
+                hooks_run == [True],
+                client.alive(),
+                store.count("gallery") == 1,
+            ]
+
+        checks = _in_child(child_checks)
+        with forking.without_hooks():
+            skipped = _in_child(lambda: hooks_run == [] and client.alive())
+        client.stop_health_monitor()
+
+        assert checks == [True, True, True, True]
+        assert skipped
+        assert client.alive()
+        assert server.connections >= 2  # noqa: PLR2004
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork")
+def test_single_flight_forgets_the_calls_of_the_parent_after_fork():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    leader = threading.Thread(target=flight.do, args=("key", lambda: started.set() or release.wait()))
+    leader.start()
+    started.wait()
+
+    result = _in_child(lambda: flight.do("key", lambda: "child"))
+    release.set()
+    leader.join()
+
+    assert result == "child"
+    assert flight.in_flight == 0
+
+
+def _in_child(check: Callable[[], object]) -> object:
+    """Run a check in a forked child process and return its JSON result."""
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.write(write_end, json.dumps(check()).encode())
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        result = json.loads(pipe.read())
+    os.waitpid(pid, 0)
+    return result
+
+
+@pytest.mark.usefixtures("_real_http")
+def test_client_warm_up_opens_connections():
+    server = serve_http1(latency=0.05)
+    try:
+        client = DaspeakClient(url=url(server), timeout=5)
+        n_connections = 4
+
+        assert client.warm_up(n_connections) == n_connections
+        assert server.connections == n_connections
+        with pytest.raises(ValueError, match="n_connections"):
+            client.warm_up(0)
+        with pytest.raises(ValueError, match="max_in_flight"):
+            client.warm_up(n_connections, max_in_flight=0)
+
+        n_checks = 20
+        connections = server.connections
+        assert client.warm_up(n_checks, max_in_flight=n_connections) == n_checks
+        assert server.connections == connections
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.skipif(shutil.which("openssl") is None, reason="Requires openssl to create a certificate")
+@pytest.mark.usefixtures("_real_http")
+def test_resuming_adapter_resumes_tls_sessions(tmp_path):
+    cert, key = tmp_path / "cert.pem", tmp_path / "key.pem"
+    subprocess.run(  # noqa: S603
+        [  # noqa: S607
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+            "-addext", "subjectAltName=DNS:localhost", "-keyout", str(key), "-out", str(cert),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    reused = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            reused.append(self.connection.session_reused)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        session = requests.Session()
+        adapter = ResumingAdapter()
+        session.mount("https://", adapter)
+        for _ in range(3):
+            assert session.get(f"https://localhost:{port}/", verify=str(cert)).ok
+            adapter.close()
+
+        assert reused == [False, True, True]
+        with pytest.raises(requests.exceptions.SSLError):
+            session.get(f"https://localhost:{port}/")
+        with pytest.raises(requests.exceptions.SSLError):
+            session.get(f"https://127.0.0.1:{port}/", verify=str(cert))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_clients_resume_tls_sessions_when_enabled(monkeypatch):
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    assert not isinstance(DaspeakClient(url=url).transport.session.get_adapter(url), ResumingAdapter)
+
+    monkeypatch.setattr(settings, "resume_tls_sessions", True)
+    assert isinstance(DaspeakClient(url=url).transport.session.get_adapter(url), ResumingAdapter)
+
+
+def test_slow_request_log_threshold_and_percentile():
+    log = SlowRequestLog(threshold=None, percentile=0.5, min_samples=3)
+    for duration in (0.1, 0.2, 0.3):
+        assert log.observe("alive", duration) is None
+
+    assert log.observe("alive", 0.25) == pytest.approx(0.2)
+    assert log.observe("alive", 0.1) is None
+    assert log.observe("models", 10) is None
+    assert SlowRequestLog(threshold=1).observe("alive", 2) == 1
+    with pytest.raises(ValueError, match="threshold or percentile"):
+        SlowRequestLog(threshold=None)
+
+
+def test_client_logs_slow_requests(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-daspeak-url.com/daspeak/v1"
+    response = RESPONSES["identification/wav2credentials"]
+    mock_server.post(f"{url}/identification/wav2credentials", json=response)
+    mock_server.get(f"{url}/alive", json={"status": "OK"})
+    apikey = "secret-apikey"
+    n_credentials = 3
+    audio_seconds = 2
+    client = DaspeakClient(url=url, headers={"apikey": apikey}, timeout=5, slow_request_log=SlowRequestLog(threshold=0))
+    data_model = CompareAudio2CredentialsInput(
+        audio_reference=make_wav(audio_seconds),
+        credential_list=[(f"id-{i}", "credential") for i in range(n_credentials)],
+    )
+
+    with capture_logs() as logs:
+        client.compare(data_model)
+        DaspeakClient(url=url, headers={"apikey": apikey}, timeout=5).alive()
+
+    events = [log for log in logs if log["event"] == "Slow request"]
+    assert len(events) == 1
+    event = events[0]
+    assert event["log_level"] == "warning"
+    assert event["endpoint"] == "identification/wav2credentials"
+    assert event["n_credentials"] == n_credentials
+    assert event["audio_duration"] == pytest.approx(audio_seconds)
+    assert event["upload_bytes"] > len(make_wav(audio_seconds))
+    assert event["response_bytes"] == len(json.dumps(response))
+    assert set(event["phases"]) == {"prepare", "server", "download"}
+    assert apikey not in repr(event)
@@ -0,0 +1,31 @@
+import io
+
+from urllib3.filepost import encode_multipart_formdata
+from vericlient.multipart import MultipartEncoder
+
+AUDIO = b"RIFF" + bytes(range(256)) * 1024
+
+
+def test_multipart_encoder_matches_urllib3(tmp_path):
+    expected, content_type = encode_multipart_formdata(
+        [("channel", "1"), ("calibration", "telephone-channel"), ("audio", ("audio", AUDIO, "audio/wav"))],
+        boundary="fake-boundary",
+    )
+    path = tmp_path / "audio.wav"
+    path.write_bytes(AUDIO)
+    fields = {"channel": 1, "calibration": "telephone-channel", "hash": None}
+
+    for content in (AUDIO, bytearray(AUDIO), memoryview(AUDIO), str(path), io.BytesIO(AUDIO)):
+        encoder = MultipartEncoder(fields, {"audio": ("audio", content, "audio/wav")}, boundary="fake-boundary")
+        assert encoder.content_type == content_type
+        assert len(encoder) == len(expected)
+        assert encoder.to_bytes() == expected
+        assert encoder.to_bytes() == expected
+
+
+def test_multipart_encoder_does_not_copy_bytes():
+    encoder = MultipartEncoder(files={"audio": ("audio", AUDIO, "audio/wav")})
+    views = [chunk for chunk in encoder if isinstance(chunk, memoryview)]
+
+    assert views
+    assert all(view.obj is AUDIO for view in views)
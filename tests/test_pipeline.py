@@ -0,0 +1,71 @@
+import io
+
+import pytest
+from vericlient import DaspeakClient
+from vericlient.daspeak.exceptions import AudioDurationTooLongError
+from vericlient.daspeak.models import GenerateCredentialInput, GenerateCredentialOutput
+from vericlient.daspeak.pipeline import DaspeakPipeline, audio_headers
+from vericlient.pipeline import Pipeline
+
+from tests.conftest import make_wav
+
+URL = "https://custom-daspeak-url.com/daspeak/v1"
+
+
+def square(value: int) -> int:
+    if value < 0:
+        error = "negative value"
+        raise ValueError(error)
+    return value * value
+
+
+def test_pipeline_prepares_in_processes_and_uploads_in_threads():
+    pipeline = Pipeline(square, str, processes=2, threads=3, queue_size=2)
+    n_items = 50
+
+    results = dict(pipeline.run((i, i) for i in range(-1, n_items)))
+
+    assert isinstance(results.pop(-1), ValueError)
+    assert results == {i: str(i * i) for i in range(n_items)}
+
+
+def test_daspeak_pipeline(mock_server, mock_option, tmp_path):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    mock_server.post(f"{URL}/models/fake-model/credential/wav", json={
+        "version": "1", "model": {"hash": "fake-model", "mode": "fake-mode"}, "credential": "fake-credential",
+        "authenticity": 0.99, "input_audio_duration": 1.0, "net_speech_duration": 1.0,
+    })
+    audio_path = tmp_path / "audio.wav"
+    audio_path.write_bytes(make_wav(1))
+    items = [
+        ("path", GenerateCredentialInput(audio=str(audio_path), hash="fake-model")),
+        ("bytes", GenerateCredentialInput(audio=make_wav(2), hash="fake-model")),
+        ("memoryview", GenerateCredentialInput(audio=memoryview(make_wav(1)), hash="fake-model")),
+        ("file", GenerateCredentialInput(audio=io.BufferedReader(io.BytesIO(make_wav(1))), hash="fake-model")),
+        ("too-long", GenerateCredentialInput(audio=make_wav(31), hash="fake-model")),
+        ("missing", GenerateCredentialInput(audio=str(tmp_path / "missing.wav"), hash="fake-model")),
+    ]
+    calls_before = mock_server.call_count
+
+    results = dict(DaspeakPipeline(DaspeakClient(url=URL), processes=2, threads=2).run(items))
+
+    assert isinstance(results["path"], GenerateCredentialOutput)
+    assert isinstance(results["bytes"], GenerateCredentialOutput)
+    assert isinstance(results["memoryview"], GenerateCredentialOutput)
+    assert isinstance(results["file"], GenerateCredentialOutput)
+    assert isinstance(results["too-long"], AudioDurationTooLongError)
+    assert isinstance(results["missing"], FileNotFoundError)
+    expected_uploads = 4
+    assert mock_server.call_count - calls_before == expected_uploads
+
+
+def test_audio_headers_do_not_copy_the_audios(tmp_path):
+    audio_path = tmp_path / "audio.wav"
+    audio_file = io.BufferedReader(io.BytesIO(make_wav(20)))
+    header_size = 4096
+
+    assert audio_headers(GenerateCredentialInput(audio=str(audio_path), hash="fake-model")) == {"audio": str(audio_path)}
+    assert len(audio_headers(GenerateCredentialInput(audio=memoryview(make_wav(20)), hash="fake-model"))["audio"]) == header_size
+    assert len(audio_headers(GenerateCredentialInput(audio=audio_file, hash="fake-model"))["audio"]) == header_size
+    assert audio_file.tell() == 0
@@ -0,0 +1,44 @@
+import pytest
+from vericlient import DaspeakClient
+from vericlient.daspeak.models import (
+    CompareCredential2CredentialInput,
+    CompareCredential2CredentialOutput,
+    GenerateCredentialInput,
+)
+from vericlient.exceptions import ServerError
+from vericlient.transports import Http2Transport
+
+from scripts.standin_server import serve_h2c, url
+from tests.conftest import make_wav
+
+pytest.importorskip("httpx")
+pytest.importorskip("h2")
+
+
+@pytest.fixture
+def h2c_server():
+    server = serve_h2c(latency=0.01)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_http2_transport_multiplexes_requests(h2c_server):
+    max_connections = 2
+    transport = Http2Transport(max_connections=max_connections, http1=False)
+    client = DaspeakClient(url=url(h2c_server), transport=transport, timeout=5)
+    n_requests = 20
+    inputs = (
+        CompareCredential2CredentialInput(credential_reference="reference", credential_to_evaluate=f"credential-{i}")
+        for i in range(n_requests)
+    )
+
+    results = [result for _, result in client.iter_compare(inputs, max_in_flight=n_requests)]
+
+    assert client.alive()
+    assert all(isinstance(result, CompareCredential2CredentialOutput) for result in results)
+    assert client.generate_credential(GenerateCredentialInput(audio=make_wav(1), hash="model")).credential
+    assert h2c_server.connections <= max_connections
+    with pytest.raises(ServerError):
+        DaspeakClient(url=url(h2c_server) + "/unknown", transport=transport, timeout=5).get_models()
+    transport.close()
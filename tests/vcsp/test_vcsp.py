@@ -1,4 +1,13 @@
+from collections.abc import Callable
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
 from vericlient import VcspClient
+from vericlient.vcsp.exceptions import TaskFailedError
+from vericlient.vcsp.models import EnrollmentInput
+from vericlient.vcsp.sync import VcspMirror
+from vericlient.vcsp.tasks import Backoff
 
 
 def test_vcsp_alive(mock_server, vcsp_alive_parameters):
@@ -16,3 +25,181 @@ def test_vcsp_alive(mock_server, vcsp_alive_parameters):
         response = vcsp_client.alive()
 
         assert response
+
+
+def test_vcsp_enroll_batch(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-vcsp-url.com/vcsp/v1"
+    max_accepted = 3
+    batch_sizes = []
+
+    def enroll(request, context) -> dict:
+        enrollments = request.json()["enrollments"]
+        if len(enrollments) > max_accepted:
+            context.status_code = 413
+            return {"message": "Payload too large"}
+        batch_sizes.append(len(enrollments))
+        return {"results": [
+            {"subject_id": item["subject_id"], "error": "Duplicated subject" if item["subject_id"] == "s7" else None}
+            for item in enrollments
+        ]}
+
+    mock_server.post(f"{url}/enrollments/batch", json=enroll)
+    client = VcspClient(url=url)
+    n_subjects = 10
+    inputs = (EnrollmentInput(subject_id=f"s{i}", groups=["onboarding"]) for i in range(n_subjects))
+
+    output = client.enroll_batch(inputs, batch_size=4, max_in_flight=2)
+
+    assert (output.succeeded, output.failed) == (n_subjects - 1, 1)
+    assert output.errors == {"s7": "Duplicated subject"}
+    assert sum(batch_sizes) == n_subjects
+    assert max(batch_sizes) <= max_accepted
+    assert mock_server.last_request.json()["enrollments"][0]["groups"] == ["onboarding"]
+
+
+def test_vcsp_tasks(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-vcsp-url.com/vcsp/v1"
+    mock_server.post(f"{url}/tasks", json={"task_id": "t1"})
+    mock_server.get(f"{url}/tasks/t1", [{"json": {"status": "running"}}, {"json": {"status": "completed"}}])
+    mock_server.get(f"{url}/tasks/t2", json={"status": "failed"})
+    mock_server.get(f"{url}/tasks/t3", json={"status": "completed"})
+    result = mock_server.get(f"{url}/tasks/t3/result", json={"enrolled": 10})
+    client = VcspClient(url=url)
+
+    task_id = client.submit_task({"type": "enrollment"})
+    tasks = client.wait_all([task_id, "t2"], timeout=5, backoff=Backoff(initial=0.01, maximum=0.05))
+
+    assert tasks["t1"].done
+    assert not tasks["t1"].failed
+    assert tasks["t2"].failed
+    future = client.track_task("t3")
+    assert future.result(timeout=5).status == "completed"
+    assert result.call_count == 0
+    assert future.output() == future.output() == {"enrolled": 10}
+    assert result.call_count == 1
+    with pytest.raises(TaskFailedError):
+        client.wait_task("t2", timeout=5)
+
+
+def test_vcsp_iter_groups(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-vcsp-url.com/vcsp/v1"
+    n_groups = 25
+
+    def groups(request, context) -> dict:  # noqa: ARG001
+        start = int(request.qs.get("cursor", ["0"])[0])
+        limit = int(request.qs["limit"][0])
+        end = min(start + limit, n_groups)
+        return {
+            "items": [{"name": f"group-{i}", "tag": request.qs["tag"][0]} for i in range(start, end)],
+            "next_cursor": str(end) if end < n_groups else None,
+        }
+
+    matcher = mock_server.get(f"{url}/groups", json=groups)
+    client = VcspClient(url=url)
+
+    iterator = client.iter_groups(page_size=10, tag="vip")
+    assert matcher.call_count == 0
+    items = list(iterator)
+
+    assert [item["name"] for item in items] == [f"group-{i}" for i in range(n_groups)]
+    assert all(item["tag"] == "vip" for item in items)
+    expected_pages = 3
+    assert matcher.call_count == expected_pages
+
+
+def test_vcsp_mirror(mock_server, mock_option, tmp_path):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-vcsp-url.com/vcsp/v1"
+    accounts = {"s1": {"subject_id": "s1", "name": "Alice"}, "s2": {"subject_id": "s2", "name": "Bob"}}
+    enrolled = {"s1": "2026-01-01T00:00:00Z", "s2": "2026-01-01T00:00:01Z", "s3": "2026-01-01T00:00:02Z"}
+    updated_since = []
+
+    def enrollments(request, context) -> dict:  # noqa: ARG001
+        since = parse_qs(urlsplit(request.url).query).get("updated_since", [None])[0]
+        updated_since.append(since)
+        return {"items": [
+            {"subject_id": subject_id, "updated_at": updated_at}
+            for subject_id, updated_at in enrolled.items()
+            if since is None or datetime.fromisoformat(updated_at.replace("Z", "+00:00")) >= datetime.fromisoformat(since)
+        ]}
+
+    def resource(suffix: str) -> Callable:
+        def respond(request, context) -> dict | list | None:
+            subject_id = request.path.split("/")[4]
+            if subject_id not in accounts:
+                context.status_code = 404
+                return {"message": "Not found"}
+            etag = f'"{accounts[subject_id]["name"]}{suffix}"'
+            context.headers["ETag"] = etag
+            if request.headers.get("If-None-Match") == etag:
+                context.status_code = 304
+                return None
+            return accounts[subject_id] if not suffix else [{"credential": f"credential-{subject_id}"}]
+        return respond
+
+    mock_server.get(f"{url}/enrollments", json=enrollments)
+    mock_server.get(f"{url}/groups", json={"items": [{"name": "onboarding"}]})
+    mock_server.get(f"{url}/tags", json={"items": [{"name": "vip"}]})
+    for subject_id in ("s1", "s2", "s3"):
+        mock_server.get(f"{url}/accounts/{subject_id}", json=resource(""))
+        mock_server.get(f"{url}/accounts/{subject_id}/credentials", json=resource("-credentials"))
+    mirror = VcspMirror(VcspClient(url=url), tmp_path / "mirror.db")
+
+    first = mirror.sync()
+    accounts["s2"]["name"] = "Robert"
+    enrolled["s2"] = "2026-01-01T00:00:03Z"
+    del accounts["s1"], enrolled["s1"]
+    second = mirror.sync()
+
+    assert (first.updated, first.unchanged, first.removed, first.reconciled) == (2, 0, 1, True)
+    assert (second.updated, second.unchanged, second.removed, second.reconciled) == (1, 0, 1, False)
+    assert updated_since == [None, "2026-01-01T00:00:02+00:00"]
+    assert second.watermark == "2026-01-01T00:00:03+00:00"
+    assert mirror.subjects() == ["s1", "s2"]
+    assert mirror.account("s2")["name"] == "Robert"
+    assert mirror.credentials("s1") == [{"credential": "credential-s1"}]
+    assert mirror.groups() == [{"name": "onboarding"}]
+    assert mirror.tags() == [{"name": "vip"}]
+
+    third = mirror.sync(full=True)
+
+    assert (third.updated, third.unchanged, third.removed, third.reconciled) == (0, 1, 2, True)
+    assert updated_since[-1] is None
+    assert mirror.subjects() == ["s2"]
+    mirror.close()
+
+
+def test_vcsp_bulk_membership(mock_server, mock_option):
+    if not mock_option:
+        pytest.skip("Requires the mock server")
+    url = "https://custom-vcsp-url.com/vcsp/v1"
+    requested = []
+
+    def membership(request, context) -> dict:
+        subject_id = request.path.split("/")[-1]
+        requested.append((request.method, subject_id))
+        if subject_id == "s3":
+            context.status_code = 404
+            return {"message": "Subject not found"}
+        return {}
+
+    for subject_id in ("s1", "s2", "s3"):
+        mock_server.put(f"{url}/groups/onboarding/subjects/{subject_id}", json=membership)
+        mock_server.delete(f"{url}/tags/vip/subjects/{subject_id}", json=membership)
+    client = VcspClient(url=url)
+
+    added = client.add_subjects_to_group("onboarding", ["s1", "s2", "s1", "s3", "s2"], max_in_flight=2)
+    untagged = client.untag_subjects("vip", iter(["s2"]))
+
+    assert (added.succeeded, added.failed) == (2, 1)
+    assert list(added.errors) == ["s3"]
+    assert sorted(requested[:3]) == [("PUT", "s1"), ("PUT", "s2"), ("PUT", "s3")]
+    assert (untagged.succeeded, untagged.failed) == (1, 0)
+    assert requested[3:] == [("DELETE", "s2")]